@@ -1,19 +1,260 @@
 import pygame
 import os
+import struct
+from collections import OrderedDict
 
-__all__ = ["load_image"]
+import settings
+import bundle
+
+__all__ = ["load_image", "image_size", "load_frames", "load_rotated_frames", "FRAME_SETS", "frame_cache"]
 
 # Cache for loaded images
 _images = {}
+# Cache for image dimensions read from file headers
+_sizes = {}
+
+# Explosion sprite sheet layout (columns, rows) and extra upscale for visibility
+EXPLOSION_GRID = (4, 4)
+EXPLOSION_SCALE = 4
+# extra shrink factor applied to the burnt bird after SCALE_FACTOR
+BURNT_FACTOR = 2.7
+
+def _sprite_path(filename):
+    # images now reside in the sprites/ directory
+    return os.path.join(os.path.dirname(__file__), 'sprites', filename)
 
-def load_image(filename):
+def load_image(filename, convert=True):
     """
     Load an image with alpha channel and cache it.
+    Converted to the display format when a display exists.
+    convert=False decodes without touching the display and skips the cache
+    (safe from a worker thread).
     Raises a pygame error if the file is not found.
     """
+    if not convert:
+        image = _images.get(filename)
+        return image if image is not None else pygame.image.load(_sprite_path(filename))
     if filename not in _images:
-        # images now reside in the sprites/ directory
-        path = os.path.join(os.path.dirname(__file__), 'sprites', filename)
-        image = pygame.image.load(path).convert_alpha()
+        path = _sprite_path(filename)
+        image = pygame.image.load(path)
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha()
         _images[filename] = image
-    return _images[filename]
\ No newline at end of file
+    return _images[filename]
+
+def image_size(filename):
+    """
+    Return the (width, height) of a PNG sprite without decoding it.
+    Reads only the IHDR header, so no display or pixel data is needed;
+    used by the headless simulation to size the bird's collider.
+    """
+    if filename not in _sizes:
+        with open(_sprite_path(filename), 'rb') as f:
+            header = f.read(24)
+        if header[:8] != b'\x89PNG\r\n\x1a\n' or header[12:16] != b'IHDR':
+            raise ValueError(f"{filename} is not a PNG image")
+        _sizes[filename] = struct.unpack('>II', header[16:24])
+    return _sizes[filename]
+
+
+class FrameCache:
+    """
+    LRU cache of derived (scaled / cropped / rotated) surfaces with a memory
+    budget. Keys are (source file, source area, target sizes, transform),
+    or (frame key, angle) for a rotated copy of a frame; the least recently
+    used frames are evicted once the budget is exceeded.
+    """
+    def __init__(self, budget):
+        self.budget = budget
+        self.size = 0
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """Return the cached surface for key (marking it recently used) or None."""
+        surf = self._entries.get(key)
+        if surf is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return surf
+
+    def put(self, key, surf):
+        """Store a surface, evicting least recently used ones over budget."""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= _surface_bytes(old)
+        self._entries[key] = surf
+        self.size += _surface_bytes(surf)
+        while self.size > self.budget and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= _surface_bytes(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+def _surface_bytes(surf):
+    w, h = surf.get_size()
+    return w * h * surf.get_bytesize()
+
+# Shared cache of derived frames used by Bird, Explosion and other sprites
+frame_cache = FrameCache(settings.FRAME_CACHE_BUDGET)
+
+# transform name -> function(surface, size)
+_TRANSFORMS = {
+    'smoothscale': pygame.transform.smoothscale,
+    'scale': pygame.transform.scale,
+}
+
+def _derive(key, convert=True):
+    """Build the surface described by a frame key from its source image."""
+    source, area, sizes, transform = key
+    image = load_image(source, convert)
+    if area is not None:
+        image = image.subsurface(area).copy()
+    scale = _TRANSFORMS[transform]
+    for size in sizes:
+        image = scale(image, size)
+    return image
+
+def _scaled_size(filename):
+    """Size of a source image scaled down by SCALE_FACTOR (from its header)."""
+    w, h = image_size(filename)
+    return (w // settings.SCALE_FACTOR, h // settings.SCALE_FACTOR)
+
+BIRD_FILES = ("wings_down.png", "wings_level.png", "wings_up.png")
+
+def _bird_keys():
+    # wing frames in animation order: down, level, up
+    return [(name, None, (_scaled_size(name),), 'smoothscale') for name in BIRD_FILES]
+
+def _burnt_keys():
+    # sprite shown after the explosion, shrunk further for a slightly smaller bird
+    w, h = _scaled_size("bird_burnt.png")
+    final = (max(1, int(w / BURNT_FACTOR)), max(1, int(h / BURNT_FACTOR)))
+    return [("bird_burnt.png", None, ((w, h), final), 'smoothscale')]
+
+def _explosion_keys():
+    sheet_w, sheet_h = image_size('explosion_sheet.png')
+    cols, rows = EXPLOSION_GRID
+    frame_w, frame_h = sheet_w // cols, sheet_h // rows
+    # target dimensions after scaling
+    target = ((frame_w // settings.SCALE_FACTOR) * EXPLOSION_SCALE,
+              (frame_h // settings.SCALE_FACTOR) * EXPLOSION_SCALE)
+    return [
+        ('explosion_sheet.png', (col * frame_w, row * frame_h, frame_w, frame_h), (target,), 'smoothscale')
+        for row in range(rows)
+        for col in range(cols)
+    ]
+
+# Final-size frame sets: name -> (source files, function returning the frame keys)
+FRAME_SETS = {
+    'bird': (BIRD_FILES, _bird_keys),
+    'bird_burnt': (("bird_burnt.png",), _burnt_keys),
+    'explosion': (("explosion_sheet.png",), _explosion_keys),
+}
+
+def source_paths():
+    """Return {source filename: path} for every file used by FRAME_SETS."""
+    return {
+        name: _sprite_path(name)
+        for sources, _ in FRAME_SETS.values()
+        for name in sources
+    }
+
+def build_frames(name, convert=True):
+    """Decode and scale every frame of a FRAME_SETS entry from its PNGs."""
+    _, keys = FRAME_SETS[name]
+    return [_derive(key, convert) for key in keys()]
+
+def read_frames(name, convert=True):
+    """
+    Return a set's frames without using the cache: from the bundle when it
+    is up to date, otherwise decoded and scaled from the PNGs.
+    convert=False never touches the display (safe from a worker thread).
+    """
+    _, key_fn = FRAME_SETS[name]
+    bundled = bundle.read_frames(name, source_paths(), key_fn(), convert)
+    if bundled is not None:
+        return bundled
+    return build_frames(name, convert)
+
+def frames_cached(name):
+    """Return True if every frame of a set is currently in frame_cache."""
+    _, key_fn = FRAME_SETS[name]
+    return all(key in frame_cache for key in key_fn())
+
+def install_frames(name, frames):
+    """Store a set's frames in frame_cache and release their originals."""
+    sources, key_fn = FRAME_SETS[name]
+    for key, frame in zip(key_fn(), frames):
+        frame_cache.put(key, frame)
+    release_images(sources)
+
+def release_images(filenames):
+    """Drop cached full-resolution originals (reloaded on demand if needed)."""
+    for filename in filenames:
+        _images.pop(filename, None)
+
+def load_frames(name):
+    """
+    Return the final-size frames of a FRAME_SETS entry as a list of surfaces.
+    Frames are shared through frame_cache; on a miss they come from the
+    prebuilt sprite bundle when it is up to date, otherwise they are decoded
+    and scaled from the source PNGs, whose originals are then released.
+    """
+    _, key_fn = FRAME_SETS[name]
+    keys = key_fn()
+    frames = [frame_cache.get(key) for key in keys]
+    if None in frames:
+        bundled = bundle.read_frames(name, source_paths(), keys)
+        if bundled is not None:
+            frames = bundled
+        else:
+            frames = [frame if frame is not None else _derive(key)
+                      for frame, key in zip(frames, keys)]
+        install_frames(name, frames)
+    return frames
+
+def load_rotated_frames(name, angles):
+    """
+    Return a table of a frame set turned by each of `angles` (degrees,
+    counter-clockwise): table[a][f] is (surface, rect, radius) for frame f
+    at angles[a]. rect is the rotated surface's rect centred on (0, 0), to be
+    moved to the sprite's position, and radius is half the unrotated frame
+    height (the collider does not turn with the sprite).
+    Rotated copies are made with smooth rotation and shared through
+    frame_cache (within its memory budget), so they are built once and
+    drawing a tilted frame never transforms a surface; callers keep the
+    table for as long as they draw from it.
+    """
+    _, key_fn = FRAME_SETS[name]
+    frames = load_frames(name)
+    keys = key_fn()
+    table = []
+    for angle in angles:
+        row = []
+        for key, frame in zip(keys, frames):
+            # angle 0 keeps the original frame (rotozoom would resample it)
+            surf = frame
+            if angle:
+                surf = frame_cache.get((key, angle))
+                if surf is None:
+                    surf = pygame.transform.rotozoom(frame, angle, 1)
+                    if pygame.display.get_surface() is not None:
+                        surf = surf.convert_alpha()
+                    frame_cache.put((key, angle), surf)
+            row.append((surf, surf.get_rect(center=(0, 0)), frame.get_height() / 2))
+        table.append(row)
+    return table
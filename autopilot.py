@@ -0,0 +1,347 @@
+"""
+autopilot.py: lookahead autopilot that plays by searching future flaps.
+The planner runs the real Simulation forward from a snapshot of the game,
+so gravity, flap impulse, bounce zones and restitution are exactly the
+game's own. It steers with a scripted rule (steer()) and searches
+flap / no-flap choices every few ticks over a short horizon, overriding the
+script whenever its choice leads to a crash the other choice avoids.
+
+Search results are memoized in a table keyed on a quantized state (bird
+height and velocity relative to the next gaps, the gaps' geometry, pipe
+speed) and record how many intervals ahead the state is known to be
+survivable or fatal. The table is LRU-bounded, can be saved and loaded so
+it carries over between runs, and makes most decisions a handful of
+lookups. A decision that would overrun its time budget keeps the script's
+choice.
+
+Usage:
+    python run.py --autopilot                  # attract mode
+    python run.py --autopilot autopilot.table  # keep the table between runs
+    python autopilot.py --games 100            # headless soak test
+"""
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import settings
+from simulation import Simulation, DEFAULT_DT
+from replay import settings_hash
+
+# table file layout: MAGIC, planner signature, entry count, then the keys as
+# int16 rows of KEY_FIELDS values followed by one int16 result per entry
+MAGIC = b'FLPYAUTO'
+_TABLE_HEADER = struct.Struct('<8s8sI')
+KEY_FIELDS = 11
+# stands in for a key field with no pipe to describe
+_NO_PIPE = 0x7FFF
+# how close the bird's bottom may come to the next bottom pipe before steer() flaps (px)
+STEER_MARGIN = 15
+
+
+def steer(sim):
+    """
+    Scripted choice the search tries first (and falls back to): flap
+    whenever the bird sinks toward the next bottom pipe. Unlike
+    rollout.gap_policy it also flaps while still rising, so it can climb
+    to a much higher next gap in time.
+    """
+    bird = sim.bird
+    upcoming = sim.next_pipes(1)
+    target = upcoming[0].bottom_y - STEER_MARGIN if upcoming else settings.HEIGHT / 2
+    return bird.y + bird.radius > target
+
+
+class _OutOfTime(Exception):
+    """Raised inside the search when a decision exceeds its budget."""
+
+
+class Autopilot:
+    """
+    Flap policy for a Simulation: call it (or decide()) before each step.
+    Like the rollout policies it takes the simulation and returns True to flap.
+    dt: step the plan is made for (the game's fixed step, or one frame).
+    budget: wall time one decision may take (ms).
+    """
+    def __init__(self, dt=DEFAULT_DT, horizon=settings.AUTOPILOT_HORIZON,
+                 step_ticks=settings.AUTOPILOT_STEP_TICKS, capacity=settings.AUTOPILOT_TABLE_SIZE,
+                 budget=settings.AUTOPILOT_BUDGET * DEFAULT_DT, quant=settings.AUTOPILOT_QUANT):
+        self.dt = dt
+        self.step_ticks = step_ticks
+        # intervals planned beyond the one being flown
+        self.depth = max(1, horizon // step_ticks)
+        self.capacity = capacity
+        self.budget = budget / 1000.0
+        self.y_q, self.v_q, self.x_q = quant
+        # quantized state -> +intervals known survivable / -intervals to a
+        # certain crash, least recently used first
+        self.table = OrderedDict()
+        # identifies tables built by the same physics and quantization
+        self.signature = hashlib.sha256(repr((settings_hash(), quant, step_ticks, dt)).encode()).digest()[:8]
+        # scratch simulation the search runs in (built on first use)
+        self._work = None
+        self._deadline = 0.0
+        # planned (flap, state after the interval) pairs and the state the
+        # game should be in when the next interval starts
+        self._plan = []
+        self._expected = None
+        self._next_decision = 0
+        # the plan leads into a dead end and a detour is being searched for
+        self._pending = False
+        # the game being played
+        self._sim = None
+        # statistics
+        self.decisions = 0
+        self.fallbacks = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, sim):
+        return self.decide(sim)
+
+    def decide(self, sim):
+        """Return True if the bird should flap before the next step."""
+        self.decisions += 1
+        if sim is not self._sim:
+            # a new game: drop the old one's plan
+            self._sim = sim
+            self._plan.clear()
+            self._pending = False
+            self._next_decision = 0
+        if self._work is None:
+            self._work = Simulation(course=sim.course)
+        self._deadline = time.perf_counter() + self.budget
+        if sim.ticks < self._next_decision:
+            # inside a planned interval: only its first tick can flap, so the
+            # tick's time goes to a detour search if one is pending
+            if self._pending:
+                self._search(self._find_detour)
+            return False
+        self._next_decision = sim.ticks + self.step_ticks
+        plan = self._plan
+        if plan and not self._on_plan(sim):
+            # something else moved the bird (the player, a collision toggle)
+            plan.clear()
+        if not plan:
+            # no plan yet: search from the current state
+            self._pending = False
+            work = self._work
+            work.restore(sim.snapshot())
+            work.collision = True
+            try:
+                if not self._expand(work, self.depth + 1, plan):
+                    plan.clear()
+            except _OutOfTime:
+                # the search left only part of a path
+                plan.clear()
+        if not plan:
+            # no survivable plan found (or no time to find one): follow the
+            # script for this interval and search on from the next one (the
+            # memoized results then still line up with the decision points)
+            self.fallbacks += 1
+            self._expected = None
+            return steer(sim)
+        flap, self._expected = plan.pop(0)
+        self._search(self._find_detour if self._pending else self._extend)
+        return flap
+
+    def _search(self, search):
+        """Run a plan search until it finishes or the decision's time is up."""
+        try:
+            search()
+        except _OutOfTime:
+            pass
+
+    def _extend(self):
+        """
+        Keep the horizon full: extend the plan at its end. If the plan runs
+        into a dead end, a detour is searched for from the next decision
+        point on; the current plan is still safe for its remaining
+        intervals, so that search gets the time of every tick until then.
+        """
+        plan = self._plan
+        known = len(plan)
+        if known >= self.depth:
+            return
+        work = self._work
+        work.restore(plan[-1][1] if plan else self._expected)
+        try:
+            if self._expand(work, self.depth - known, plan):
+                return
+        except _OutOfTime:
+            # drop the part of a path the search had appended
+            del plan[known:]
+            raise
+        self._pending = True
+        self._find_detour()
+
+    def _find_detour(self):
+        """Search a full-horizon plan from the next decision point."""
+        work = self._work
+        work.restore(self._expected)
+        detour = []
+        if self._expand(work, self.depth, detour):
+            self._plan[:] = detour
+            self._pending = False
+
+    def _on_plan(self, sim):
+        """True if the game is in the state the plan predicted for this tick."""
+        expected = self._expected
+        bird = sim.bird
+        return (expected is not None and expected.ticks == sim.ticks
+                and expected.bird[0] == bird.y and expected.bird[1] == bird.velocity
+                and expected.scroll == sim.track.scroll and expected.course is sim.course)
+
+    def _advance(self, sim, flap):
+        """Run one decision interval, flapping on its first tick; return alive."""
+        step = sim.step
+        dt = self.dt
+        if not step(flap, dt):
+            return False
+        for _ in range(self.step_ticks - 1):
+            if not step(False, dt):
+                return False
+        return True
+
+    def _expand(self, sim, depth, plan):
+        """
+        Search `depth` intervals ahead of sim, always trying both choices at
+        this node (not its memoized result), and append the surviving path
+        as (flap, state after the interval) pairs to plan. The path stops
+        early where it reaches a node already known to be safe.
+        """
+        state = sim.snapshot()
+        # try the script's choice first: it usually survives, so most
+        # searches are a single dive without backtracking
+        preferred = steer(sim)
+        for flap in (preferred, not preferred):
+            if self._advance(sim, flap):
+                after = sim.snapshot()
+                mark = len(plan)
+                plan.append((flap, after))
+                if depth == 1 or self._safe(sim, depth - 1, plan):
+                    return True
+                del plan[mark:]
+            sim.restore(state)
+        return False
+
+    def _safe(self, sim, depth, plan=None):
+        """
+        True if some flap schedule keeps the bird alive for `depth` more
+        intervals; memoized. With a plan, the path found is appended to it.
+        The table holds, per state, +d for "survives at least d intervals"
+        or -d for "dies within d intervals", so one entry answers searches
+        of any depth it covers as the horizon slides forward.
+        """
+        key = self._key(sim)
+        table = self.table
+        known = table.get(key)
+        if known is not None and (known >= depth or -depth <= known < 0):
+            table.move_to_end(key)
+            self.hits += 1
+            return known > 0
+        self.misses += 1
+        if time.perf_counter() > self._deadline:
+            raise _OutOfTime
+        result = self._expand(sim, depth, plan if plan is not None else [])
+        table[key] = depth if result else -depth
+        if len(table) > self.capacity:
+            table.popitem(last=False)
+        return result
+
+    def _key(self, sim):
+        """Quantized state the search result at this node is memoized under."""
+        bird = sim.bird
+        y_q, v_q, x_q = self.y_q, self.v_q, self.x_q
+        y = bird.y
+        anim = bird.anim_index if bird.animating else -1
+        speed = int(sim.track.speed)
+        pipes = sim.next_pipes(2)
+        if not pipes:
+            return (int(y // y_q), int(bird.velocity // v_q), anim, speed,
+                    _NO_PIPE, _NO_PIPE, _NO_PIPE, 0, _NO_PIPE, _NO_PIPE, _NO_PIPE)
+        first = pipes[0]
+        # bounce zones still live change the physics, so they are part of the key
+        bounce = int(first.bounce_zone and not first.bounced)
+        near = (int((first.x - bird.x) // x_q), int((first.bottom_y - y) // y_q), first.gap // y_q)
+        if len(pipes) > 1:
+            second = pipes[1]
+            bounce |= (second.bounce_zone and not second.bounced) << 1
+            far = (int((second.x - first.x) // x_q), int((second.bottom_y - first.bottom_y) // y_q),
+                   second.gap // y_q)
+        else:
+            far = (_NO_PIPE, _NO_PIPE, _NO_PIPE)
+        return (int(y // y_q), int(bird.velocity // v_q), anim, speed) + near + (bounce,) + far
+
+    def load(self, path):
+        """Load a saved table; return False (keeping the current one) if missing or stale."""
+        try:
+            with open(path, 'rb') as f:
+                magic, signature, count = _TABLE_HEADER.unpack(f.read(_TABLE_HEADER.size))
+                if magic != MAGIC or signature != self.signature:
+                    return False
+                keys = array('h')
+                keys.frombytes(f.read(count * KEY_FIELDS * keys.itemsize))
+                results = array('h')
+                results.frombytes(f.read(count * results.itemsize))
+        except (OSError, struct.error):
+            return False
+        table = self.table
+        for i in range(count):
+            table[tuple(keys[i * KEY_FIELDS:(i + 1) * KEY_FIELDS])] = results[i]
+        while len(table) > self.capacity:
+            table.popitem(last=False)
+        return True
+
+    def save(self, path):
+        """Write the table (in LRU order, so a reload keeps the recency)."""
+        keys = array('h')
+        results = array('h')
+        for key, result in self.table.items():
+            keys.extend(key)
+            results.append(result)
+        with open(path, 'wb') as f:
+            f.write(_TABLE_HEADER.pack(MAGIC, self.signature, len(self.table)))
+            f.write(keys.tobytes())
+            f.write(results.tobytes())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak-test the autopilot on headless games")
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0, help="first seed")
+    parser.add_argument('--max-ticks', type=int, default=settings.FPS * 120,
+                        help="per-game tick cap")
+    parser.add_argument('--table', default=None, metavar='PATH',
+                        help="load the memo table from PATH and save it back")
+    args = parser.parse_args(argv)
+    pilot = Autopilot()
+    if args.table:
+        pilot.load(args.table)
+    start = time.perf_counter()
+    ticks = 0
+    for seed in range(args.seed, args.seed + args.games):
+        sim = Simulation(seed=seed)
+        while sim.step(pilot(sim)) and sim.ticks < args.max_ticks:
+            pass
+        ticks += sim.ticks
+        cause = sim.death_cause or 'alive'
+        print(f"seed {seed}: score {sim.score} ticks {sim.ticks} {cause}")
+    elapsed = time.perf_counter() - start
+    lookups = pilot.hits + pilot.misses
+    print(f"{pilot.decisions} decisions, {elapsed / max(pilot.decisions, 1) * 1e3:.3f} ms each, "
+          f"{pilot.fallbacks} fallbacks, table {len(pilot.table)} entries, "
+          f"hit rate {pilot.hits / max(lookups, 1):.1%}")
+    if args.table:
+        pilot.save(args.table)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,392 @@
+"""
+batch.py: NumPy-vectorized simulator stepping N independent games in lockstep.
+Bird, pipe and score state are kept in arrays so one step() call advances
+every game. Per-game results match simulation.Simulation for the same seed,
+dt and flap inputs. Requires numpy.
+"""
+import numpy as np
+import settings
+from course import Course
+from simulation import (
+    bird_frame_heights, BIRD_BASE_FRAME, BIRD_START_X, BIRD_START_Y, DEFAULT_DT,
+)
+from utils import FACE_TOP, FACE_BOTTOM, FACE_LEFT, FACE_RIGHT
+
+# Death cause codes stored in BatchSimulation.death_cause (see simulation.DEATH_CAUSES)
+ALIVE = 0
+CAUSE_GROUND = 1
+CAUSE_TOP_PIPE = 2
+CAUSE_BOTTOM_PIPE = 3
+
+# initial pipe slots per game (grown on demand; a screen holds ~4 pipes)
+PIPE_SLOTS = 8
+# sort key for pipe slots with no collision
+_NO_EVENT = np.iinfo(np.int64).max
+
+
+def _overlap(cx, cy, radius, left, top, right, bottom):
+    """Vectorized utils.circle_box_collision."""
+    dx = cx - np.maximum(left, np.minimum(cx, right))
+    dy = cy - np.maximum(top, np.minimum(cy, bottom))
+    return dx * dx + dy * dy <= radius * radius
+
+
+def swept_circle_boxes(x0, y0, x1, y1, radius, left, top, right, bottom):
+    """
+    Vectorized utils.swept_circle_box over broadcastable arrays.
+    Return (hit, t, face) arrays; t and face are only meaningful where hit.
+    """
+    end_hit = _overlap(x1, y1, radius, left, top, right, bottom)
+    start_hit = _overlap(x0, y0, radius, left, top, right, bottom)
+    dx, dy = x1 - x0, y1 - y0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # slab test against the box grown by radius (a zero move is inside
+        # the slab for all t, or for none)
+        spans = []
+        for p, d, lo, hi in ((x0, dx, left - radius, right + radius),
+                             (y0, dy, top - radius, bottom + radius)):
+            a, b = (lo - p) / d, (hi - p) / d
+            inside = (p >= lo) & (p <= hi)
+            still = d == 0
+            spans.append((np.where(still, np.where(inside, -np.inf, np.inf), np.minimum(a, b)),
+                          np.where(still, np.where(inside, np.inf, -np.inf), np.maximum(a, b))))
+        (ax, bx), (ay, by) = spans
+        t_enter = np.maximum(np.maximum(0.0, ax), ay)
+        t_exit = np.minimum(np.minimum(1.0, bx), by)
+        entered = t_enter <= t_exit
+        t_enter = np.where(entered, t_enter, 0.0)
+        px, py = x0 + t_enter * dx, y0 + t_enter * dy
+        side = ((left <= px) & (px <= right)) | ((top <= py) & (py <= bottom))
+        # corner squares: solve for the circle around the corner
+        fx = x0 - np.where(px < left, left, right)
+        fy = y0 - np.where(py < top, top, bottom)
+        a = dx * dx + dy * dy
+        b = fx * dx + fy * dy
+        c = fx * fx + fy * fy - radius * radius
+        disc = b * b - a * c
+        t_corner = (-b - np.sqrt(np.maximum(disc, 0.0))) / a
+        corner = (a != 0) & (disc >= 0) & (t_corner >= 0) & (t_corner <= 1)
+    swept = entered & (side | corner)
+    t = np.where(side, t_enter, t_corner)
+    hit = np.where(start_hit, end_hit, swept | end_hit)
+    t = np.where(start_hit, 0.0, np.where(swept, t, 1.0))
+    # contact face at the contact position (corners count as top/bottom)
+    cx, cy = x0 + t * dx, y0 + t * dy
+    face = np.where(cy <= top, FACE_TOP,
+                    np.where(cy >= bottom, FACE_BOTTOM,
+                             np.where(cx <= left, FACE_LEFT, FACE_RIGHT)))
+    return hit, t, face
+
+
+class BatchSimulation:
+    """
+    N games of Flappy Bird stepped together.
+    Pipe spawns are rare, so they are taken per game from each game's
+    course.Course (keeping runs identical to Simulation); everything that
+    runs every tick (physics, animation, pipe motion, scoring, collisions)
+    is vectorized across games and pipe slots.
+    course: one Course shared by every game (seeds are then ignored);
+    None gives each game its own course from its seed.
+    start: start every game now; False leaves them all stopped until
+    reset() starts them one by one (e.g. the slots of a server).
+    """
+    def __init__(self, n, seeds=None, collision=True, course=None, start=True):
+        self.n = n
+        self.collision = collision
+        self.course = course
+        heights = bird_frame_heights()
+        self.frame_heights = np.array(heights, dtype=np.int64)
+        self.base_height = heights[BIRD_BASE_FRAME]
+        self.bird_x = float(BIRD_START_X)
+        # per-game bird state
+        self.bird_y = np.zeros(n)
+        self.velocity = np.zeros(n)
+        self.anim_index = np.zeros(n, dtype=np.int64)
+        self.anim_timer = np.zeros(n)
+        self.animating = np.zeros(n, dtype=bool)
+        self.height = np.zeros(n, dtype=np.int64)
+        self.flaps = np.zeros(n, dtype=np.int64)
+        self.bounces = np.zeros(n, dtype=np.int64)
+        # per-game game state
+        self.alive = np.zeros(n, dtype=bool)
+        self.death_cause = np.zeros(n, dtype=np.int8)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.pipe_speed = np.zeros(n)
+        # distance each game's pipe track has scrolled (see simulation.PipeTrack)
+        self.scroll = np.zeros(n)
+        self.time = np.zeros(n)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        # per-game course, index and world x of the next pipe to spawn
+        self.courses = [None] * n
+        self.next_pipe = np.zeros(n, dtype=np.int64)
+        self.next_pipe_x = np.zeros(n)
+        self.seeds = [None] * n
+        # per-pipe state, shape (n, slots); `seq` keeps spawn order per game
+        self._alloc_pipes(PIPE_SLOTS)
+        self._next_seq = np.zeros(n, dtype=np.int64)
+        if start:
+            self.reset(seeds=seeds)
+
+    def _alloc_pipes(self, slots):
+        n = self.n
+        self.pipe_active = np.zeros((n, slots), dtype=bool)
+        self.pipe_world_x = np.zeros((n, slots))
+        self.pipe_x = np.zeros((n, slots), dtype=np.int64)
+        self.pipe_top = np.zeros((n, slots), dtype=np.int64)
+        self.pipe_bottom = np.zeros((n, slots), dtype=np.int64)
+        self.pipe_gap = np.zeros((n, slots), dtype=np.int64)
+        self.pipe_bounce = np.zeros((n, slots), dtype=bool)
+        self.pipe_bounced = np.zeros((n, slots), dtype=bool)
+        self.pipe_passed = np.zeros((n, slots), dtype=bool)
+        self.pipe_seq = np.zeros((n, slots), dtype=np.int64)
+
+    def _grow_pipes(self):
+        """Double the number of pipe slots, keeping existing pipes."""
+        old = {name: getattr(self, name) for name in (
+            'pipe_active', 'pipe_world_x', 'pipe_x', 'pipe_top',
+            'pipe_bottom', 'pipe_gap', 'pipe_bounce', 'pipe_bounced',
+            'pipe_passed', 'pipe_seq')}
+        slots = old['pipe_active'].shape[1]
+        self._alloc_pipes(slots * 2)
+        for name, arr in old.items():
+            getattr(self, name)[:, :slots] = arr
+
+    def reset(self, indices=None, seeds=None):
+        """
+        Start new games at the given indices (all games by default).
+        seeds: one seed per reset game (None entries seed from entropy).
+        """
+        if indices is None:
+            indices = range(self.n)
+        indices = list(indices)
+        if seeds is None:
+            seeds = [None] * len(indices)
+        for i, seed in zip(indices, seeds):
+            self._reset_game(i, seed)
+
+    def _reset_game(self, i, seed):
+        course = self.course if self.course is not None else Course(seed)
+        self.courses[i] = course
+        self.seeds[i] = course.seed
+        self.bird_y[i] = float(BIRD_START_Y)
+        self.velocity[i] = 0
+        self.anim_index[i] = 0
+        self.anim_timer[i] = 0
+        self.animating[i] = False
+        self.height[i] = self.base_height
+        self.flaps[i] = 0
+        self.bounces[i] = 0
+        self.alive[i] = True
+        self.death_cause[i] = ALIVE
+        self.score[i] = 0
+        self.pipe_speed[i] = settings.PIPE_SPEED
+        self.scroll[i] = 0.0
+        self.time[i] = 0
+        self.ticks[i] = 0
+        self.pipe_active[i] = False
+        self._next_seq[i] = 0
+        self.next_pipe[i] = 0
+        self._spawn_pipes(i)
+
+    def _spawn_pipes(self, i):
+        """Add game i's course pipes whose left edge has scrolled onto the screen."""
+        course = self.courses[i]
+        horizon = self.scroll[i] + settings.WIDTH
+        k = self.next_pipe[i]
+        while course[k].world_x <= horizon:
+            self._add_pipe(i, course[k])
+            k += 1
+        self.next_pipe[i] = k
+        self.next_pipe_x[i] = course[k].world_x
+
+    def _add_pipe(self, i, spec):
+        """Put a course.PipeSpec into a free pipe slot of game i."""
+        free = np.flatnonzero(~self.pipe_active[i])
+        if free.size == 0:
+            self._grow_pipes()
+            free = np.flatnonzero(~self.pipe_active[i])
+        j = free[0]
+        self.pipe_active[i, j] = True
+        self.pipe_world_x[i, j] = spec.world_x
+        self.pipe_x[i, j] = int(spec.world_x - self.scroll[i])
+        self.pipe_gap[i, j] = spec.gap
+        self.pipe_top[i, j] = spec.top_height
+        self.pipe_bottom[i, j] = spec.top_height + spec.gap
+        self.pipe_bounce[i, j] = spec.bounce
+        self.pipe_bounced[i, j] = False
+        self.pipe_passed[i, j] = False
+        self.pipe_seq[i, j] = self._next_seq[i]
+        self._next_seq[i] += 1
+
+    def step(self, flap=None, dt=DEFAULT_DT):
+        """
+        Advance every live game by dt milliseconds.
+        flap: bool array (or None) of flap actions applied before physics.
+        Return the boolean alive array.
+        """
+        act = self.alive.copy()
+        if not act.any():
+            return self.alive
+        self.time[act] += dt
+        self.ticks[act] += 1
+        # spawn pipes reaching the screen (per game, in Python: rare events)
+        due = act & (self.next_pipe_x <= self.scroll + settings.WIDTH)
+        for i in np.flatnonzero(due):
+            self._spawn_pipes(i)
+        # start of the step, for the swept collision test
+        self._start_y = self.bird_y.copy()
+        self._start_scroll = self.scroll.copy()
+        if flap is not None:
+            self._flap(np.asarray(flap, dtype=bool) & act)
+        self._update_birds(act, dt)
+        self._move_and_score_pipes(act, dt)
+        if self.collision:
+            self._check_collisions(act)
+        else:
+            # clamp birds to the bottom of the screen
+            limit = settings.HEIGHT - self.height / 2
+            low = act & (self.bird_y > limit)
+            self.bird_y[low] = limit[low]
+            self.velocity[low] = 0
+        return self.alive
+
+    def _flap(self, f):
+        """Apply the flap impulse and start the wing animation (BirdBody.flap)."""
+        self.velocity[f] = settings.JUMP_VELOCITY
+        self.flaps[f] += 1
+        start = f & ~self.animating
+        self.animating[start] = True
+        self.anim_index[start] = 0
+        self.anim_timer[start] = 0
+
+    def _update_birds(self, act, dt):
+        """Gravity, wing animation and top-of-screen constraint (BirdBody.update)."""
+        dt_sec = dt / 1000.0
+        self.velocity[act] += settings.GRAVITY * dt_sec
+        self.bird_y[act] += self.velocity[act] * dt_sec
+        anim = act & self.animating
+        self.anim_timer[anim] += dt
+        adv = anim & (self.anim_timer >= settings.FRAME_DURATION)
+        self.anim_timer[adv] -= settings.FRAME_DURATION
+        self.anim_index[adv] += 1
+        self.animating[adv & (self.anim_index >= len(self.frame_heights))] = False
+        frames = self.frame_heights[np.minimum(self.anim_index, len(self.frame_heights) - 1)]
+        self.height[act] = np.where(self.animating, frames, self.base_height)[act]
+        half_h = self.height / 2
+        high = act & (self.bird_y < half_h)
+        self.bird_y[high] = half_h[high]
+        self.velocity[high] = 0
+
+    def _move_and_score_pipes(self, act, dt):
+        """Scroll pipes, award score for passed pipes, and cull off-screen pipes."""
+        self.scroll[act] += self.pipe_speed[act] * (dt / 1000.0)
+        live = self.pipe_active & act[:, None]
+        screen_x = self.pipe_world_x - self.scroll[:, None]
+        self.pipe_x[live] = np.trunc(screen_x[live]).astype(np.int64)
+        right = self.pipe_x + settings.PIPE_WIDTH
+        passed = live & ~self.pipe_passed & (right < self.bird_x)
+        count = passed.sum(axis=1)
+        if count.any():
+            self.pipe_passed |= passed
+            bounced = (passed & self.pipe_bounced).sum(axis=1)
+            self.score += count * 10 + bounced * 90
+            self.pipe_speed += count * settings.PIPE_SPEEDUP
+        self.pipe_active &= ~(live & (right < 0))
+
+    def _check_collisions(self, act):
+        """Ground collision, then swept circle tests against each pipe segment."""
+        heights = self.height
+        bottom = np.trunc(self.bird_y).astype(np.int64) - heights // 2 + heights
+        ground = act & (bottom >= settings.HEIGHT)
+        self._die(ground, CAUSE_GROUND)
+        act = act & ~ground
+        if not act.any():
+            return
+        live = self.pipe_active & act[:, None]
+        cx = self.bird_x
+        cy = self.bird_y[:, None]
+        y0 = self._start_y[:, None]
+        radius = (heights / 2)[:, None]
+        left = self.pipe_x
+        right = left + settings.PIPE_WIDTH
+        # in each pipe's frame the bird moved right by the pipe's movement
+        start_x = np.trunc(self.pipe_world_x - self._start_scroll[:, None]).astype(np.int64)
+        x0 = cx - (start_x - left)
+        # broad phase (as simulation.pipe_spans/pipe_contacts): only pipes the
+        # swept circle reaches horizontally, and whose gap edges the path does
+        # not clear by over a pixel, can be touched; usually one pipe per game
+        high = np.minimum(y0, cy) - radius - 1
+        low = np.maximum(y0, cy) + radius + 1
+        near = (live & (left <= cx + radius + 1) & (right >= x0 - radius - 1)
+                & ~((high > self.pipe_top) & (low < self.pipe_bottom)))
+        g, j = np.nonzero(near)
+        shape = left.shape
+        hit_top = np.zeros(shape, dtype=bool)
+        hit_bottom = np.zeros(shape, dtype=bool)
+        t_top = np.zeros(shape)
+        t_bottom = np.zeros(shape)
+        face_bottom = np.zeros(shape, dtype=np.int64)
+        if g.size == 0:
+            return
+        # narrow phase on the candidate (game, pipe) pairs only
+        args = (x0[g, j], y0[g, 0], cx, cy[g, 0], radius[g, 0])
+        hit_top[g, j], t_top[g, j], _ = swept_circle_boxes(
+            *args, left[g, j], 0, right[g, j], self.pipe_top[g, j])
+        hit_bottom[g, j], t_bottom[g, j], face_bottom[g, j] = swept_circle_boxes(
+            *args, left[g, j], self.pipe_bottom[g, j], right[g, j], settings.HEIGHT)
+        # contacts per (game, segment): top segments first, then bottom
+        hit = np.concatenate((hit_top, hit_bottom), axis=1)
+        rows = np.flatnonzero(hit.any(axis=1))
+        if rows.size == 0:
+            return
+        slots = left.shape[1]
+        hit = hit[rows]
+        t = np.where(hit, np.concatenate((t_top, t_bottom), axis=1)[rows], np.inf)
+        # tie-break contacts at the same t by spawn order, top segment first
+        order = np.concatenate((self.pipe_seq * 2, self.pipe_seq * 2 + 1), axis=1)[rows]
+        first = self._first_contact(hit, t, order)
+        slot = first % slots
+        is_bottom = first >= slots
+        end_y = self.bird_y[rows]
+        start_y = self._start_y[rows]
+        bounce = (is_bottom & self.pipe_bounce[rows, slot]
+                  & (face_bottom[rows, slot] == FACE_TOP) & (self.velocity[rows] > 0))
+        contact_t = t[np.arange(rows.size), first]
+        # after a bounce any further contact this step is fatal
+        if bounce.any():
+            b = np.flatnonzero(bounce)
+            b_rows, b_slot = rows[b], slot[b]
+            self.pipe_bounced[b_rows, b_slot] = True
+            self.bounces[b_rows] += 1
+            self.velocity[b_rows] = -self.velocity[b_rows] * settings.RESTITUTION
+            self.bird_y[b_rows] = self.pipe_bottom[b_rows, b_slot] - radius[b_rows, 0]
+            hit[b, first[b]] = False
+            t[b, first[b]] = np.inf
+            more = hit[b].any(axis=1)
+            b = b[more]
+            second = self._first_contact(hit[b], t[b], order[b])
+            first[b] = second
+            is_bottom[b] = second >= slots
+            contact_t[b] = t[b, second]
+            bounce[b] = False
+        dead = ~bounce
+        self._die_rows(rows[dead & ~is_bottom], CAUSE_TOP_PIPE)
+        self._die_rows(rows[dead & is_bottom], CAUSE_BOTTOM_PIPE)
+        # leave dead birds where they touched the pipe
+        d = rows[dead]
+        self.bird_y[d] = start_y[dead] + contact_t[dead] * (end_y[dead] - start_y[dead])
+
+    @staticmethod
+    def _first_contact(hit, t, order):
+        """Column of the earliest contact per row (ties by order)."""
+        earliest = t.min(axis=1, keepdims=True)
+        keys = np.where(hit & (t == earliest), order, _NO_EVENT)
+        return keys.argmin(axis=1)
+
+    def _die(self, mask, cause):
+        self.alive[mask] = False
+        self.death_cause[mask] = cause
+
+    def _die_rows(self, rows, cause):
+        self.alive[rows] = False
+        self.death_cause[rows] = cause
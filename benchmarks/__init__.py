@@ -0,0 +1,10 @@
+"""
+benchmarks: performance benchmarks for Flappy Bird.
+Measures headless simulation throughput, render frame rate, startup time,
+restart latency and peak memory, writes the results as JSON and compares
+them against a stored baseline.
+
+Usage (from the repository root):
+    python -m benchmarks                    # run, write bench_results.json, compare
+    python -m benchmarks --save-baseline    # record the current results as baseline
+"""
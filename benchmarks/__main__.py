@@ -0,0 +1,124 @@
+"""
+__main__.py: run the benchmark suite and compare against a baseline.
+Exits with status 1 when any metric regressed beyond its tolerance, and 2
+when a --quick run would be compared with a full-run baseline (or the
+reverse).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from benchmarks.cases import CASES, ROOT
+
+DEFAULT_OUT = 'bench_results.json'
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+# allowed relative slowdown before a metric counts as a regression
+DEFAULT_TOLERANCE = 0.10
+
+
+def run_cases(names, quick=False, out=sys.stdout):
+    """Run the named cases; return {metric name: metric}."""
+    metrics = {}
+    for name in names:
+        func, quick_kwargs = CASES[name]
+        start = time.perf_counter()
+        results = func(**quick_kwargs) if quick else func()
+        print(f"{name}: {time.perf_counter() - start:.1f}s", file=out)
+        metrics.update(results)
+    return metrics
+
+
+def compare(metrics, baseline, tolerance=DEFAULT_TOLERANCE, overrides=None, out=sys.stdout):
+    """
+    Print each metric against its baseline value.
+    Return the names of metrics that regressed by more than their tolerance
+    (overrides maps metric name -> tolerance).
+    """
+    overrides = overrides or {}
+    regressions = []
+    print(f"{'metric':<22}{'baseline':>12}{'current':>12}{'change':>9}", file=out)
+    for name, current in metrics.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<22}{'-':>12}{current['value']:>12.2f}{'new':>9}", file=out)
+            continue
+        old, new = base['value'], current['value']
+        change = (new - old) / old if old else 0.0
+        # positive worse = slower / bigger
+        worse = -change if current['better'] == 'higher' else change
+        tol = overrides.get(name, tolerance)
+        flag = ''
+        if worse > tol:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<22}{old:>12.2f}{new:>12.2f}{change:>+9.1%}{flag}", file=out)
+    return regressions
+
+
+def _tolerance_override(text):
+    name, _, value = text.partition('=')
+    if not value:
+        raise argparse.ArgumentTypeError("expected NAME=TOLERANCE")
+    return name, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Flappy Bird benchmarks")
+    parser.add_argument("cases", nargs='*', metavar="CASE",
+                        help=f"cases to run: {', '.join(CASES)} (default: all)")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations (smoke run)")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="results file (JSON)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline results file")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write the results to the baseline file instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative regression (default 0.10)")
+    parser.add_argument("--tolerance-for", type=_tolerance_override, action="append", default=[],
+                        metavar="METRIC=TOL", help="per-metric tolerance override")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case: {', '.join(unknown)}")
+
+    import pygame
+    metrics = run_cases(args.cases or list(CASES), args.quick)
+    results = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'quick': args.quick,
+        },
+        'metrics': metrics,
+    }
+    path = args.baseline if args.save_baseline else args.out
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"wrote {path}")
+    if args.save_baseline:
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    # quick runs use fewer iterations, so their numbers only compare with each other
+    baseline_quick = baseline.get('meta', {}).get('quick', False)
+    if baseline_quick != args.quick:
+        kinds = {True: "a --quick run", False: "a full run"}
+        print(f"not comparing: the results are from {kinds[args.quick]} but the baseline "
+              f"{args.baseline} is from {kinds[baseline_quick]}; rerun to match or save a new baseline")
+        return 2
+    regressions = compare(metrics, baseline['metrics'], args.tolerance, dict(args.tolerance_for))
+    if regressions:
+        print(f"regressed: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
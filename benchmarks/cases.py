@@ -0,0 +1,138 @@
+"""
+cases.py: the individual benchmarks.
+Each case returns {metric name: metric}, where a metric is a dict with the
+measured value, its unit and whether higher or lower is better. Throughput
+cases report the best of several repeats to reduce scheduler noise.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from simulation import DEFAULT_DT
+
+# repository root (run the startup child from here so imports resolve)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def metric(value, unit, better='higher'):
+    return {'value': value, 'unit': unit, 'better': better}
+
+
+def simulation(games=50, max_ticks=3600, repeat=3):
+    """Headless ticks/sec playing seeds 0..games-1 with the scripted policy."""
+    from rollout import play
+    best = 0.0
+    for _ in range(repeat):
+        ticks = 0
+        start = time.perf_counter()
+        for seed in range(games):
+            ticks += play(seed, max_ticks=max_ticks)[1]
+        best = max(best, ticks / (time.perf_counter() - start))
+    return {'sim_ticks_per_s': metric(best, 'ticks/s')}
+
+
+def _game(seed=0):
+    from game import Game
+    return Game(seed=seed)
+
+
+def render(frames=600, repeat=3):
+    """
+    Renderer.render frames/sec (dummy video driver) for the full and the
+    dirty-rect path. Each frame steps one scripted physics tick first; only
+    render() is timed.
+    """
+    from rollout import gap_policy
+    game = _game()
+    results = {}
+    for mode, dirty in (('full', False), ('dirty', True)):
+        game.renderer.dirty_rects = dirty
+        best = 0.0
+        for _ in range(repeat):
+            game.seed = 0
+            game.start_new_game()
+            game.renderer.invalidate()
+            elapsed = 0.0
+            for _ in range(frames):
+                if not game.sim.alive:
+                    game.start_new_game()
+                game._step(DEFAULT_DT, gap_policy(game.sim))
+                start = time.perf_counter()
+                game.renderer.render(game)
+                elapsed += time.perf_counter() - start
+            best = max(best, frames / elapsed)
+        results[f'render_{mode}_fps'] = metric(best, 'frames/s')
+    return results
+
+
+def restart(count=200):
+    """Median latency of Game.start_new_game."""
+    game = _game()
+    samples = []
+    for seed in range(count):
+        game.seed = seed
+        start = time.perf_counter()
+        game.start_new_game()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return {'restart_ms': metric(statistics.median(samples), 'ms', 'lower')}
+
+
+def startup(repeat=3):
+    """
+    Cold (fresh interpreter) and warm (same process) time to first frame,
+    and the peak RSS of the cold process. Reports the fastest of `repeat`
+    child processes.
+    """
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-m', 'benchmarks.startup'], cwd=ROOT,
+                             check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    results = {
+        'startup_cold_ms': metric(min(r['cold_ms'] for r in runs), 'ms', 'lower'),
+        'startup_warm_ms': metric(min(r['warm_ms'] for r in runs), 'ms', 'lower'),
+    }
+    if 'peak_rss_mb' in runs[0]:
+        results['startup_peak_rss_mb'] = metric(min(r['peak_rss_mb'] for r in runs), 'MiB', 'lower')
+    return results
+
+
+def memory(games=20, max_ticks=3600):
+    """Peak Python heap (tracemalloc) while simulating and rendering a game."""
+    import tracemalloc
+    from rollout import play, gap_policy
+    tracemalloc.start()
+    for seed in range(games):
+        play(seed, max_ticks=max_ticks)
+    sim_peak = tracemalloc.get_traced_memory()[1]
+    # restart tracing to measure the game view's peak on its own
+    tracemalloc.stop()
+    tracemalloc.start()
+    game = _game()
+    for _ in range(300):
+        if not game.sim.alive:
+            game.start_new_game()
+        game._step(DEFAULT_DT, gap_policy(game.sim))
+        game.renderer.render(game)
+    game_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'sim_peak_heap_kb': metric(sim_peak / 1024, 'KiB', 'lower'),
+        'game_peak_heap_kb': metric(game_peak / 1024, 'KiB', 'lower'),
+    }
+
+
+# name -> (function, quick keyword arguments)
+CASES = {
+    'simulation': (simulation, {'games': 10, 'repeat': 1}),
+    'render': (render, {'frames': 200, 'repeat': 1}),
+    'restart': (restart, {'count': 50}),
+    'startup': (startup, {'repeat': 1}),
+    'memory': (memory, {'games': 5}),
+}
@@ -0,0 +1,48 @@
+"""
+startup.py: time from process start to the first rendered frame.
+Run in a fresh interpreter by cases.startup(): it builds the Game the way
+run.main does and renders one frame (cold), then repeats that in the same
+process with modules imported and frame caches filled (warm). Prints one
+JSON object with both times (ms) and the peak RSS.
+"""
+import time
+
+_start = time.perf_counter()
+
+import json
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+
+def first_frame():
+    """Create the game from run.py's defaults and draw its first frame."""
+    import run
+    from game import Game
+    args = run.parse_args([])
+    game = Game(seed=args.seed, fixed_dt=args.fixed_dt, dirty_rects=args.dirty_rects)
+    game.renderer.render(game)
+    return game
+
+
+def main():
+    first_frame()
+    cold = (time.perf_counter() - _start) * 1000.0
+    start = time.perf_counter()
+    first_frame()
+    warm = (time.perf_counter() - start) * 1000.0
+    result = {'cold_ms': cold, 'warm_ms': warm}
+    try:
+        import resource
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result['peak_rss_mb'] = rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    except ImportError:
+        pass
+    json.dump(result, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
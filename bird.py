@@ -1,106 +1,100 @@
 import pygame
 from pygame.math import Vector2
-import settings
 import assets
+import settings
+from simulation import BirdBody, BIRD_BASE_FRAME
+
+# pitch of each prerotated sprite, steepest dive first (level only when tilt is off)
+TILT_ANGLES = (tuple(range(settings.BIRD_TILT_DOWN, settings.BIRD_TILT_UP + 1, settings.BIRD_TILT_STEP))
+               if settings.BIRD_TILT else (0,))
+_LAST_TILT = len(TILT_ANGLES) - 1
+
+
+def tilt_index(velocity):
+    """Index into TILT_ANGLES of the pitch for a vertical velocity (px/sec, down positive)."""
+    # nose up while rising, down while falling
+    i = int(round((-velocity * settings.BIRD_TILT_RATE - TILT_ANGLES[0]) / settings.BIRD_TILT_STEP))
+    return 0 if i < 0 else (_LAST_TILT if i > _LAST_TILT else i)
 
 
 class Bird(pygame.sprite.Sprite):
     """
-    A simple bird that can flap and is affected by gravity.
-    Manages its own animation and physics.
+    Sprite view of the bird. Physics and animation state live in a
+    simulation.BirdBody; this class owns the images and rect.
     """
-    def __init__(self, x, y):
+    def __init__(self, x, y, body=None):
         super().__init__()
-        # Position and physics
-        self.pos = Vector2(x, y)
-        self.velocity = 0
-
-        # Load and scale images
-        # Load bird wing frames and burnt sprite
-        base_img = assets.load_image("wings_level.png")
-        down_img = assets.load_image("wings_down.png")
-        up_img   = assets.load_image("wings_up.png")
-        # sprite to show after explosion
-        burnt_img = assets.load_image("bird_burnt.png")
-
-        # Smooth scale each image down by SCALE_FACTOR
-        def scale(img):
-            w, h = img.get_size()
-            return pygame.transform.smoothscale(img, (w // settings.SCALE_FACTOR, h // settings.SCALE_FACTOR))
-
-        # Smooth scale images down by SCALE_FACTOR
-        self.base_image = scale(base_img)
-        self.anim_frames = [scale(down_img), self.base_image, scale(up_img)]
-        # Pre-scale burnt image for post-explosion display (scaled down by an extra factor)
-        burnt_scaled = scale(burnt_img)
-        # further reduce size by factor 2.8 for a slightly smaller sprite
-        factor = 2.7
-        new_w = max(1, int(burnt_scaled.get_width() / factor))
-        new_h = max(1, int(burnt_scaled.get_height() / factor))
-        self.burnt_image = pygame.transform.smoothscale(
-            burnt_scaled,
-            (new_w, new_h)
-        )
-
-        # Animation state
-        self.anim_index = 0
-        self.anim_timer = 0
-        # ms per animation frame
-        self.frame_duration = settings.FRAME_DURATION
-        self.animating = False
-
-        # Sprite initial image and rect
-        self.image = self.base_image
-        self.rect = self.image.get_rect(center=(x, y))
+        # physics state (shared with the simulation when a body is given)
+        self.body = body if body is not None else BirdBody(x, y)
+
+        # Final-size wing frames (prebuilt bundle or scaled PNGs)
+        self.anim_frames = assets.load_frames('bird')
+        self.base_image = self.anim_frames[BIRD_BASE_FRAME]
+        # every frame prerotated to each tilt: tilted[angle][frame] = (image, rect, radius)
+        self.tilted = assets.load_rotated_frames('bird', TILT_ANGLES)
+
+        # Sprite initial image and rect (level, at rest)
+        self.image, self._local_rect, self.radius = self.tilted[tilt_index(0)][BIRD_BASE_FRAME]
+        self._update_rect()
         # freeze flag: skip updates when True (e.g., after explosion)
         self.frozen = False
 
+    @property
+    def burnt_image(self):
+        """Sprite to show after the explosion (loaded on first use)."""
+        return assets.load_frames('bird_burnt')[0]
+
+    @property
+    def pos(self):
+        """Current bird position as a Vector2 (read-only copy)."""
+        return Vector2(self.body.x, self.body.y)
+
+    @property
+    def velocity(self):
+        return self.body.velocity
+
+    @velocity.setter
+    def velocity(self, value):
+        self.body.velocity = value
+
+    @property
+    def animating(self):
+        return self.body.animating
+
+    @animating.setter
+    def animating(self, value):
+        self.body.animating = value
+
     def update(self, dt):
         """
-        Update bird physics, animation, constraints, and sprite rect.
-        dt: elapsed milliseconds since last frame.
+        Sync the sprite image and rect with the simulated body.
+        dt: elapsed milliseconds since last frame (physics is stepped by the simulation).
         """
         if self.frozen:
             return
-        self._update_physics(dt)
-        self._update_animation(dt)
-        self._apply_constraints()
+        self._update_animation()
         self._update_rect()
 
-    def _update_physics(self, dt):
-        """Apply gravity to velocity and update vertical position."""
-        dt_sec = dt / 1000.0
-        self.velocity += settings.GRAVITY * dt_sec
-        self.pos.y += self.velocity * dt_sec
-
-    def _update_animation(self, dt):
-        """Advance wing-flap animation frames."""
-        if self.animating:
-            self.anim_timer += dt
-            if self.anim_timer >= self.frame_duration:
-                self.anim_timer -= self.frame_duration
-                self.anim_index += 1
-                if self.anim_index >= len(self.anim_frames):
-                    self.animating = False
-        self.image = self.anim_frames[self.anim_index] if self.animating else self.base_image
-
-    def _apply_constraints(self):
-        """Prevent bird from moving above the top of the screen."""
-        half_h = self.image.get_height() / 2
-        if self.pos.y < half_h:
-            self.pos.y = half_h
-            self.velocity = 0
+    def _update_animation(self):
+        """Pick the wing-flap frame and tilt matching the body's state."""
+        body = self.body
+        frame = body.anim_index if body.animating else BIRD_BASE_FRAME
+        self.image, self._local_rect, self.radius = self.tilted[tilt_index(body.velocity)][frame]
 
     def _update_rect(self):
-        """Update the sprite rect based on current image and position."""
-        self.rect = self.image.get_rect(center=(int(self.pos.x), int(self.pos.y)))
+        """Centre the current image's cached rect on the body's position."""
+        self.rect = self._local_rect.move(int(self.body.x), int(self.body.y))
+
+    def show(self, image):
+        """Display an image from outside the tilt table (e.g. the burnt bird), untilted."""
+        self.image = image
+        self._local_rect = image.get_rect(center=(0, 0))
+        # the debug collision circle follows the shown image (half its height, like the tilt table)
+        self.radius = image.get_height() / 2
+        self._update_rect()
 
     def flap(self):
         """
         Apply an upward impulse and start wing flap animation.
         """
-        self.velocity = settings.JUMP_VELOCITY
-        if not self.animating:
-            self.animating = True
-            self.anim_index = 0
-            self.anim_timer = 0
\ No newline at end of file
+        self.body.flap()
@@ -0,0 +1,167 @@
+"""
+bundle.py: packed, memory-mappable bundle of final-size sprite frames.
+The build step decodes and scales every FRAME_SETS entry once and writes
+raw RGBA pixels plus a JSON index to sprites/frames.bundle. At runtime the
+file is memory-mapped and frames are wrapped with pygame.image.frombuffer,
+skipping PNG decoding and full-resolution surfaces. A bundle whose sources
+or scale settings changed is stale and ignored (callers fall back to PNGs),
+and a set whose frame keys (source areas, target sizes, transform) differ
+from the ones it was built with is not used.
+
+Build with:
+    python bundle.py
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+
+import pygame
+
+import settings
+
+BUNDLE_PATH = os.path.join(os.path.dirname(__file__), 'sprites', 'frames.bundle')
+# file layout: MAGIC, format version, index length, JSON index, pixel data
+MAGIC = b'FLPYBNDL'
+FORMAT_VERSION = 2
+_HEADER = struct.Struct('<8sII')
+# pixel data offsets are aligned to this many bytes
+_ALIGN = 16
+
+# open bundle state: (mmap, index, data offset) or False once found missing/stale
+_bundle = None
+
+
+def _source_stamps(sources):
+    """Return {filename: [size, mtime_ns]} used to detect stale bundles."""
+    stamps = {}
+    for name, path in sources.items():
+        st = os.stat(path)
+        stamps[name] = [st.st_size, st.st_mtime_ns]
+    return stamps
+
+
+def write_bundle(frame_sets, sources, keys, path=BUNDLE_PATH):
+    """
+    Write frame_sets ({name: [surfaces]}) to a bundle file.
+    sources: {filename: path} of the images the frames were built from.
+    keys: {name: [frame keys]} the frames were built for (see assets.FRAME_SETS).
+    """
+    index = {
+        'scale_factor': settings.SCALE_FACTOR,
+        'sources': _source_stamps(sources),
+        'keys': {name: _json_keys(keys[name]) for name in frame_sets},
+        'sets': {},
+    }
+    blobs = []
+    offset = 0
+    for name, frames in frame_sets.items():
+        entries = []
+        for surf in frames:
+            data = pygame.image.tostring(surf, 'RGBA')
+            w, h = surf.get_size()
+            entries.append([offset, w, h])
+            blobs.append(data)
+            pad = -len(data) % _ALIGN
+            if pad:
+                blobs.append(b'\0' * pad)
+            offset += len(data) + pad
+        index['sets'][name] = entries
+    index_bytes = json.dumps(index, sort_keys=True).encode('utf-8')
+    # pad the header so pixel data starts aligned
+    index_bytes += b' ' * (-(_HEADER.size + len(index_bytes)) % _ALIGN)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(index_bytes)))
+        f.write(index_bytes)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp, path)
+
+
+def _json_keys(keys):
+    """Frame keys as they read back from the JSON index (tuples become lists)."""
+    return json.loads(json.dumps(list(keys)))
+
+
+def _open(sources, path=BUNDLE_PATH):
+    """Map the bundle and validate it; return (mmap, index, data offset) or None."""
+    try:
+        f = open(path, 'rb')
+    except OSError:
+        return None
+    with f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+    try:
+        magic, version, index_len = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            mm.close()
+            return None
+        start = _HEADER.size
+        index = json.loads(bytes(mm[start:start + index_len]).decode('utf-8'))
+        if (index['scale_factor'] != settings.SCALE_FACTOR
+                or index['sources'] != _source_stamps(sources)
+                or not isinstance(index['keys'], dict) or not isinstance(index['sets'], dict)):
+            mm.close()
+            return None
+    except (struct.error, ValueError, KeyError, TypeError):
+        # truncated or corrupt bundle: unusable, fall back to the PNGs
+        mm.close()
+        return None
+    return mm, index, start + index_len
+
+
+def read_frames(name, sources, keys, convert=True):
+    """
+    Return the frames of set `name` as surfaces backed by the mapped bundle,
+    or None if the bundle is missing, stale, or lacks the set or built it
+    for other frame keys than `keys` (e.g. after an EXPLOSION_SCALE change).
+    convert=False leaves them in RGBA without touching the display.
+    """
+    global _bundle
+    if _bundle is None:
+        _bundle = _open(sources) or False
+    if not _bundle:
+        return None
+    mm, index, base = _bundle
+    entries = index['sets'].get(name)
+    if entries is None or index['keys'].get(name) != _json_keys(keys):
+        return None
+    view = memoryview(mm)
+    convert = convert and pygame.display.get_surface() is not None
+    frames = []
+    try:
+        for offset, w, h in entries:
+            start = base + offset
+            surf = pygame.image.frombuffer(view[start:start + w * h * 4], (w, h), 'RGBA')
+            # copy into the display's pixel format for fast blits
+            frames.append(surf.convert_alpha() if convert else surf)
+    except (ValueError, TypeError, pygame.error):
+        # entries past the end of a truncated file: use the PNGs
+        return None
+    return frames
+
+
+def build(path=BUNDLE_PATH):
+    """Decode and scale every frame set from the PNGs and write the bundle."""
+    import assets
+    frame_sets = {name: assets.build_frames(name) for name in assets.FRAME_SETS}
+    keys = {name: key_fn() for name, (_, key_fn) in assets.FRAME_SETS.items()}
+    write_bundle(frame_sets, assets.source_paths(), keys, path)
+    return frame_sets
+
+
+def main():
+    pygame.init()
+    frame_sets = build()
+    count = sum(len(frames) for frames in frame_sets.values())
+    print(f"Wrote {count} frames ({os.path.getsize(BUNDLE_PATH)} bytes) to {BUNDLE_PATH}")
+
+
+if __name__ == '__main__':
+    main()
+    sys.exit()
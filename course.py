@@ -0,0 +1,156 @@
+"""
+course.py: seeded, streaming pipe course.
+A Course lazily generates the pipes of a run as PipeSpecs in world
+coordinates (world x = screen x at the start of the game), a chunk at a
+time ahead of whoever reads it. Pipes are placed by world distance, so the
+course does not depend on frame timing or pipe speed, and one Course can be
+shared by any number of simulations (or kept and reused across runs).
+With feasible=True (COURSE_FEASIBLE), each new pipe is checked against the
+bird's reach from the previous one (see feasibility.py) and redrawn, or
+finally moved into reach, if the bird could not get there.
+"""
+import bisect
+import math
+import random
+from collections import namedtuple
+
+import settings
+from utils import random_gap, random_pipe_spacing
+
+# one pipe pair: left edge in world px, gap size, top pipe height, bounce zone flag
+PipeSpec = namedtuple('PipeSpec', 'world_x gap top_height bounce')
+
+# world x of the first pipe: INITIAL_PIPE_OFFSET ahead of the bird
+FIRST_PIPE_X = settings.BIRD_START_X + settings.INITIAL_PIPE_OFFSET
+# pipes generated per refill
+CHUNK = 32
+
+
+def draw_gap(rng, last_gap_center):
+    """
+    Draw the next pipe's gap from rng, limiting the shift from the previous
+    gap center. Return (gap, top_height, gap_center).
+    """
+    # randomized vertical gap with constrained vertical shift between pipes
+    gap = random_gap(rng=rng)
+    half_gap = gap / 2.0
+    # base allowable center range
+    min_c = settings.PIPE_MIN_HEIGHT + half_gap
+    max_c = settings.HEIGHT - settings.PIPE_MIN_HEIGHT - half_gap
+    if last_gap_center is not None:
+        prev = last_gap_center
+        # allow larger downward shift (bird diving) than upward (climbing)
+        lo = max(min_c, prev - settings.MAX_GAP_SHIFT_DOWN)
+        hi = min(max_c, prev + settings.MAX_GAP_SHIFT)
+        # fall back to the full range if the constraints are invalid
+        if lo <= hi:
+            min_c, max_c = lo, hi
+    # choose center position and compute top height
+    gap_center = rng.uniform(min_c, max_c)
+    top_h = int(gap_center - half_gap)
+    return gap, top_h, gap_center
+
+
+class Course:
+    """
+    The pipe course of one seed, generated on demand and kept.
+    Index it (course[i]) or iterate it for PipeSpecs in world-x order.
+    Gap centers are constrained by the previous pipe, so generation is
+    sequential; pipes already generated are O(1) to look up and seek()
+    is a binary search over them.
+    feasible: reject pipes the bird cannot reach (a different course per
+    seed than without).
+    """
+    def __init__(self, seed=None, feasible=settings.COURSE_FEASIBLE):
+        self.seed = seed
+        self._rng = random.Random(seed)
+        # reach lookup table for the feasibility check (None = unchecked);
+        # imported here because feasibility builds on simulation, which imports this module
+        self._envelope = None
+        if feasible:
+            from feasibility import envelope
+            self._envelope = envelope()
+        self._specs = []
+        # world x of each generated pipe (for seek)
+        self._xs = []
+        # generator state: next pipe's world x and the previous gap center
+        self._next_x = FIRST_PIPE_X
+        self._last_gap_center = None
+
+    def __len__(self):
+        """Number of pipes generated so far (the course itself is endless)."""
+        return len(self._specs)
+
+    def __getitem__(self, index):
+        specs = self._specs
+        while index >= len(specs):
+            self._extend(CHUNK)
+        return specs[index]
+
+    def __iter__(self):
+        index = 0
+        while True:
+            yield self[index]
+            index += 1
+
+    def _extend(self, count):
+        """Generate the next `count` pipes."""
+        rng = self._rng
+        append = self._specs.append
+        append_x = self._xs.append
+        for _ in range(count):
+            gap, top_h, center = self._draw_pipe(rng)
+            if self._envelope is not None:
+                gap, top_h, center = self._make_reachable(rng, gap, top_h, center)
+            self._last_gap_center = center
+            bounce = rng.random() < settings.PIPE_BOUNCE_CHANCE
+            append(PipeSpec(self._next_x, gap, top_h, bounce))
+            append_x(self._next_x)
+            self._next_x += random_pipe_spacing(rng)
+
+    def _draw_pipe(self, rng):
+        """Draw the next gap; return (gap, top height clamped to the screen, gap center)."""
+        gap, top_h, center = draw_gap(rng, self._last_gap_center)
+        # clamp the top height to the allowable range
+        max_top = settings.HEIGHT - settings.PIPE_MIN_HEIGHT - gap
+        top_h = max(min(top_h, max_top), settings.PIPE_MIN_HEIGHT)
+        return gap, top_h, center
+
+    def _make_reachable(self, rng, gap, top_h, center):
+        """
+        Redraw a pipe the bird cannot reach from the previous one (up to
+        COURSE_REDRAWS times), then move the last draw into reach.
+        """
+        env = self._envelope
+        specs = self._specs
+        prev = specs[-1] if specs else None
+        index = len(specs)
+        lo, hi = env.top_range(prev, gap, self._next_x, index)
+        redraws = 0
+        while not lo <= top_h <= hi and redraws < settings.COURSE_REDRAWS:
+            gap, top_h, center = self._draw_pipe(rng)
+            lo, hi = env.top_range(prev, gap, self._next_x, index)
+            redraws += 1
+        if lo <= top_h <= hi:
+            return gap, top_h, center
+        # closest top height to the draw that is both reachable and on screen
+        max_top = settings.HEIGHT - settings.PIPE_MIN_HEIGHT - gap
+        top_h = max(min(top_h, math.floor(hi)), math.ceil(lo))
+        top_h = max(min(top_h, max_top), settings.PIPE_MIN_HEIGHT)
+        return gap, top_h, top_h + gap / 2.0
+
+    def seek(self, world_x):
+        """Return the index of the first pipe whose left edge is at or after world_x."""
+        xs = self._xs
+        while not xs or xs[-1] < world_x:
+            self._extend(CHUNK)
+        return bisect.bisect_left(xs, world_x)
+
+    def window(self, left, right):
+        """Return the pipes whose world x-range overlaps [left, right]."""
+        index = self.seek(left - settings.PIPE_WIDTH)
+        found = []
+        while self[index].world_x <= right:
+            found.append(self[index])
+            index += 1
+        return found
@@ -0,0 +1,111 @@
+"""
+env.py: Gym-style environment wrapper around the headless simulation.
+FlappyEnv steps as fast as the CPU allows (no frame clock); rendering
+through the normal Game view is optional and can skip frames.
+
+Example:
+    env = FlappyEnv()
+    obs = env.reset(seed=1)
+    done = False
+    while not done:
+        obs, reward, done, info = env.step(policy(obs))
+"""
+import settings
+from simulation import Simulation, DEFAULT_DT
+
+# Observation layout: bird y, bird velocity, then for each of the next
+# OBS_PIPES pipes: horizontal distance to the pipe, gap top, gap bottom.
+OBS_PIPES = 2
+OBS_SIZE = 2 + 3 * OBS_PIPES
+# filler for pipes that have not spawned yet: far away, fully open gap
+_NO_PIPE = (float(settings.WIDTH), 0.0, float(settings.HEIGHT))
+
+# Reward shaping: per surviving step, per score point, and on death
+ALIVE_REWARD = 0.1
+SCORE_REWARD = 0.1
+DEATH_REWARD = -1.0
+
+
+class FlappyEnv:
+    """
+    Flappy Bird as a reset/step environment.
+    Actions are 0 (do nothing) or 1 (flap). Observations are tuples of
+    OBS_SIZE floats. Episodes end on death or after max_ticks steps.
+    render: draw through a Game window every `render_every` steps.
+    """
+    def __init__(self, dt=DEFAULT_DT, max_ticks=None, render=False, render_every=1):
+        self.dt = dt
+        self.max_ticks = max_ticks
+        self.render_every = max(1, render_every)
+        self.sim = None
+        # the Game view is only created when rendering is requested
+        self.game = None
+        if render:
+            from game import Game
+            self.game = Game()
+
+    def reset(self, seed=None):
+        """Start a new episode and return the first observation."""
+        if self.game is not None:
+            self.game.seed = seed
+            self.game.start_new_game()
+            self.sim = self.game.sim
+        else:
+            self.sim = Simulation(seed=seed)
+        return self._observe()
+
+    def step(self, action):
+        """
+        Apply one action and advance one simulation step.
+        Return (observation, reward, done, info).
+        """
+        sim = self.sim
+        score = sim.score
+        flap = bool(action)
+        if self.game is not None:
+            self.game._step(self.dt, flap)
+        else:
+            sim.step(flap, self.dt)
+        if sim.alive:
+            reward = ALIVE_REWARD + SCORE_REWARD * (sim.score - score)
+        else:
+            reward = DEATH_REWARD
+        truncated = self.max_ticks is not None and sim.ticks >= self.max_ticks
+        done = not sim.alive or truncated
+        if self.game is not None and (done or sim.ticks % self.render_every == 0):
+            self.render()
+        info = {
+            'score': sim.score,
+            'ticks': sim.ticks,
+            'flaps': sim.bird.flaps,
+            'death_cause': sim.death_cause,
+            'truncated': truncated,
+        }
+        return self._observe(), reward, done, info
+
+    def render(self):
+        """Draw the current state through the Game renderer."""
+        if self.game is None:
+            return
+        import pygame
+        # keep the window responsive without consuming game input
+        pygame.event.pump()
+        self.game.renderer.render(self.game)
+
+    def close(self):
+        if self.game is not None:
+            import pygame
+            pygame.quit()
+            self.game = None
+
+    def _observe(self):
+        """Build the fixed-size observation tuple."""
+        sim = self.sim
+        bird = sim.bird
+        obs = [bird.y, float(bird.velocity)]
+        pipes = sim.next_pipes(OBS_PIPES)
+        for pipe in pipes:
+            obs += (float(pipe.x - bird.x), float(pipe.top_height), float(pipe.bottom_y))
+        for _ in range(OBS_PIPES - len(pipes)):
+            obs += _NO_PIPE
+        return tuple(obs)
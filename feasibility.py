@@ -0,0 +1,289 @@
+"""
+feasibility.py: can the bird actually fly a course?
+An Envelope is a lookup table, built once from the bird's own physics, of
+how far the bird can climb (flapping every tick) and fall (not flapping)
+while it covers a horizontal distance at a given pipe speed. With it, the
+move from one gap to the next is checked in O(1): the bird leaves a gap
+somewhere between its top and bottom (minus the bird's radius) and must
+reach the next gap's range before its pipe arrives.
+
+The envelope errs in the bird's favour (smallest bird frame, distances
+measured from face to face so that only the pipe corners count at either
+end, times rounded up), so a pipe it rejects cannot be reached by any flap
+timing. The one thing it leaves out is the extra lift of a bounce-zone
+rebound. replay_flagged() checks that claim the hard way: it flies a
+flagged course in Simulation with an unlimited-budget Autopilot and
+reports whether the bird gets past the first flagged pipe.
+
+Course(feasible=True) (or COURSE_FEASIBLE) uses it to redraw unreachable
+pipes while generating; the command line analyzes many seeded courses
+(exit status 1 if any pipe is flagged, 2 if --verify cleared one):
+
+    python feasibility.py --seeds 100000 --pipes 100 --verify 50
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import settings
+from autopilot import Autopilot
+from course import Course
+from simulation import BirdBody, Simulation, BIRD_START_X, BIRD_START_Y, DEFAULT_DT, bird_frame_heights
+
+# problems reported by Envelope.check
+CLIMB = 'climb'  # the next gap is too far above
+DROP = 'drop'    # the next gap is too far below
+GAP = 'gap'      # the gap is narrower than the bird
+
+# seeds per task sent to a worker by analyze_seeds
+DEFAULT_CHUNKSIZE = 256
+
+
+def pipe_speed(index):
+    """Pipe speed while the bird flies toward course pipe `index` (one speed-up per pipe passed)."""
+    return settings.PIPE_SPEED + settings.PIPE_SPEEDUP * index
+
+
+class Envelope:
+    """
+    Reachable climb and fall (px) by horizontal distance and pipe speed.
+    rise[s][d] / fall[s][d]: speed row s covers PIPE_SPEED + s * PIPE_SPEEDUP,
+    distance column d covers up to d * FEASIBILITY_DISTANCE_STEP px.
+    """
+    def __init__(self, dt=DEFAULT_DT, distance_step=settings.FEASIBILITY_DISTANCE_STEP,
+                 max_speed=settings.FEASIBILITY_MAX_SPEED):
+        self.dt = dt
+        self.distance_step = distance_step
+        # the smallest animation frame gives the bird the most room
+        self.radius = min(bird_frame_heights()) / 2
+        # the longest pipe-to-pipe distance the course can draw
+        spacing = settings.PIPE_SPEED * settings.PIPE_SPAWN_INTERVAL / 1000.0
+        max_distance = max(spacing * (1 + settings.PIPE_VARIANCE), settings.INITIAL_PIPE_OFFSET)
+        self.columns = int(max_distance // distance_step) + 2
+        self.rows = max(1, int((max_speed - settings.PIPE_SPEED) // max(settings.PIPE_SPEEDUP, 1)) + 1)
+        # climb and fall after n ticks, from the bird's own update
+        ticks = int(math.ceil(self.columns * distance_step / (settings.PIPE_SPEED * dt / 1000.0))) + 1
+        rise_after, fall_after = _reach_by_ticks(ticks, dt)
+        self.rise = []
+        self.fall = []
+        for row in range(self.rows):
+            px_per_tick = pipe_speed(row) * dt / 1000.0
+            rise = array('f')
+            fall = array('f')
+            for col in range(self.columns):
+                # ticks to cover the column's distance, rounded up in the bird's favour
+                n = min(int(math.ceil(col * distance_step / px_per_tick)), ticks)
+                rise.append(rise_after[n])
+                fall.append(fall_after[n])
+            self.rise.append(rise)
+            self.fall.append(fall)
+
+    def reach(self, distance, index):
+        """(climb, fall) in px over `distance` px on the way to course pipe `index`."""
+        row = min(index, self.rows - 1)
+        # +1 px: pipes collide at whole-pixel screen positions
+        col = min(max(int(math.ceil((distance + 1) / self.distance_step)), 0), self.columns - 1)
+        return self.rise[row][col], self.fall[row][col]
+
+    def top_range(self, prev, gap, world_x, index):
+        """
+        Range (lo, hi) of top-pipe heights for a pipe at world_x with this
+        gap that the bird can reach after leaving `prev` (a PipeSpec, or
+        None for the start of the game).
+        """
+        r = self.radius
+        speed = pipe_speed(index)
+        # The distance runs from where the bird's centre leaves prev (its
+        # right face) to where it meets the new pipe's left face: before and
+        # after those points the circle only has to miss the pipes' corners,
+        # so the centre can still be up to r beyond the gap's edge there.
+        # Climbing or falling over the whole distance bounds every path that
+        # clears the corners.
+        if prev is None:
+            # the bird starts at rest at a single height
+            low = high = BIRD_START_Y
+            distance = world_x - BIRD_START_X
+            v_exit = 0.0
+        else:
+            # highest and lowest centre heights the bird can leave prev's gap at
+            high = prev.top_height + r
+            low = prev.top_height + prev.gap - r
+            distance = world_x - (prev.world_x + settings.PIPE_WIDTH)
+            # fastest fall the bird can have while staying in prev's gap
+            # for the time it takes to cross the pipe
+            cross = (settings.PIPE_WIDTH + 2 * r) / speed
+            v_exit = max(low - high, 0) / cross + settings.GRAVITY * cross / 2
+        rise, fall = self.reach(distance, index)
+        fall += v_exit * max(distance, 0) / speed
+        # the bird's centre must get below the new top pipe and above its bottom pipe
+        lo = high - rise + r - gap
+        hi = low + fall - r
+        return lo, hi
+
+    def check(self, prev, spec, index):
+        """
+        Check that course pipe `index` (spec) can be reached from prev.
+        Return None, or (problem, top height, lo, hi) with the reachable
+        top-height range.
+        """
+        if spec.gap <= 2 * self.radius:
+            return GAP, spec.top_height, 0, 0
+        lo, hi = self.top_range(prev, spec.gap, spec.world_x, index)
+        if spec.top_height < lo:
+            return CLIMB, spec.top_height, lo, hi
+        if spec.top_height > hi:
+            return DROP, spec.top_height, lo, hi
+        return None
+
+
+def _reach_by_ticks(ticks, dt):
+    """Climb (flapping every tick) and free fall from rest after 0..ticks steps."""
+    rise = array('f', [0.0])
+    fall = array('f', [0.0])
+    # far from the screen edges so no constraint clamps the bird
+    climber = BirdBody(0, 1e6)
+    faller = BirdBody(0, 1e6)
+    for _ in range(ticks):
+        climber.flap()
+        climber.update(dt)
+        faller.update(dt)
+        rise.append(1e6 - climber.y)
+        fall.append(faller.y - 1e6)
+    return rise, fall
+
+
+_envelope = None
+
+def envelope():
+    """Return the shared Envelope (built on first use)."""
+    global _envelope
+    if _envelope is None:
+        _envelope = Envelope()
+    return _envelope
+
+
+def analyze_course(course, pipes):
+    """Return (index, problem, top height, lo, hi) for each unreachable pipe among the first `pipes`."""
+    env = envelope()
+    problems = []
+    prev = None
+    for index in range(pipes):
+        spec = course[index]
+        problem = env.check(prev, spec, index)
+        if problem is not None:
+            problems.append((index,) + problem)
+        prev = spec
+    return problems
+
+
+def _analyze_chunk(task):
+    """Analyze the courses of a chunk of seeds; return [(seed, problems)] for the flagged ones."""
+    seeds, pipes, feasible = task
+    flagged = []
+    for seed in seeds:
+        problems = analyze_course(Course(seed, feasible=feasible), pipes)
+        if problems:
+            flagged.append((seed, problems))
+    return flagged
+
+
+def analyze_seeds(seeds, pipes, workers=None, chunksize=DEFAULT_CHUNKSIZE, feasible=False):
+    """
+    Analyze the first `pipes` pipes of each seed's course across a process
+    pool. Yield (seed, problems) for every course with an unreachable pipe.
+    """
+    seeds = list(seeds)
+    workers = workers or os.cpu_count() or 1
+    tasks = ((seeds[i:i + chunksize], pipes, feasible) for i in range(0, len(seeds), chunksize))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for flagged in pool.map(_analyze_chunk, tasks):
+            yield from flagged
+
+
+def replay_flagged(seed, problems, feasible=False):
+    """
+    Fly a flagged course in Simulation with an unlimited-budget Autopilot up
+    to its first flagged pipe. Return True if the bird got past it without a
+    bounce (the envelope was wrong), False if it died there, or None if the
+    test says nothing (the bird died earlier, or bounced on the way).
+    """
+    target = problems[0][0]
+    sim = Simulation(course=Course(seed, feasible=feasible))
+    pilot = Autopilot(budget=math.inf)
+    # course index of the first pipe the bird has not passed yet
+    reached = 0
+    while sim.alive and reached <= target:
+        sim.step(pilot(sim), DEFAULT_DT)
+        reached = sim.next_pipe - len(sim.pipes) + sim.track.passed
+    if reached > target:
+        return None if sim.bounces else True
+    return False if reached == target else None
+
+
+def _replay_task(task):
+    """Replay one flagged course in a worker; return (seed, first problem, verdict)."""
+    seed, problems, feasible = task
+    return seed, problems[0], replay_flagged(seed, problems, feasible)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find unreachable pipes in seeded courses")
+    parser.add_argument('--seeds', type=int, default=10000, help="number of seeds to analyze")
+    parser.add_argument('--start', type=int, default=0, help="first seed")
+    parser.add_argument('--pipes', type=int, default=100, help="pipes analyzed per course")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--feasible', action='store_true',
+                        help="analyze courses generated with feasibility checks on")
+    parser.add_argument('--list', action='store_true', help="print every unreachable pipe")
+    parser.add_argument('--verify', type=int, default=0, metavar='N',
+                        help="replay the first N flagged courses with the autopilot")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    courses = segments = 0
+    first = {}
+    kinds = {CLIMB: 0, DROP: 0, GAP: 0}
+    to_verify = []
+    for seed, problems in analyze_seeds(range(args.start, args.start + args.seeds), args.pipes,
+                                        args.workers, feasible=args.feasible):
+        courses += 1
+        segments += len(problems)
+        if len(to_verify) < args.verify:
+            to_verify.append((seed, problems, args.feasible))
+        index = problems[0][0]
+        first[index // 10] = first.get(index // 10, 0) + 1
+        for problem in problems:
+            kinds[problem[1]] += 1
+            if args.list:
+                index, kind, top, lo, hi = problem
+                print(f"seed {seed} pipe {index}: {kind}, top {top} outside reachable {lo:.0f}..{hi:.0f}")
+    elapsed = time.perf_counter() - start
+    print(f"{args.seeds} courses x {args.pipes} pipes in {elapsed:.1f}s "
+          f"({args.seeds / elapsed:.0f} courses/s)")
+    print(f"{courses} courses ({courses / max(args.seeds, 1):.1%}) with {segments} unreachable pipes: "
+          + ", ".join(f"{n} {kind}" for kind, n in kinds.items()))
+    for bucket in sorted(first):
+        print(f"  first unreachable pipe {bucket * 10}-{bucket * 10 + 9}: {first[bucket]} courses")
+    if to_verify:
+        verdicts = {True: 0, False: 0, None: 0}
+        with ProcessPoolExecutor(max_workers=args.workers or os.cpu_count() or 1) as pool:
+            for seed, problem, cleared in pool.map(_replay_task, to_verify):
+                verdicts[cleared] += 1
+                if cleared:
+                    index, kind, top, lo, hi = problem
+                    print(f"seed {seed} pipe {index}: flagged {kind} (top {top} outside "
+                          f"{lo:.0f}..{hi:.0f}) but the autopilot cleared it")
+        print(f"replayed {len(to_verify)} flagged courses: {verdicts[False]} died at the flagged pipe, "
+              f"{verdicts[True]} cleared it, {verdicts[None]} inconclusive")
+        if verdicts[True]:
+            return 2
+    return 1 if courses else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
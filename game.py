@@ -1,13 +1,19 @@
+import random
 import sys
 from enum import Enum
 
 import pygame
 
 import settings
-import random
-from utils import circle_rect_collision, random_gap, random_spawn_interval
+from simulation import Simulation, DEFAULT_DT
 from input_handler import InputHandler
 from renderer import Renderer
+from preload import AssetPreloader
+from profiler import FrameProfiler
+from latency import LatencyProbe
+from runstats import RunStatsSink
+from autopilot import Autopilot
+import replay
 import assets
 
 # Explosion animation sprite
@@ -17,22 +23,8 @@ class Explosion(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
         if not Explosion.frames:
-            sheet = assets.load_image('explosion_sheet.png')
-            sheet_w, sheet_h = sheet.get_size()
-            # sprite sheet layout: 4 columns, 4 rows of frames
-            cols, rows = 4, 4
-            frame_w, frame_h = sheet_w // cols, sheet_h // rows
-            # scale explosion frames by a larger factor for visibility
-            EXPLOSION_SCALE = 4
-            # target dimensions after scaling
-            target_w = (frame_w // settings.SCALE_FACTOR) * EXPLOSION_SCALE
-            target_h = (frame_h // settings.SCALE_FACTOR) * EXPLOSION_SCALE
-            for row in range(rows):
-                for col in range(cols):
-                    rect = pygame.Rect(col * frame_w, row * frame_h, frame_w, frame_h)
-                    image = sheet.subsurface(rect).copy()
-                    image = pygame.transform.smoothscale(image, (target_w, target_h))
-                    Explosion.frames.append(image)
+            # 16 final-size frames cut from the 4x4 sprite sheet
+            Explosion.frames = assets.load_frames('explosion')
         self.image = Explosion.frames[0]
         self.rect = self.image.get_rect(center=(int(x), int(y)))
         self.frame_index = 0
@@ -51,9 +43,6 @@ class Explosion(pygame.sprite.Sprite):
                 self.image = Explosion.frames[self.frame_index]
                 self.rect = self.image.get_rect(center=self.rect.center)
 
-# custom event for spawning pipes
-SPAWN_PIPE = pygame.USEREVENT + 1
-
 class GameState(Enum):
     PLAYING = 1
     EXPLODING = 2
@@ -66,122 +55,215 @@ except ImportError:
     from sprites.bird import Bird
 ## Import Pipe from root-level pipe.py; fallback to sprites/pipe.py
 try:
-    from pipe import Pipe
+    from pipe import PipePool
 except ImportError:
-    from sprites.pipe import Pipe
-# Utility functions and handlers
-from utils import circle_rect_collision, random_gap, random_spawn_interval
+    from sprites.pipe import PipePool
+# Handlers
 from input_handler import InputHandler
 from renderer import Renderer
 
 
 class Game:
     """
-    Main game class: handles initialization, the game loop, events, updates, and rendering.
+    Main game class: handles initialization, the game loop, events, and rendering.
+    Game logic is stepped by a headless Simulation; Game keeps the sprites in sync.
+    seed: seeds every game's random source so runs are reproducible.
+    fixed_dt: physics step in ms; when set, frame time is fed through an
+    accumulator so physics runs at a fixed rate independent of rendering.
+    dirty_rects: redraw only changed screen regions (see Renderer).
+    profile: time each loop phase with a FrameProfiler; profile_out is the
+    JSON/CSV file the samples are written to on exit.
+    record: append every game to this replay file (see replay.py); forces a
+    fixed timestep and a known seed per game so the replays are exact.
+    autopilot: let an Autopilot fly the bird and restart after each game
+    (attract mode); a non-empty string is the file its memo table is
+    loaded from and saved to. Forces a fixed timestep, which the planner
+    simulates ahead with.
+    low_latency: poll input after the frame sleep and right before physics,
+    with the event queue restricted to the events InputHandler uses and a
+    busy-wait frame cap (more precise than sleeping, at the cost of CPU).
+    latency: follow each flap key press to the frame that shows it with a
+    LatencyProbe; latency_out is the JSON/CSV file it is written to on exit.
+    stats: stream a record of every finished game to this .csv/.npz file
+    (see runstats.py).
     """
-    def __init__(self):
+    def __init__(self, seed=None, fixed_dt=settings.FIXED_TIMESTEP, dirty_rects=settings.DIRTY_RECTS,
+                 profile=settings.PROFILE, profile_out=None, record=None, autopilot=None,
+                 low_latency=settings.LOW_LATENCY, latency=False, latency_out=None, stats=None):
         pygame.init()
         self.screen = pygame.display.set_mode((settings.WIDTH, settings.HEIGHT))
         pygame.display.set_caption("Flappy Bird")
+        # warm deferred sprites (explosion, burnt bird) on a worker thread
+        self.preloader = AssetPreloader().start()
         self.clock = pygame.time.Clock()
         self.font = pygame.font.SysFont(None, 24)
         # initialize or reset game data
         self.running = True
         self.debug = False  # debug mode: draw collider
         self.collision = True  # collision detection enabled
+        # deterministic mode configuration
+        self.seed = seed
+        self.fixed_dt = fixed_dt
+        # replay recorder (None when not recording)
+        self.recorder = None
+        if record:
+            self.recorder = replay.Recorder(record)
+            if self.fixed_dt is None:
+                self.fixed_dt = DEFAULT_DT
+        # lookahead autopilot (None when the player flies)
+        self.autopilot = None
+        self.autopilot_table = autopilot or None
+        if autopilot is not None:
+            if self.fixed_dt is None:
+                self.fixed_dt = DEFAULT_DT
+            self.autopilot = Autopilot(dt=self.fixed_dt)
+            if self.autopilot_table:
+                self.autopilot.load(self.autopilot_table)
         # input and rendering handlers
         self.input_handler = InputHandler()
-        self.renderer = Renderer(self.screen, self.font)
+        self.low_latency = low_latency
+        if low_latency:
+            self.input_handler.restrict_events()
+        self.renderer = Renderer(self.screen, self.font, dirty_rects)
+        # per-phase frame timings (None when profiling is disabled)
+        self.profiler = FrameProfiler() if profile or profile_out else None
+        self.profile_out = profile_out
+        if self.profiler is not None and self.autopilot is not None:
+            self.profiler.wrap(self.autopilot, 'decide', 'autopilot')
+        # flap input-to-photon timings (None when not measured)
+        self.latency = LatencyProbe() if latency or latency_out else None
+        self.latency_out = latency_out
+        # per-game statistics sink (None when not collecting)
+        self.stats = RunStatsSink(stats) if stats else None
+        # recycled pipe sprites, kept across restarts
+        self.pipe_pool = PipePool()
+        self.pipes = pygame.sprite.Group()
+        self._pipe_sprites = {}
         self.start_new_game()
 
     def start_new_game(self):
         """
-        Initialize or reset game state: bird, pipes, score, timers.
+        Initialize or reset game state: simulation, bird and pipe sprites.
         """
-        # Bird and sprites
-        self.bird = Bird(100, settings.HEIGHT // 2)
+        seed = self.seed
+        if self.recorder is not None:
+            # a replay needs the seed, so draw one rather than seeding from entropy
+            if seed is None:
+                seed = random.randrange(2 ** 63)
+            self.recorder.begin(seed, self.fixed_dt, self.collision)
+        self.sim = Simulation(collision=self.collision, seed=seed)
+        if self.profiler is not None:
+            self.profiler.instrument(self.sim)
+        # unsimulated frame time carried over in fixed-step mode (ms)
+        self.accumulator = 0.0
+        # Bird and sprites (the sprite draws the simulated bird body)
+        self.bird = Bird(self.sim.bird.x, self.sim.bird.y, body=self.sim.bird)
         self.all_sprites = pygame.sprite.Group(self.bird)
-        # Pipes
-        self.pipes = pygame.sprite.Group()
-        # reset previous gap center history
-        self.last_gap_center = None
-        # dynamic pipe speed
-        self.pipe_speed = settings.PIPE_SPEED
-        # reset score and game state
-        self.score = 0
+        # Pipes: one pooled sprite per simulated pipe body
+        for sprite in self._pipe_sprites.values():
+            self.pipe_pool.release(sprite)
+        self._pipe_sprites.clear()
+        self._sync_pipes()
         self.state = GameState.PLAYING
-        # spawn two initial pipes at game start for consistent horizontal spacing
-        initial_x = self.bird.pos.x + settings.INITIAL_PIPE_OFFSET
-        # determine initial spawn interval (ms)
-        interval = random_spawn_interval(self.pipe_speed)
-        # first pipe at offset from bird
-        self._spawn_pipe(initial_x)
-        # second pipe positioned spawn_distance further right
-        spawn_distance = self.pipe_speed * (interval / 1000.0)
-        second_x = int(initial_x + spawn_distance)
-        self._spawn_pipe(second_x)
-        # schedule next pipe spawn after the interval
-        pygame.time.set_timer(SPAWN_PIPE, interval)
+        # time spent on the game-over screen (ms), for the autopilot's restart
+        self.game_over_time = 0
+
+    @property
+    def score(self):
+        return self.sim.score
+
+    @property
+    def pipe_speed(self):
+        return self.sim.pipe_speed
 
     def run(self):
         """
         Main loop: process input, update state, draw, repeat until exit.
+        With profiling enabled each phase is timed; the checks on `prof`
+        are the only cost when it is disabled. In low-latency mode input is
+        polled after the sprite updates, immediately before physics.
         """
+        prof = self.profiler
+        probe = self.latency
+        low_latency = self.low_latency
+        tick = self.clock.tick_busy_loop if low_latency else self.clock.tick
         while self.running:
-            dt = self.clock.tick(settings.FPS)
-            self.handle_events()
+            dt = tick(settings.FPS)
+            if prof is not None:
+                t = prof.begin_frame(dt)
+            if not low_latency:
+                self.handle_events()
+                if prof is not None:
+                    t = prof.mark('handle_events', t)
+            # pick up background-loaded frames until all are installed
+            if not self.preloader.ready:
+                self.preloader.poll()
             # always update sprite animations (e.g., explosions)
             self.all_sprites.update(dt)
+            if prof is not None:
+                t = prof.mark('sprites_update', t)
+            if low_latency:
+                self.handle_events()
+                if prof is not None:
+                    t = prof.mark('handle_events', t)
             # update game physics and logic only while playing
+            # (the simulation's phases are timed by the instrumented Simulation)
             if self.state == GameState.PLAYING:
-                # move pipes, spawn as scheduled
-                self._update_pipes(dt)
-                # handle any collisions
-                self._check_collisions()
-                # when collision detection is off, clamp bird to bottom of screen
-                if not self.collision:
-                    half_h = self.bird.image.get_height() / 2
-                    bottom_limit = settings.HEIGHT - half_h
-                    if self.bird.pos.y > bottom_limit:
-                        self.bird.pos.y = bottom_limit
-                        self.bird.velocity = 0
-                        # update sprite rect to reflect clamped position
-                        self.bird._update_rect()
+                self._advance(dt)
+            if prof is not None:
+                t = prof.clock()
             # transition to game over after explosion animation
             if self.state == GameState.EXPLODING:
                 # if no explosion sprites remain, finalize game over and show burnt bird sprite
                 if not any(isinstance(s, Explosion) for s in self.all_sprites):
+                    self._need_frames('bird_burnt')
                     # stop any wing animation
                     self.bird.animating = False
-                    # use burnt bird image
+                    # use burnt bird image, positioned at the last collision position
                     try:
-                        self.bird.image = self.bird.burnt_image
+                        self.bird.show(self.bird.burnt_image)
                     except AttributeError:
                         # fallback to base image if burnt sprite unavailable
-                        self.bird.image = self.bird.base_image
+                        self.bird.show(self.bird.base_image)
                     # freeze bird in place
                     self.bird.frozen = True
-                    # reposition sprite at last collision position
-                    self.bird.rect = self.bird.image.get_rect(
-                        center=(int(self.bird.pos.x), int(self.bird.pos.y))
-                    )
                     # add bird back to sprites for rendering
                     self.all_sprites.add(self.bird)
                     self.state = GameState.GAME_OVER
+            elif self.state == GameState.GAME_OVER and self.autopilot is not None:
+                # attract mode: start the next game after a pause
+                self.game_over_time += dt
+                if self.game_over_time >= settings.AUTOPILOT_RESTART_DELAY:
+                    self.start_new_game()
+            if prof is not None:
+                t = prof.mark('exploding_scan', t)
             # always render frame
             self.renderer.render(self)
+            if probe is not None:
+                probe.flipped()
+            if prof is not None:
+                prof.mark('render', t)
+                prof.end_frame()
+        if prof is not None and self.profile_out:
+            prof.export(self.profile_out)
+        if probe is not None and self.latency_out:
+            probe.export(self.latency_out)
+        if self.recorder is not None:
+            # keep a game still in progress (recorded as alive)
+            self.recorder.close(self.sim)
+        if self.stats is not None:
+            self.stats.close()
+        if self.autopilot_table:
+            self.autopilot.save(self.autopilot_table)
         pygame.quit()
 
     def handle_events(self):
         """
-        Handle all pending pygame events: spawn pipes and process input actions.
+        Handle all pending pygame events and process input actions.
         """
         events = pygame.event.get()
-        # spawn pipes via custom event
-        for event in events:
-            if event.type == SPAWN_PIPE and self.state == GameState.PLAYING:
-                self._spawn_pipe()
-                self._schedule_next_pipe()
+        if self.latency is not None:
+            self.latency.polled()
         # process user input
         actions = self.input_handler.process(events)
         if actions['quit']:
@@ -196,155 +278,86 @@ class Game:
             else:
                 self.debug = False
                 self.collision = True
+            if self.recorder is not None and self.sim.collision != self.collision:
+                self.recorder.action(self.sim.ticks, replay.ACTION_COLLISION_ON if self.collision
+                                     else replay.ACTION_COLLISION_OFF)
+            self.sim.collision = self.collision
         if actions['restart'] and self.state == GameState.GAME_OVER:
             self.start_new_game()
         if actions['flap'] and self.state == GameState.PLAYING:
+            if self.recorder is not None:
+                self.recorder.action(self.sim.ticks, replay.ACTION_FLAP)
             self.bird.flap()
-    
-    def _spawn_pipe(self, x=None):
-        """
-        Create a new Pipe at the right edge and add it to the list.
-        """
-        # determine horizontal spawn position
-        if x is None:
-            x = settings.WIDTH
-        # randomized vertical gap with constrained vertical shift between pipes
-        gap = random_gap()
-        half_gap = gap / 2.0
-        # determine allowable center of gap
-        if hasattr(self, 'last_gap_center') and self.last_gap_center is not None:
-            prev = self.last_gap_center
-            # base allowable center range
-            min_c = settings.PIPE_MIN_HEIGHT + half_gap
-            max_c = settings.HEIGHT - settings.PIPE_MIN_HEIGHT - half_gap
-            # allow larger downward shift (bird diving) than upward (climbing)
-            up_shift = settings.MAX_GAP_SHIFT
-            down_shift = settings.MAX_GAP_SHIFT_DOWN
-            min_c = max(min_c, prev - down_shift)
-            max_c = min(max_c, prev + up_shift)
-            if min_c > max_c:
-                # fallback to full range if constraints invalid
-                min_c = settings.PIPE_MIN_HEIGHT + half_gap
-                max_c = settings.HEIGHT - settings.PIPE_MIN_HEIGHT - half_gap
-        else:
-            # first pipe: full vertical range
-            min_c = settings.PIPE_MIN_HEIGHT + half_gap
-            max_c = settings.HEIGHT - settings.PIPE_MIN_HEIGHT - half_gap
-        # choose center position and compute top height
-        gap_center = random.uniform(min_c, max_c)
-        top_h = int(gap_center - half_gap)
-        pipe = Pipe(x, speed=self.pipe_speed, gap=gap, top_height=top_h)
-        self.pipes.add(pipe)
-        # remember center for next constraint
-        self.last_gap_center = gap_center
-
-    def _schedule_next_pipe(self):
-        """Schedule the next pipe spawn via a Pygame timer event."""
-        interval = random_spawn_interval(self.pipe_speed)
-        pygame.time.set_timer(SPAWN_PIPE, interval)
+            if self.latency is not None:
+                self.latency.flapped()
 
-    def _update_pipes(self, dt):
+    def _advance(self, frame_dt):
         """
-        Update existing pipes, spawn new ones, and remove off-screen pipes.
+        Run the physics for one rendered frame: a single variable step, or
+        as many fixed steps as the accumulated frame time allows.
         """
-        # move, score, and cull pipes
-        self._move_and_score_pipes(dt)
-    
-    
-
-    def _move_and_score_pipes(self, dt):
-        """Move pipes, award score for passed pipes, and remove off-screen pipes."""
-        self.pipes.update(dt)
-        for pipe in list(self.pipes):
-            # scoring: bird passes pipe
-            if not pipe.passed and pipe.rect.right < self.bird.pos.x:
-                pipe.passed = True
-                self.score += 100 if pipe.bounced else 10
-                self.pipe_speed += 5
-                for p in self.pipes:
-                    p.speed = self.pipe_speed
-            if pipe.off_screen():
-                self.pipes.remove(pipe)
-
-
-    def _check_collisions(self):
-        """Check for bird collisions with ground and pipes."""
-        if not self.collision:
+        if self.fixed_dt is None:
+            self._step(frame_dt)
             return
-        self._handle_ground_collision()
-        if self.state == GameState.PLAYING:
-            self._handle_pipe_collisions()
+        self.accumulator += frame_dt
+        steps = 0
+        while self.accumulator >= self.fixed_dt and self.state == GameState.PLAYING:
+            self._step(self.fixed_dt)
+            self.accumulator -= self.fixed_dt
+            steps += 1
+            if steps >= settings.MAX_STEPS_PER_FRAME:
+                # drop the backlog rather than spiral after a long hitch
+                self.accumulator = 0.0
+                break
 
-    def _handle_ground_collision(self):
-        """Mark game over if bird hits the ground."""
-        if self.bird.rect.bottom >= settings.HEIGHT:
+    def _step(self, dt, flap=False):
+        """Advance the simulation by dt ms and bring the sprites up to date."""
+        if self.autopilot is not None and self.autopilot(self.sim):
+            if self.recorder is not None:
+                self.recorder.action(self.sim.ticks, replay.ACTION_FLAP)
+            self.bird.flap()
+        alive = self.sim.step(flap, dt)
+        if self.latency is not None:
+            self.latency.stepped()
+        self.bird.update(dt)
+        self._sync_pipes()
+        self.pipes.update(dt)
+        if not alive:
+            if self.recorder is not None:
+                self.recorder.end(self.sim)
+            if self.stats is not None:
+                self.stats.add(self.sim)
+            # frames are normally preloaded by now; otherwise finish them first
+            self._need_frames('explosion')
             # spawn explosion at bird position and remove bird
-            explosion = Explosion(self.bird.rect.centerx, self.bird.rect.centery)
+            explosion = Explosion(self.sim.bird.x, self.sim.bird.y)
             self.all_sprites.add(explosion)
             self.all_sprites.remove(self.bird)
             self.state = GameState.EXPLODING
 
-    def _handle_pipe_collisions(self):
-        """Check circle-rect collisions between bird and each pipe segment."""
-        cx, cy = self.bird.pos.x, self.bird.pos.y
-        radius = self.bird.image.get_height() / 2
-        for pipe in self.pipes:
-            # top pipe: always fatal
-            if circle_rect_collision(cx, cy, radius, pipe.top_rect):
-                # bird hit top pipe: spawn explosion and remove bird
-                explosion = Explosion(cx, cy)
-                self.all_sprites.add(explosion)
-                self.all_sprites.remove(self.bird)
-                self.state = GameState.EXPLODING
-                return
-            # bottom pipe: may bounce off top edge
-            if circle_rect_collision(cx, cy, radius, pipe.bottom_rect):
-                cy_clamped = max(pipe.bottom_rect.top, min(cy, pipe.bottom_rect.bottom))
-                if pipe.bounce_zone and cy_clamped == pipe.bottom_rect.top and self.bird.velocity > 0:
-                    pipe.bounced = True
-                    self.bird.velocity = -self.bird.velocity * settings.RESTITUTION
-                    self.bird.pos.y = pipe.bottom_rect.top - radius
-                    self.bird.rect = self.bird.image.get_rect(center=(int(self.bird.pos.x), int(self.bird.pos.y)))
-                    continue
-                # fatal collision with bottom pipe: spawn explosion and remove bird
-                explosion = Explosion(cx, cy)
-                self.all_sprites.add(explosion)
-                self.all_sprites.remove(self.bird)
-                self.state = GameState.EXPLODING
-                return
+    def _need_frames(self, name):
+        """
+        Make sure a preloaded frame set is in the frame cache: wait briefly
+        for the preloader, then build it here if the worker has not
+        delivered it (still busy, failed, or gone).
+        """
+        if not self.preloader.wait(name, settings.PRELOAD_WAIT_TIMEOUT) or not assets.frames_cached(name):
+            assets.load_frames(name)
+
+    def _sync_pipes(self):
+        """Create sprites for newly spawned pipes and drop those the simulation culled."""
+        live = set(self.sim.pipes)
+        for body in self.sim.pipes:
+            if body not in self._pipe_sprites:
+                sprite = self.pipe_pool.acquire(body)
+                self._pipe_sprites[body] = sprite
+                self.pipes.add(sprite)
+        for body in list(self._pipe_sprites):
+            if body not in live:
+                self.pipe_pool.release(self._pipe_sprites.pop(body))
 
     def draw(self):
         """
         Draw background, sprites, and UI.
         """
-        self.screen.fill(settings.BACKGROUND_COLOR)
-        # draw pipes behind the bird
-        self.pipes.draw(self.screen)
-        # draw bird and other sprites
-        self.all_sprites.draw(self.screen)
-        # draw instructions and score in white on one line
-        text_color = settings.TEXT_COLOR
-        info = f"Press SPACE to flap, Q to quit   Score: {self.score}"
-        # indicate collision detection disabled
-        if not self.collision:
-            info += "*"
-        # debug: show pipe speed
-        if self.debug:
-            info += f"   Speed: {int(self.pipe_speed)}"
-        info_surf = self.font.render(info, True, text_color)
-        self.screen.blit(info_surf, (10, 10))
-        # draw game over overlay in white
-        if self.state == GameState.GAME_OVER:
-            over_text = "Game Over! Press R to restart"
-            over_surf = self.font.render(over_text, True, text_color)
-            # center the text
-            ox = settings.WIDTH // 2 - over_surf.get_width() // 2
-            oy = settings.HEIGHT // 2 - over_surf.get_height() // 2
-            self.screen.blit(over_surf, (ox, oy))
-        # debug: draw collision circle
-        if self.debug:
-            # circle centered on bird with radius = half sprite height
-            radius = int(self.bird.image.get_height() / 2)
-            center = (int(self.bird.pos.x), int(self.bird.pos.y))
-            pygame.draw.circle(self.screen, settings.DEBUG_CIRCLE_COLOR, center, radius, 1)
-        pygame.display.flip()
\ No newline at end of file
+        self.renderer.render(self)
@@ -0,0 +1,85 @@
+"""
+hud.py: cached HUD text rendering.
+Static labels are rasterized once, numbers are composed from a
+pre-rendered digit atlas, and the composed HUD line is kept until one of
+its values changes, so the font is not rendered every frame.
+"""
+import pygame
+import settings
+
+# characters pre-rendered into the atlas for dynamic values
+ATLAS_CHARS = "0123456789*"
+# labels of the HUD line
+INSTRUCTIONS = "Press SPACE to flap, Q to quit   Score: "
+SPEED_LABEL = "   Speed: "
+
+
+class Hud:
+    """
+    Builds HUD surfaces from cached pieces.
+    renders counts font rasterizations (labels and atlas glyphs only).
+    """
+    def __init__(self, font, color=settings.TEXT_COLOR):
+        self.font = font
+        self.color = color
+        self.renders = 0
+        self._labels = {}
+        self._atlas = {ch: self.label(ch) for ch in ATLAS_CHARS}
+        self._line_key = None
+        self._line = None
+        # values_line() cache: labels -> (values, surface)
+        self._value_lines = {}
+
+    def label(self, text):
+        """Return a cached rendering of static text."""
+        surf = self._labels.get(text)
+        if surf is None:
+            surf = self.font.render(text, True, self.color)
+            self._labels[text] = surf
+            self.renders += 1
+        return surf
+
+    def info_line(self, score, collision=True, speed=None):
+        """
+        Return the instructions/score line: score, '*' when collisions are
+        off, and pipe speed when given. Recomposed only when a value changes.
+        """
+        key = (score, collision, speed)
+        if key != self._line_key:
+            pieces = [self.label(INSTRUCTIONS)] + self._glyphs(str(score))
+            if not collision:
+                pieces.append(self._atlas['*'])
+            if speed is not None:
+                pieces += [self.label(SPEED_LABEL)] + self._glyphs(str(int(speed)))
+            self._line = _compose(pieces)
+            self._line_key = key
+        return self._line
+
+    def values_line(self, labels, values):
+        """
+        Return a line of labels each followed by its integer value, e.g.
+        (("Alive: ", "   Best: "), (12, 340)). Recomposed only when a value changes.
+        """
+        cached = self._value_lines.get(labels)
+        if cached is None or cached[0] != values:
+            pieces = []
+            for label, value in zip(labels, values):
+                pieces += [self.label(label)] + self._glyphs(str(int(value)))
+            cached = (values, _compose(pieces))
+            self._value_lines[labels] = cached
+        return cached[1]
+
+    def _glyphs(self, text):
+        return [self._atlas[ch] for ch in text]
+
+
+def _compose(pieces):
+    """Blit surfaces side by side onto one transparent surface."""
+    width = sum(p.get_width() for p in pieces)
+    height = max(p.get_height() for p in pieces)
+    surf = pygame.Surface((width, height), pygame.SRCALPHA)
+    x = 0
+    for piece in pieces:
+        surf.blit(piece, (x, 0))
+        x += piece.get_width()
+    return surf
@@ -4,10 +4,31 @@ input_handler.py: Process Pygame events into game actions.
 import pygame
 from pygame.locals import QUIT, KEYDOWN, K_q, K_d, K_r, K_SPACE
 
+# the only event types process() looks at
+ALLOWED_EVENTS = (QUIT, KEYDOWN)
+
+
 class InputHandler:
     """
     Translates raw Pygame events into high-level game actions.
     """
+    def __init__(self):
+        # reused by every process() call so a frame allocates no dict
+        self._actions = {
+            'quit': False,
+            'toggle_debug': False,
+            'restart': False,
+            'flap': False,
+        }
+
+    def restrict_events(self):
+        """
+        Block every event type except ALLOWED_EVENTS so the queue only holds
+        events process() uses (no mouse motion or window events to drain).
+        """
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(ALLOWED_EVENTS)
+
     def process(self, events):
         """
         Given a list of Pygame events, return a dict of actions:
@@ -15,13 +36,10 @@ class InputHandler:
         - toggle_debug: True if debug mode toggled
         - restart: True if game restart requested
         - flap: True if bird flap requested
+        The same dict is returned (and reset) on every call.
         """
-        actions = {
-            'quit': False,
-            'toggle_debug': False,
-            'restart': False,
-            'flap': False,
-        }
+        actions = self._actions
+        actions['quit'] = actions['toggle_debug'] = actions['restart'] = actions['flap'] = False
         for event in events:
             if event.type == QUIT:
                 actions['quit'] = True
@@ -34,4 +52,4 @@ class InputHandler:
                     actions['restart'] = True
                 elif event.key == K_SPACE:
                     actions['flap'] = True
-        return actions
\ No newline at end of file
+        return actions
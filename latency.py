@@ -0,0 +1,119 @@
+"""
+latency.py: input-to-photon latency of the player's flaps.
+LatencyProbe follows each flap key press from the event poll that picked it
+up, through the first physics step that applied it, to the flip of the
+first frame drawn after that step, and keeps the timings in fixed-size ring
+buffers. Pygame events carry no timestamp, so the time a press waited in the
+event queue is bounded by the time since the previous poll.
+"""
+import csv
+import json
+import time
+from array import array
+
+import settings
+from profiler import ring_samples, summarize
+
+# Columns recorded per flap (ms, except frames):
+# queued: time between the previous poll and the one that saw the key, an
+#   upper bound on how long the press sat in the event queue;
+# to_step: poll -> the physics step that applied the flap;
+# to_flip: poll -> the flip of the first frame drawn after that step;
+# frames: frames flipped without the flap before it showed (0 = same frame).
+COLUMNS = ('queued', 'to_step', 'to_flip', 'frames')
+
+
+class LatencyProbe:
+    """
+    Ring buffer of per-flap input latencies.
+    Game calls polled() after each event poll, flapped() when a key flap is
+    applied, stepped() after each physics step and flipped() after each
+    displayed frame.
+    """
+    def __init__(self, capacity=settings.LATENCY_CAPACITY):
+        self.capacity = capacity
+        self.clock = time.perf_counter
+        self._samples = [array('d', bytes(8 * capacity)) for _ in COLUMNS]
+        # total flaps recorded; the ring holds the last `capacity` of them
+        self.flaps = 0
+        self._poll = None
+        self._prev_poll = None
+        # the flap being followed: its poll time, queue bound, step time and
+        # frames flipped without it (None when no flap is in flight)
+        self._pending = None
+        self._queued = 0.0
+        self._stepped = None
+        self._frames = 0
+
+    def polled(self):
+        """Note the time of an event poll."""
+        self._prev_poll = self._poll
+        self._poll = self.clock()
+
+    def flapped(self):
+        """A flap from the latest poll was applied to the bird."""
+        if self._pending is not None:
+            # still waiting for the previous flap to show; follow that one
+            return
+        self._pending = self._poll
+        self._queued = self._poll - self._prev_poll if self._prev_poll is not None else 0.0
+        self._stepped = None
+        self._frames = 0
+
+    def stepped(self):
+        """A physics step ran; the first one after a flap applies it."""
+        if self._pending is not None and self._stepped is None:
+            self._stepped = self.clock()
+
+    def flipped(self):
+        """A frame was flipped to the display; record the flap if it is in it."""
+        if self._pending is None:
+            return
+        if self._stepped is None:
+            # drawn before any step applied the flap (fixed-step mode)
+            self._frames += 1
+            return
+        now = self.clock()
+        slot = self.flaps % self.capacity
+        poll = self._pending
+        row = (self._queued * 1000.0, (self._stepped - poll) * 1000.0,
+               (now - poll) * 1000.0, self._frames)
+        for samples, value in zip(self._samples, row):
+            samples[slot] = value
+        self.flaps += 1
+        self._pending = None
+
+    def samples(self, column):
+        """Return the recorded samples of a column, oldest first."""
+        return ring_samples(self._samples[COLUMNS.index(column)], self.flaps, self.capacity)
+
+    def summary(self):
+        """Return {column: {'p50', 'p95', 'p99', 'mean', 'max'}} over the ring buffer."""
+        return {column: summarize(self.samples(column)) for column in COLUMNS}
+
+    def report(self):
+        """Return the summary as printable lines of text."""
+        lines = [f"{self.flaps} flaps; input-to-photon latency (ms; frames for 'frames')",
+                 f"{'':<9}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}"]
+        for column, stats in self.summary().items():
+            lines.append(f"{column:<9}{stats['p50']:>8.2f}{stats['p95']:>8.2f}"
+                         f"{stats['p99']:>8.2f}{stats['max']:>8.2f}")
+        return "\n".join(lines)
+
+    def export(self, path):
+        """Write samples and summary to `path` (.csv for CSV, otherwise JSON)."""
+        if path.endswith('.csv'):
+            columns = [self.samples(column) for column in COLUMNS]
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(COLUMNS)
+                writer.writerows(zip(*columns))
+            return
+        data = {
+            'flaps': self.flaps,
+            'capacity': self.capacity,
+            'summary': self.summary(),
+            'samples': {column: self.samples(column) for column in COLUMNS},
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f)
@@ -1,71 +1,72 @@
 """
-pipe.py: defines the Pipe obstacle for Flappy Bird.
-Each Pipe consists of a top and bottom rectangle, moving left across the screen.
+pipe.py: defines the Pipe obstacle sprite for Flappy Bird.
+Each Pipe draws the top and bottom segments of a simulation.PipeBody with
+opaque rect fills (no per-pipe surface), and sprites are recycled through
+a PipePool instead of being reallocated for every spawn.
 """
 import pygame
-import random
 import settings
 
 
 class Pipe(pygame.sprite.Sprite):
     """A pair of pipes as one sprite: top and bottom segments with a gap."""
-    def __init__(self, x, speed=None, gap=None, top_height=None):
+    def __init__(self, body):
         super().__init__()
-        # speed can vary over time
-        self.speed = speed if speed is not None else settings.PIPE_SPEED
-        self.width = settings.PIPE_WIDTH
-        # gap size (allow per-pipe randomness)
-        self.gap = gap if gap is not None else settings.PIPE_GAP
-        # determine top-pipe height (optionally constrained)
-        min_top = settings.PIPE_MIN_HEIGHT
-        max_top = settings.HEIGHT - settings.PIPE_MIN_HEIGHT - self.gap
-        if top_height is None:
-            self.top_height = random.randint(min_top, max_top)
-        else:
-            # clamp provided top_height to allowable range
-            self.top_height = max(min(top_height, max_top), min_top)
-        bottom_y = self.top_height + self.gap
-        bottom_height = settings.HEIGHT - bottom_y
-        # collision rects
-        self.top_rect = pygame.Rect(x, 0, self.width, self.top_height)
-        self.bottom_rect = pygame.Rect(x, bottom_y, self.width, bottom_height)
-        # create the visual image of both segments
-        image = pygame.Surface((self.width, settings.HEIGHT), pygame.SRCALPHA)
-        # top pipe
-        pygame.draw.rect(image, settings.PIPE_COLOR, (0, 0, self.width, self.top_height))
-        # bottom pipe
-        pygame.draw.rect(image, settings.PIPE_COLOR, (0, bottom_y, self.width, bottom_height))
-        # bounce-zone indicator (yellow stripe)
-        self.bounce_zone = (random.random() < settings.PIPE_BOUNCE_CHANCE)
-        if self.bounce_zone:
-            stripe_height = settings.PIPE_BOUNCE_STRIPE_HEIGHT
-            pygame.draw.rect(
-                image,
-                settings.BOUNCE_STRIPE_COLOR,
-                (0, bottom_y, self.width, stripe_height)
-            )
-        # assign sprite attributes and track float x-position for smooth movement
-        self.image = image
-        self.rect = image.get_rect(topleft=(x, 0))
-        # float-based x position for sub-pixel movement
-        self.pos_x = float(self.rect.x)
-        # scoring flags
-        self.bounced = False
-        self.passed = False
+        self.rect = pygame.Rect(0, 0, settings.PIPE_WIDTH, settings.HEIGHT)
+        self.top_rect = pygame.Rect(0, 0, 0, 0)
+        self.bottom_rect = pygame.Rect(0, 0, 0, 0)
+        self.stripe_rect = pygame.Rect(0, 0, 0, 0)
+        self.reset(body)
+
+    def reset(self, body):
+        """Attach the sprite to a (new) simulated pipe body."""
+        # geometry and motion live in the simulation body
+        self.body = body
+        width = body.width
+        bottom_y = body.bottom_y
+        # full-height column covered by the sprite (used for damage tracking)
+        self.rect.update(body.x, 0, width, settings.HEIGHT)
+        # top pipe, bottom pipe, and bounce-zone indicator (yellow stripe)
+        self.top_rect.update(body.x, 0, width, body.top_height)
+        self.bottom_rect.update(body.x, bottom_y, width, settings.HEIGHT - bottom_y)
+        self.stripe_rect.update(body.x, bottom_y, width, settings.PIPE_BOUNCE_STRIPE_HEIGHT)
 
     def update(self, dt):
-        """Move the pipe left by speed * dt and update collision rects."""
-        # compute movement in pixels (float)
-        dx = self.speed * (dt / 1000.0)
-        # update float position and apply to rect
-        self.pos_x -= dx
-        new_x = int(self.pos_x)
-        self.rect.x = new_x
-        # update collision rects to match
-        self.top_rect.x = new_x
-        self.bottom_rect.x = new_x
+        """Move the sprite rects to the body's current x position."""
+        x = self.body.x
+        self.rect.x = x
+        self.top_rect.x = x
+        self.bottom_rect.x = x
+        self.stripe_rect.x = x
+
+    def draw(self, surface):
+        """Fill the pipe segments directly; pipe bodies are opaque, so no blending."""
+        top, bottom, stripe = self.top_rect, self.bottom_rect, self.stripe_rect
+        if self.rect.x < 0:
+            # Surface.fill shifts rather than clips rects with a negative x
+            bounds = surface.get_rect()
+            top, bottom, stripe = top.clip(bounds), bottom.clip(bounds), stripe.clip(bounds)
+        surface.fill(settings.PIPE_COLOR, top)
+        surface.fill(settings.PIPE_COLOR, bottom)
+        if self.body.bounce_zone:
+            surface.fill(settings.BOUNCE_STRIPE_COLOR, stripe)
+
+
+class PipePool:
+    """Free list of Pipe sprites reused for newly spawned pipe bodies."""
+    def __init__(self):
+        self._free = []
 
+    def acquire(self, body):
+        """Return a Pipe sprite showing body, reusing a released one if possible."""
+        if self._free:
+            pipe = self._free.pop()
+            pipe.reset(body)
+            return pipe
+        return Pipe(body)
 
-    def off_screen(self):
-        """Return True if pipe has moved entirely off the left edge."""
-        return self.rect.right < 0
\ No newline at end of file
+    def release(self, pipe):
+        """Remove a pipe from its groups and keep it for reuse."""
+        pipe.kill()
+        pipe.body = None
+        self._free.append(pipe)
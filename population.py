@@ -0,0 +1,435 @@
+"""
+population.py: many birds flying one pipe course at once.
+Every bird flies at the same x, so all the birds still alive see the same
+pipes at the same speed. A Population steps one shared PipeTrack, scores
+its passes once, and makes one pipe query per step (simulation.pipe_spans)
+for every bird's collision sweep; each bird's run is the one a Simulation
+of the same course would produce for it.
+
+PopulationGame shows a population (steering bots, or ghosts of recorded
+games) in one window and draws all birds with a single Surface.blits call
+from one shared table of prerotated wing frames:
+
+    python population.py --birds 300 --seed 7
+    python population.py --ghosts games.rpl
+    python population.py --birds 1000 --headless
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+
+import settings
+import assets
+import replay
+from bird import TILT_ANGLES, tilt_index
+from course import Course
+from hud import Hud
+from input_handler import InputHandler
+from pipe import PipePool
+from simulation import (
+    BirdBody, PipeTrack, BIRD_BASE_FRAME, BIRD_START_X, BIRD_START_Y, DEATH_CAUSES,
+    DEATH_GROUND, DEFAULT_DT,
+    bird_frame_heights, pipe_contacts, pipe_spans, resolve_contacts,
+)
+
+# HUD labels (with and without the debug pipe speed)
+HUD_LABELS = ("Alive: ", "   Best: ")
+HUD_DEBUG_LABELS = HUD_LABELS + ("   Speed: ",)
+
+
+class Population:
+    """
+    n birds on one course, stepped together without a display.
+    step() takes one flap action per bird. Per-bird score, death_cause and
+    died_at match a Simulation of the same course fed the same inputs.
+    Bounces are kept per bird, so PipeBody.bounced is not used.
+    """
+    def __init__(self, n, collision=True, seed=None, course=None):
+        self.n = n
+        self.collision = collision
+        self.course = course if course is not None else Course(seed)
+        self.seed = self.course.seed
+        heights = bird_frame_heights()
+        self.birds = [BirdBody(BIRD_START_X, BIRD_START_Y, heights) for _ in range(n)]
+        # largest collider of any bird, for the shared pipe query
+        self.max_radius = max(heights) / 2
+        # pipes scroll together for everyone; the track's speed is the pipe speed
+        self.track = PipeTrack(settings.PIPE_SPEED)
+        self.pipes = self.track.pipes
+        # index of the next course pipe to spawn
+        self.next_pipe = 0
+        self.score = [0] * n
+        # bounce-zone rebounds per bird
+        self.bounces = [0] * n
+        self.alive = [True] * n
+        self.death_cause = [None] * n
+        # tick each bird died on (its survival time in steps)
+        self.died_at = [0] * n
+        # indices of the birds still alive, in order
+        self.live = list(range(n))
+        # bounces: pipe -> indices of the birds that bounced on it
+        self._bounced = {}
+        # elapsed simulated time (ms) and number of steps taken
+        self.time = 0
+        self.ticks = 0
+        self._spawn_pipes()
+
+    @property
+    def pipe_speed(self):
+        return self.track.speed
+
+    @property
+    def best(self):
+        """Highest score in the population."""
+        return max(self.score) if self.n else 0
+
+    def next_pipe_ahead(self):
+        """The nearest pipe no bird has flown past yet, or None."""
+        tail = BIRD_START_X - self.max_radius
+        for pipe in self.pipes:
+            if pipe.right >= tail:
+                return pipe
+        return None
+
+    def step(self, flaps=None, dt=DEFAULT_DT):
+        """
+        Advance every live bird by dt milliseconds; flaps[i] flaps bird i
+        first (entries of dead birds are ignored).
+        Return the number of birds still alive.
+        """
+        live = self.live
+        if not live:
+            return 0
+        self.time += dt
+        self.ticks += 1
+        self._spawn_pipes()
+        track = self.track
+        # start of the step, for the swept collision tests
+        start_scroll = track.scroll
+        start_y = []
+        birds = self.birds
+        for i in live:
+            bird = birds[i]
+            start_y.append(bird.y)
+            if flaps is not None and flaps[i]:
+                bird.flap()
+            bird.update(dt)
+        # scroll, score and speed up once for every bird
+        track.advance(dt)
+        score = self.score
+        for pipe in track.pass_before(BIRD_START_X):
+            bounced = self._bounced.pop(pipe, ())
+            for i in live:
+                score[i] += 100 if i in bounced else 10
+            track.speed += settings.PIPE_SPEEDUP
+        track.cull()
+        if self.collision:
+            self._check_collisions(start_scroll, start_y)
+        else:
+            # clamp birds to the bottom of the screen
+            for i in live:
+                bird = birds[i]
+                bottom_limit = settings.HEIGHT - bird.height / 2
+                if bird.y > bottom_limit:
+                    bird.y = bottom_limit
+                    bird.velocity = 0
+        return len(self.live)
+
+    def _spawn_pipes(self):
+        """Add the course pipes whose left edge has scrolled onto the screen."""
+        self.next_pipe = self.track.spawn_course(self.course, self.next_pipe)
+
+    def _check_collisions(self, start_scroll, start_y):
+        """Ground collisions, then each bird's sweep against the one shared pipe query."""
+        birds = self.birds
+        track = self.track
+        # the birds' paths relative to the pipes span the distance scrolled this step
+        reach = track.scroll - start_scroll + 1
+        radius = self.max_radius
+        spans = pipe_spans(track, start_scroll, BIRD_START_X - radius - reach, BIRD_START_X + radius)
+        survivors = []
+        for i, y0 in zip(self.live, start_y):
+            bird = birds[i]
+            if bird.bottom >= settings.HEIGHT:
+                self._die(i, DEATH_GROUND)
+                continue
+            if spans:
+                contacts = pipe_contacts(bird, y0, spans)
+                if contacts:
+                    # the same resolution as Simulation; bounces are kept per bird
+                    bounced, cause, _ = resolve_contacts(bird, y0, contacts)
+                    if bounced is not None:
+                        self._bounced.setdefault(bounced, set()).add(i)
+                        self.bounces[i] += 1
+                    if cause is not None:
+                        self._die(i, cause)
+                        continue
+            survivors.append(i)
+        self.live = survivors
+
+    def _die(self, i, cause):
+        """Record bird i's death and its cause."""
+        self.alive[i] = False
+        self.death_cause[i] = cause
+        self.died_at[i] = self.ticks
+
+
+class SteeringBots:
+    """
+    Pilots following autopilot.steer's rule (flap when sinking toward the
+    next bottom pipe), each with its own margin above that pipe drawn from
+    POPULATION_MARGINS, so the population spreads out.
+    """
+    def __init__(self, n, seed=None, margins=settings.POPULATION_MARGINS):
+        rng = random.Random(seed)
+        self.n = n
+        self.margins = [rng.uniform(*margins) for _ in range(n)]
+        # flap list handed to Population.step, reused every tick
+        self._flaps = [False] * n
+
+    def restart(self):
+        """Prepare for a new population (the bots keep their margins)."""
+
+    def flaps(self, pop):
+        """Return every bird's flap for the next step (one pipe lookup for all)."""
+        out = self._flaps
+        birds = pop.birds
+        pipe = pop.next_pipe_ahead()
+        if pipe is None:
+            target = settings.HEIGHT / 2
+            for i in pop.live:
+                bird = birds[i]
+                out[i] = bird.y + bird.radius > target
+            return out
+        bottom = pipe.bottom_y
+        margins = self.margins
+        for i in pop.live:
+            bird = birds[i]
+            out[i] = bird.y + bird.radius > bottom - margins[i]
+        return out
+
+
+class Ghosts:
+    """Pilots repeating recorded games: bird i replays the flaps of replays[i]."""
+    def __init__(self, replays):
+        self.replays = replays
+        self.n = len(replays)
+        # tick -> ghosts flapping before that tick's step
+        self._schedule = {}
+        for i, game in enumerate(replays):
+            for tick, action in game.events():
+                if action == replay.ACTION_FLAP:
+                    self._schedule.setdefault(tick, []).append(i)
+        self._flaps = [False] * self.n
+        self._set = ()
+
+    def restart(self):
+        """Clear the flaps of the previous population's last tick."""
+        for i in self._set:
+            self._flaps[i] = False
+        self._set = ()
+
+    def flaps(self, pop):
+        """Return every ghost's recorded flap for the next step."""
+        out = self._flaps
+        for i in self._set:
+            out[i] = False
+        self._set = self._schedule.get(pop.ticks, ())
+        for i in self._set:
+            out[i] = True
+        return out
+
+
+def load_ghosts(path, seed=None, dt=DEFAULT_DT):
+    """
+    Return (seed, replays) of the recorded games in `path` that can fly
+    together: one seed (the given one, or the most recorded), this dt and
+    these gameplay settings, collisions on for the whole game.
+    """
+    current = replay.settings_hash()
+    usable = []
+    for game in replay.read_replays(path):
+        if not game.collision or game.settings_hash != current or abs(game.dt - dt) > 1e-9:
+            continue
+        if any(action != replay.ACTION_FLAP for _, action in game.events()):
+            continue
+        if seed is None or game.seed == seed:
+            usable.append(game)
+    if not usable:
+        return seed, []
+    if seed is None:
+        seed = Counter(game.seed for game in usable).most_common(1)[0][0]
+    return seed, [game for game in usable if game.seed == seed]
+
+
+class PopulationGame:
+    """
+    Window showing a Population flown by `pilots` (SteeringBots or Ghosts).
+    Pipes are drawn by pooled Pipe sprites as in Game; the birds are drawn
+    with one Surface.blits call from a single shared table of wing frames,
+    prerotated to each tilt (bird.TILT_ANGLES).
+    One fixed step of dt runs per frame, so a slow frame slows the game
+    rather than dropping physics. A new population starts
+    POPULATION_RESTART_DELAY ms after the last bird dies: on the next seed
+    for bots, on the same course for ghosts.
+    Keys: D toggles the pipe speed, R restarts, Q quits.
+    """
+    def __init__(self, pilots, seed=None, dt=DEFAULT_DT, ghosts=False):
+        pygame.init()
+        self.screen = pygame.display.set_mode((settings.WIDTH, settings.HEIGHT))
+        pygame.display.set_caption("Flappy Bird population")
+        self.clock = pygame.time.Clock()
+        self.font = pygame.font.SysFont(None, 24)
+        self.hud = Hud(self.font)
+        self.input_handler = InputHandler()
+        self.pilots = pilots
+        self.seed = seed
+        self.dt = dt
+        # ghosts replay one course; bots move on to the next seed
+        self.ghosts = ghosts
+        self.debug = False
+        self.running = True
+        # every bird draws from one table: _frames[tilt][frame] = (surface, offset x, offset y)
+        table = assets.load_rotated_frames('bird', TILT_ANGLES)
+        self._frames = [[(surf, rect.x, rect.y) for surf, rect, _ in row] for row in table]
+        # (surface, position) pairs for Surface.blits, refilled each frame
+        self._blits = []
+        self.pipe_pool = PipePool()
+        self._pipe_sprites = {}
+        self.start()
+
+    def start(self):
+        """Start a new population."""
+        self.pop = Population(self.pilots.n, seed=self.seed)
+        self.pilots.restart()
+        for sprite in self._pipe_sprites.values():
+            self.pipe_pool.release(sprite)
+        self._pipe_sprites.clear()
+        self._sync_pipes()
+        # time since the last bird died (ms)
+        self.over_time = 0
+
+    def run(self):
+        """Main loop: input, one population step, draw."""
+        while self.running:
+            dt = self.clock.tick(settings.FPS)
+            actions = self.input_handler.process(pygame.event.get())
+            if actions['quit']:
+                self.running = False
+            if actions['toggle_debug']:
+                self.debug = not self.debug
+            if actions['restart']:
+                self.start()
+            pop = self.pop
+            if pop.live:
+                pop.step(self.pilots.flaps(pop), self.dt)
+                self._sync_pipes()
+            else:
+                self.over_time += dt
+                if self.over_time >= settings.POPULATION_RESTART_DELAY:
+                    if not self.ghosts and self.seed is not None:
+                        self.seed += 1
+                    self.start()
+            self.draw()
+        pygame.quit()
+
+    def draw(self):
+        """Draw pipes, every live bird in one blits batch, and the HUD."""
+        screen = self.screen
+        screen.fill(settings.BACKGROUND_COLOR)
+        for sprite in self._pipe_sprites.values():
+            sprite.update(self.dt)
+            sprite.draw(screen)
+        pop = self.pop
+        birds = pop.birds
+        frames = self._frames
+        blits = self._blits
+        blits.clear()
+        for i in pop.live:
+            bird = birds[i]
+            frame = bird.anim_index if bird.animating else BIRD_BASE_FRAME
+            surf, dx, dy = frames[tilt_index(bird.velocity)][frame]
+            blits.append((surf, (int(bird.x) + dx, int(bird.y) + dy)))
+        screen.blits(blits, doreturn=False)
+        if self.debug:
+            line = self.hud.values_line(HUD_DEBUG_LABELS, (len(pop.live), pop.best, pop.pipe_speed))
+        else:
+            line = self.hud.values_line(HUD_LABELS, (len(pop.live), pop.best))
+        screen.blit(line, (10, 10))
+        pygame.display.flip()
+
+    def _sync_pipes(self):
+        """Create sprites for newly spawned pipes and drop those the track culled."""
+        pipes = self.pop.pipes
+        for body in pipes:
+            if body not in self._pipe_sprites:
+                self._pipe_sprites[body] = self.pipe_pool.acquire(body)
+        if len(self._pipe_sprites) > len(pipes):
+            live = set(pipes)
+            for body in list(self._pipe_sprites):
+                if body not in live:
+                    self.pipe_pool.release(self._pipe_sprites.pop(body))
+
+
+def run_headless(pilots, seed=None, max_ticks=3600, dt=DEFAULT_DT):
+    """Fly one population to the end (or max_ticks) without a window; return it and the seconds taken."""
+    pop = Population(pilots.n, seed=seed)
+    pilots.restart()
+    start = time.perf_counter()
+    while pop.live and pop.ticks < max_ticks:
+        pop.step(pilots.flaps(pop), dt)
+    return pop, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Many birds on one pipe course")
+    parser.add_argument('--birds', type=int, default=settings.POPULATION_SIZE, help="number of bots")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--ghosts', default=None, metavar='PATH',
+                        help="fly the recorded games of one seed in a replay file instead of bots")
+    parser.add_argument('--headless', action='store_true',
+                        help="run one population without a window and report timings")
+    parser.add_argument('--max-ticks', type=int, default=3600, help="tick limit with --headless")
+    args = parser.parse_args(argv)
+    seed = args.seed
+    if args.ghosts:
+        seed, replays = load_ghosts(args.ghosts, seed)
+        if not replays:
+            print(f"{args.ghosts}: no games recorded with collisions on at this dt and settings")
+            return 1
+        pilots = Ghosts(replays)
+    else:
+        pilots = SteeringBots(args.birds, seed)
+    if not args.headless:
+        PopulationGame(pilots, seed, ghosts=bool(args.ghosts)).run()
+        return 0
+    pop, elapsed = run_headless(pilots, seed, args.max_ticks)
+    print(f"{pop.n} birds, seed {pop.seed}: {pop.ticks} ticks in {elapsed:.2f}s "
+          f"({elapsed / max(pop.ticks, 1) * 1000:.2f} ms/tick), best score {pop.best}, "
+          f"{len(pop.live)} alive")
+    causes = Counter(pop.death_cause[i] for i in range(pop.n) if not pop.alive[i])
+    print("deaths: " + ", ".join(f"{n} {cause}" for cause, n in causes.items()))
+    if args.ghosts:
+        # every finished recording must end exactly as it was recorded
+        checked = mismatched = 0
+        for i, game in enumerate(replays):
+            if not game.death_cause or pop.alive[i]:
+                continue
+            checked += 1
+            outcome = (pop.score[i], pop.died_at[i], DEATH_CAUSES.index(pop.death_cause[i]))
+            if outcome != (game.score, game.ticks, game.death_cause):
+                mismatched += 1
+        print(f"ghosts: {checked - mismatched}/{checked} recorded outcomes reproduced")
+        return 1 if mismatched else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+preload.py: background warming of deferred sprite frames.
+A worker thread decodes and scales frame sets (explosion, burnt bird) at
+startup without touching the display; the main thread picks up finished
+frames with poll() or wait(), converts them to the display format and
+installs them in assets.frame_cache, so the first crash never stalls on
+image work.
+"""
+import queue
+import threading
+import time
+
+import pygame
+
+import settings
+import assets
+
+
+class AssetPreloader:
+    """
+    Warm assets.FRAME_SETS entries on a worker thread.
+    ready becomes True once every requested set is installed; stats holds
+    per-set build time (worker) and install time (main thread) in ms.
+    """
+    def __init__(self, names=settings.PRELOAD_FRAME_SETS):
+        self.names = tuple(names)
+        self._queue = queue.Queue()
+        self._pending = set(self.names)
+        self._thread = None
+        self.started_at = None
+        # ms from start() until the last set was installed
+        self.ready_ms = None
+        self.stats = {}
+        self.errors = {}
+
+    @property
+    def ready(self):
+        return not self._pending
+
+    def start(self):
+        """Start the worker thread (sets already in the frame cache are skipped)."""
+        self.started_at = time.perf_counter()
+        todo = [name for name in self.names if not assets.frames_cached(name)]
+        self._pending = set(todo)
+        if not todo:
+            self.ready_ms = 0.0
+            return self
+        self._thread = threading.Thread(target=self._run, args=(todo,), name="asset-preloader", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self, names):
+        """Worker thread: build each set without display calls and queue it."""
+        for name in names:
+            start = time.perf_counter()
+            try:
+                frames = assets.read_frames(name, convert=False)
+            except Exception as exc:
+                # never let the thread die without queueing the set (wait()
+                # would block on it); leave it to load_frames on the main thread
+                self.errors[name] = exc
+                frames = None
+            self._queue.put((name, frames, (time.perf_counter() - start) * 1000.0))
+
+    def poll(self):
+        """Install any finished sets without blocking. Return ready."""
+        while self._pending:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._install(*item)
+        return self.ready
+
+    def wait(self, name=None, timeout=None):
+        """
+        Block until `name` (or every set, if None) is installed.
+        Return False if the timeout expired first.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while (name in self._pending) if name is not None else self._pending:
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return False
+            self._install(*item)
+        return True
+
+    def _install(self, name, frames, build_ms):
+        """Main thread: convert frames to the display format and cache them."""
+        start = time.perf_counter()
+        if frames is not None:
+            if pygame.display.get_surface() is not None:
+                frames = [frame.convert_alpha() for frame in frames]
+            assets.install_frames(name, frames)
+        self._pending.discard(name)
+        self.stats[name] = {
+            'build_ms': build_ms,
+            'install_ms': (time.perf_counter() - start) * 1000.0,
+            'frames': len(frames) if frames is not None else 0,
+        }
+        if not self._pending:
+            self.ready_ms = (time.perf_counter() - self.started_at) * 1000.0
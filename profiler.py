@@ -0,0 +1,165 @@
+"""
+profiler.py: per-phase frame-time instrumentation for the game loop.
+FrameProfiler records how long each phase of a frame took (ms) into
+fixed-size ring buffers, summarizes them as p50/p95/p99, renders a debug
+overlay and exports the samples to JSON or CSV. Game only creates one when
+profiling is enabled, so the disabled cost is a None check per phase.
+"""
+import csv
+import json
+import time
+from array import array
+
+import settings
+
+# Phases recorded per frame, in loop order. Simulation phases (bird_update,
+# update_pipes, check_collisions) are summed over all physics steps of a frame.
+# work: time spent in the loop body (excluding the frame-cap sleep);
+# frame_dt: the clock's frame time as fed to the game.
+PHASES = (
+    'handle_events', 'sprites_update', 'autopilot', 'bird_update', 'update_pipes',
+    'check_collisions', 'exploding_scan', 'render', 'work', 'frame_dt',
+)
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def ring_samples(values, count, capacity):
+    """
+    Return the samples in a ring buffer, oldest first.
+    values: the buffer; count: samples ever written (slot count % capacity
+    was written last).
+    """
+    n = min(count, capacity)
+    start = count % capacity if count > capacity else 0
+    return [values[(start + k) % capacity] for k in range(n)]
+
+
+def summarize(values):
+    """Return {'p50', 'p95', 'p99', 'mean', 'max'} of a sequence of samples."""
+    values = sorted(values)
+    stats = {f'p{p}': percentile(values, p) for p in PERCENTILES}
+    stats['mean'] = sum(values) / len(values) if values else 0.0
+    stats['max'] = values[-1] if values else 0.0
+    return stats
+
+
+class FrameProfiler:
+    """
+    Ring buffer of per-phase frame timings.
+    Call begin_frame(), mark() after each phase, and end_frame().
+    """
+    def __init__(self, capacity=settings.PROFILE_CAPACITY):
+        self.capacity = capacity
+        self.clock = time.perf_counter
+        self._index = {phase: i for i, phase in enumerate(PHASES)}
+        self._samples = [array('d', bytes(8 * capacity)) for _ in PHASES]
+        self._current = [0.0] * len(PHASES)
+        # total frames recorded; the ring holds the last `capacity` of them
+        self.frames = 0
+        self._frame_start = 0.0
+        self._overlay = None
+        self._overlay_time = 0.0
+
+    def begin_frame(self, frame_dt):
+        """Start a frame; frame_dt is the clock time (ms) since the previous one."""
+        current = self._current
+        for i in range(len(current)):
+            current[i] = 0.0
+        current[self._index['frame_dt']] = frame_dt
+        self._frame_start = self.clock()
+        return self._frame_start
+
+    def mark(self, phase, start):
+        """Add the time since `start` to `phase`; return now for the next phase."""
+        now = self.clock()
+        self._current[self._index[phase]] += (now - start) * 1000.0
+        return now
+
+    def end_frame(self):
+        """Store the finished frame in the ring buffer."""
+        current = self._current
+        current[self._index['work']] = (self.clock() - self._frame_start) * 1000.0
+        slot = self.frames % self.capacity
+        for samples, value in zip(self._samples, current):
+            samples[slot] = value
+        self.frames += 1
+
+    def wrap(self, obj, method, phase):
+        """
+        Time every call of obj.method into `phase` by shadowing it with a
+        timed wrapper on the instance (used for the simulation's phases).
+        """
+        func = getattr(obj, method)
+        i = self._index[phase]
+        clock = self.clock
+        current = self._current
+        def timed(*args, **kwargs):
+            start = clock()
+            result = func(*args, **kwargs)
+            current[i] += (clock() - start) * 1000.0
+            return result
+        setattr(obj, method, timed)
+
+    def instrument(self, sim):
+        """Time the bird update, pipe update and collision phases of a Simulation."""
+        self.wrap(sim.bird, 'update', 'bird_update')
+        self.wrap(sim, '_move_and_score_pipes', 'update_pipes')
+        self.wrap(sim, '_check_collisions', 'check_collisions')
+
+    def samples(self, phase):
+        """Return the recorded samples of a phase, oldest first."""
+        return ring_samples(self._samples[self._index[phase]], self.frames, self.capacity)
+
+    def summary(self):
+        """Return {phase: {'p50', 'p95', 'p99', 'mean', 'max'}} over the ring buffer."""
+        return {phase: summarize(self.samples(phase)) for phase in PHASES}
+
+    def overlay(self, font, color=settings.TEXT_COLOR):
+        """
+        Return a surface listing p50/p95/p99 per phase, refreshed at most
+        every PROFILE_OVERLAY_INTERVAL ms so the text is not re-rendered
+        each frame.
+        """
+        now = self.clock()
+        if self._overlay is None or (now - self._overlay_time) * 1000.0 >= settings.PROFILE_OVERLAY_INTERVAL:
+            import pygame
+            lines = [f"{'phase':<17}{'p50':>7}{'p95':>7}{'p99':>7}  ms"]
+            for phase, stats in self.summary().items():
+                lines.append(f"{phase:<17}{stats['p50']:>7.2f}{stats['p95']:>7.2f}{stats['p99']:>7.2f}")
+            rows = [font.render(line, True, color) for line in lines]
+            width = max(r.get_width() for r in rows)
+            height = sum(r.get_height() for r in rows)
+            surf = pygame.Surface((width, height), pygame.SRCALPHA)
+            y = 0
+            for row in rows:
+                surf.blit(row, (0, y))
+                y += row.get_height()
+            self._overlay = surf
+            self._overlay_time = now
+        return self._overlay
+
+    def export(self, path):
+        """Write samples and summary to `path` (.csv for CSV, otherwise JSON)."""
+        if path.endswith('.csv'):
+            columns = [self.samples(phase) for phase in PHASES]
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(PHASES)
+                writer.writerows(zip(*columns))
+            return
+        data = {
+            'frames': self.frames,
+            'capacity': self.capacity,
+            'summary': self.summary(),
+            'samples': {phase: self.samples(phase) for phase in PHASES},
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f)
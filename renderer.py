@@ -3,47 +3,156 @@ renderer.py: Responsible for drawing game state to the screen.
 """
 import settings
 import pygame
+from hud import Hud
 
 class Renderer:
     """
     Encapsulates all rendering logic for the game.
+    With dirty_rects enabled, only the screen regions whose content changed
+    since the previous frame are redrawn and passed to display.update();
+    large changes fall back to a full redraw and flip.
     """
-    def __init__(self, screen, font):
+    def __init__(self, screen, font, dirty_rects=settings.DIRTY_RECTS):
         self.screen = screen
         self.font = font
+        # cached HUD text (labels and digit atlas)
+        self.hud = Hud(font)
+        self.dirty_rects = dirty_rects
+        # previous frame's drawables: key -> (rect, signature); None forces a full redraw
+        self._prev = None
+        # damaged area above which a full redraw is cheaper
+        self.full_redraw_area = int(settings.WIDTH * settings.HEIGHT * settings.DIRTY_FULL_REDRAW_FRACTION)
+        # frame counts per render path (full redraw, partial update, nothing changed)
+        self.stats = {'full': 0, 'partial': 0, 'unchanged': 0}
 
     def render(self, game):
         """
         Draw background, pipes, bird, UI, and debug overlays.
         """
+        scene = self._scene(game)
+        if not self.dirty_rects:
+            self._draw_full(scene)
+            return
+        dirty = self._damage(scene) if self._prev is not None else None
+        self._prev = {key: (rect, sig) for key, rect, sig, _ in scene}
+        if dirty is None or sum(r.w * r.h for r in dirty) > self.full_redraw_area:
+            self._draw_full(scene)
+            return
+        if not dirty:
+            self.stats['unchanged'] += 1
+            return
+        screen = self.screen
+        for area in dirty:
+            # erase and redraw everything overlapping this region, clipped to it
+            screen.set_clip(area)
+            screen.fill(settings.BACKGROUND_COLOR)
+            for _, rect, _, draw in scene:
+                if rect.colliderect(area):
+                    draw(screen)
+        screen.set_clip(None)
+        pygame.display.update(dirty)
+        self.stats['partial'] += 1
+
+    def invalidate(self):
+        """Force the next frame to be fully redrawn."""
+        self._prev = None
+
+    def _draw_full(self, scene):
+        """Clear the screen, draw every element, and flip buffers."""
         # Clear screen
         self.screen.fill(settings.BACKGROUND_COLOR)
-        # Draw pipes behind the bird
-        game.pipes.draw(self.screen)
+        for _, _, _, draw in scene:
+            draw(self.screen)
+        # Flip buffers
+        pygame.display.flip()
+        self.stats['full'] += 1
+
+    def _scene(self, game):
+        """
+        Describe the frame as drawables in z-order: (key, rect, signature, draw).
+        An element is unchanged when its key, rect and signature match the
+        previous frame.
+        """
+        items = []
+        # Draw pipes behind the bird (opaque rect fills)
+        for pipe in game.pipes:
+            items.append((('pipe', id(pipe)), pipe.rect.copy(), pipe.body, pipe.draw))
         # Draw bird and other sprites
-        game.all_sprites.draw(self.screen)
-        # Draw UI: instructions and score
-        text_color = settings.TEXT_COLOR
-        info = f"Press SPACE to flap, Q to quit   Score: {game.score}"
-        # indicate collision detection disabled
-        if hasattr(game, 'collision') and not game.collision:
-            info += "*"
+        for sprite in game.all_sprites:
+            items.append((('sprite', id(sprite)), sprite.rect.copy(), sprite.image,
+                          _blitter(sprite.image, sprite.rect.topleft)))
+        # Draw UI: instructions and score ('*' when collisions are disabled)
+        collision = getattr(game, 'collision', True)
         # debug: show pipe speed
-        if game.debug:
-            info += f"   Speed: {int(game.pipe_speed)}"
-        info_surf = self.font.render(info, True, text_color)
-        self.screen.blit(info_surf, (10, 10))
+        speed = int(game.pipe_speed) if game.debug else None
+        info_surf = self.hud.info_line(game.score, collision, speed)
+        items.append(_surface_item('hud', info_surf, (10, 10)))
         # Game over message
         if game.state.name == 'GAME_OVER':
-            over_text = "Game Over! Press R to restart"
-            over_surf = self.font.render(over_text, True, text_color)
+            over_surf = self.hud.label("Game Over! Press R to restart")
             ox = settings.WIDTH // 2 - over_surf.get_width() // 2
             oy = settings.HEIGHT // 2 - over_surf.get_height() // 2
-            self.screen.blit(over_surf, (ox, oy))
+            items.append(_surface_item('game_over', over_surf, (ox, oy)))
         # Debug: draw collision circle
         if game.debug:
-            radius = int(game.bird.image.get_height() / 2)
+            # cached per frame: a tilted image is taller than the collider
+            radius = int(game.bird.radius)
             center = (int(game.bird.pos.x), int(game.bird.pos.y))
-            pygame.draw.circle(self.screen, settings.DEBUG_CIRCLE_COLOR, center, radius, 1)
-        # Flip buffers
-        pygame.display.flip()
\ No newline at end of file
+            rect = pygame.Rect(center[0] - radius - 1, center[1] - radius - 1, 2 * radius + 3, 2 * radius + 3)
+            items.append(('debug_circle', rect, (center, radius), _circle_drawer(center, radius)))
+        # Debug: frame-time percentiles when profiling
+        profiler = getattr(game, 'profiler', None)
+        if game.debug and profiler is not None:
+            items.append(_surface_item('profile', profiler.overlay(self.font), (10, 40)))
+        return items
+
+    def _damage(self, scene):
+        """Return the screen rects that changed since the previous frame."""
+        prev = self._prev
+        dirty = []
+        seen = set()
+        for key, rect, sig, _ in scene:
+            seen.add(key)
+            old = prev.get(key)
+            if old is None:
+                dirty.append(rect)
+                continue
+            old_rect, old_sig = old
+            if old_sig is not sig and old_sig != sig:
+                dirty += _changed(old_rect, rect)
+            elif old_rect != rect:
+                if key[0] == 'pipe' and old_rect.colliderect(rect) and old_rect.y == rect.y and old_rect.h == rect.h:
+                    # a pipe column only changes along its leading and trailing edges
+                    lo, hi = min(old_rect.left, rect.left), max(old_rect.right, rect.right)
+                    dirty.append(pygame.Rect(lo, rect.y, max(old_rect.left, rect.left) - lo, rect.h))
+                    right = min(old_rect.right, rect.right)
+                    dirty.append(pygame.Rect(right, rect.y, hi - right, rect.h))
+                else:
+                    dirty += _changed(old_rect, rect)
+        for key, (old_rect, _) in prev.items():
+            if key not in seen:
+                dirty.append(old_rect)
+        bounds = self.screen.get_rect()
+        clipped = (r.clip(bounds) for r in dirty)
+        return [r for r in clipped if r.w and r.h]
+
+
+def _changed(old_rect, new_rect):
+    """Damage for an element that moved or changed: one rect if they overlap."""
+    if old_rect.colliderect(new_rect):
+        return [old_rect.union(new_rect)]
+    return [old_rect, new_rect]
+
+def _surface_item(key, surf, pos):
+    """Drawable for a cached surface; its identity is the signature."""
+    return (key, surf.get_rect(topleft=pos), surf, _blitter(surf, pos))
+
+def _blitter(image, pos):
+    def draw(surface):
+        surface.blit(image, pos)
+    return draw
+
+def _circle_drawer(center, radius):
+    def draw(surface):
+        pygame.draw.circle(surface, settings.DEBUG_CIRCLE_COLOR, center, radius, 1)
+    return draw
@@ -0,0 +1,268 @@
+"""
+replay.py: compact binary replays of recorded games.
+A replay is the game's seed, a hash of the gameplay settings, the fixed
+physics step and the player's input as delta-encoded (tick, action) pairs,
+plus the final score and death tick for verification. Replaying runs the
+headless Simulation at full speed and checks that the outcome matches.
+
+A replay file is a header followed by any number of length-prefixed
+records (one per game), so files can be appended to and scanned record by
+record without loading them whole.
+
+Usage:
+    python run.py --record games.rpl        # play and record every game
+    python replay.py verify games.rpl       # re-simulate and check outcomes
+    python replay.py scan games.rpl --min-score 100
+"""
+import argparse
+import hashlib
+import os
+import struct
+import sys
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import settings
+from simulation import Simulation, bird_frame_heights, DEATH_CAUSES, MODEL_VERSION
+
+# file layout: MAGIC, format version, then records
+MAGIC = b'FLPYRPLY'
+FORMAT_VERSION = 1
+_FILE_HEADER = struct.Struct('<8sI')
+# record header: payload length, seed, fixed dt (ms), final score, final tick,
+# death cause code, flags, event count, settings hash; the payload is the
+# varint-encoded event stream
+_RECORD = struct.Struct('<IqdIIBBI8s')
+
+# actions recorded per tick (low 2 bits of each encoded event)
+ACTION_FLAP = 0
+ACTION_COLLISION_OFF = 1
+ACTION_COLLISION_ON = 2
+_ACTION_BITS = 2
+
+# record flags
+FLAG_COLLISION = 1  # collisions were enabled when the game started
+FLAG_ALIVE = 2      # recording stopped before the bird died (quit)
+
+# gameplay settings that change a game's outcome for a given seed and input
+_GAMEPLAY_SETTINGS = (
+    'WIDTH', 'HEIGHT', 'GRAVITY', 'JUMP_VELOCITY', 'RESTITUTION', 'SCALE_FACTOR',
+    'FRAME_DURATION', 'PIPE_WIDTH', 'PIPE_GAP', 'PIPE_SPEED', 'PIPE_SPEEDUP',
+    'PIPE_SPAWN_INTERVAL', 'PIPE_MIN_HEIGHT', 'PIPE_VARIANCE', 'MAX_GAP_SHIFT',
+    'MAX_GAP_SHIFT_DOWN', 'INITIAL_PIPE_OFFSET', 'PIPE_BOUNCE_CHANCE',
+    'COURSE_FEASIBLE', 'COURSE_REDRAWS', 'FEASIBILITY_DISTANCE_STEP', 'FEASIBILITY_MAX_SPEED',
+)
+
+
+def settings_hash():
+    """8-byte digest of the model version, gameplay settings and bird collider sizes."""
+    values = [(name, getattr(settings, name)) for name in _GAMEPLAY_SETTINGS]
+    values.append(('bird_frame_heights', bird_frame_heights()))
+    values.append(('model_version', MODEL_VERSION))
+    return hashlib.sha256(repr(values).encode()).digest()[:8]
+
+
+def _encode_varint(value, out):
+    """Append an unsigned LEB128 varint to bytearray `out`."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_events(events):
+    """Encode (tick, action) pairs (ticks non-decreasing) as varint deltas."""
+    out = bytearray()
+    last = 0
+    for tick, action in events:
+        _encode_varint(((tick - last) << _ACTION_BITS) | action, out)
+        last = tick
+    return bytes(out)
+
+
+def decode_events(data):
+    """Yield (tick, action) pairs from an encoded event stream."""
+    tick = 0
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        tick += value >> _ACTION_BITS
+        yield tick, value & ((1 << _ACTION_BITS) - 1)
+        value = shift = 0
+
+
+class Replay:
+    """One recorded game. Events are decoded lazily by events()."""
+    __slots__ = ('seed', 'dt', 'score', 'ticks', 'death_cause', 'flags',
+                 'event_count', 'settings_hash', 'data')
+
+    def __init__(self, seed, dt, score, ticks, death_cause, flags, event_count, settings_hash, data):
+        self.seed = seed
+        self.dt = dt
+        self.score = score
+        # final tick: the tick the bird died on (or recording stopped)
+        self.ticks = ticks
+        # code into simulation.DEATH_CAUSES (0 = alive at the end)
+        self.death_cause = death_cause
+        self.flags = flags
+        self.event_count = event_count
+        self.settings_hash = settings_hash
+        self.data = data
+
+    @property
+    def collision(self):
+        return bool(self.flags & FLAG_COLLISION)
+
+    def events(self):
+        return decode_events(self.data)
+
+    def pack(self):
+        """Return the record as bytes (header + event stream)."""
+        return _RECORD.pack(len(self.data), self.seed, self.dt, self.score, self.ticks,
+                            self.death_cause, self.flags, self.event_count,
+                            self.settings_hash) + self.data
+
+
+def verify(replay):
+    """
+    Re-run a replay through the headless Simulation.
+    Return (ok, score, ticks, death cause code) of the re-simulated game;
+    ok is True when all three match the recording.
+    """
+    sim = Simulation(collision=replay.collision, seed=replay.seed)
+    bird = sim.bird
+    step = sim.step
+    dt = replay.dt
+    end = replay.ticks
+    for tick, action in replay.events():
+        # run up to the tick the input arrived on
+        while sim.ticks < tick and sim.alive:
+            step(False, dt)
+        if not sim.alive:
+            break
+        if action == ACTION_FLAP:
+            bird.flap()
+        else:
+            sim.collision = action == ACTION_COLLISION_ON
+    while sim.ticks < end and sim.alive:
+        step(False, dt)
+    cause = DEATH_CAUSES.index(sim.death_cause)
+    ok = (sim.score, sim.ticks, cause) == (replay.score, replay.ticks, replay.death_cause)
+    return ok, sim.score, sim.ticks, cause
+
+
+class Recorder:
+    """
+    Append recorded games to a replay file.
+    Call begin() when a game starts, action() for each input that affects
+    the simulation and end() when the game is over.
+    """
+    def __init__(self, path):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'ab')
+        if new:
+            self.file.write(_FILE_HEADER.pack(MAGIC, FORMAT_VERSION))
+        self.hash = settings_hash()
+        self._game = None
+        self.games = 0
+
+    def begin(self, seed, dt, collision=True):
+        """Start recording a game."""
+        self._game = (seed, dt, FLAG_COLLISION if collision else 0, [])
+
+    def action(self, tick, action):
+        """Record an input applied before simulation step `tick` + 1."""
+        if self._game is not None:
+            self._game[3].append((tick, action))
+
+    def end(self, sim):
+        """Write the current game with the simulation's final state."""
+        if self._game is None:
+            return
+        seed, dt, flags, events = self._game
+        if sim.alive:
+            flags |= FLAG_ALIVE
+        replay = Replay(seed, dt, sim.score, sim.ticks, DEATH_CAUSES.index(sim.death_cause),
+                        flags, len(events), self.hash, encode_events(events))
+        self.file.write(replay.pack())
+        self.file.flush()
+        self._game = None
+        self.games += 1
+
+    def close(self, sim=None):
+        """Finish an unfinished game (if sim is given) and close the file."""
+        if sim is not None:
+            self.end(sim)
+        self.file.close()
+
+
+def read_replays(path, events=True):
+    """
+    Yield the Replays in a file one record at a time.
+    With events=False the event streams are skipped (data is empty), which
+    is enough to scan scores and outcomes.
+    """
+    with open(path, 'rb') as f:
+        magic, version = _FILE_HEADER.unpack(f.read(_FILE_HEADER.size))
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path}: not a version {FORMAT_VERSION} replay file")
+        size = _RECORD.size
+        while True:
+            header = f.read(size)
+            if len(header) < size:
+                return
+            length, *fields = _RECORD.unpack(header)
+            if events:
+                data = f.read(length)
+            else:
+                f.seek(length, os.SEEK_CUR)
+                data = b''
+            yield Replay(*fields, data)
+
+
+def verify_file(path, out=sys.stdout):
+    """Verify every replay in a file; print mismatches and return (passed, failed)."""
+    current = settings_hash()
+    passed = failed = 0
+    for i, replay in enumerate(read_replays(path)):
+        ok, score, ticks, cause = verify(replay)
+        if ok:
+            passed += 1
+            continue
+        failed += 1
+        note = '' if replay.settings_hash == current else ' (recorded with different settings)'
+        print(f"#{i} seed {replay.seed}: recorded score {replay.score} tick {replay.ticks}, "
+              f"replayed score {score} tick {ticks}{note}", file=out)
+    return passed, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify or scan recorded replays")
+    sub = parser.add_subparsers(dest='command', required=True)
+    check = sub.add_parser('verify', help="re-simulate replays and check score and death tick")
+    check.add_argument('files', nargs='+')
+    scan = sub.add_parser('scan', help="list recorded games without re-simulating")
+    scan.add_argument('files', nargs='+')
+    scan.add_argument('--min-score', type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.command == 'verify':
+        failed = 0
+        for path in args.files:
+            ok, bad = verify_file(path)
+            failed += bad
+            print(f"{path}: {ok} verified, {bad} mismatched")
+        return 1 if failed else 0
+    for path in args.files:
+        for i, replay in enumerate(read_replays(path, events=False)):
+            if replay.score >= args.min_score:
+                cause = DEATH_CAUSES[replay.death_cause] or 'alive'
+                print(f"{path}#{i} seed {replay.seed} score {replay.score} "
+                      f"ticks {replay.ticks} {cause} inputs {replay.event_count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
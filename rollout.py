@@ -0,0 +1,214 @@
+"""
+rollout.py: run many seeded headless games across a process pool.
+Seeds are split into chunks, each worker plays its chunk with the headless
+Simulation and sends back one compact RolloutResults batch per chunk.
+
+Usage:
+    python rollout.py --games 10000 --workers 8
+    python rollout.py --games 10000 --report     # throughput vs. worker count
+    python rollout.py --games 100000 --stats runs.csv  # also stream per-game records
+"""
+import argparse
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+# keep worker start-up quiet: pygame is imported (not initialised) via assets
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import settings
+from runstats import RunStatsSink
+from simulation import Simulation, bird_frame_heights, DEATH_CAUSES, DEFAULT_DT
+
+# per-game tick cap (10 simulated minutes)
+DEFAULT_MAX_TICKS = settings.FPS * 600
+# seeds per task sent to a worker
+DEFAULT_CHUNKSIZE = 256
+# how far above the bottom pipe the scripted policy aims (px)
+GAP_MARGIN = 30
+
+
+def gap_policy(sim):
+    """
+    Scripted policy: flap when the bird sinks toward the next bottom pipe.
+    Policies take a Simulation and return True to flap; they must be
+    module-level functions so they can be sent to worker processes.
+    """
+    bird = sim.bird
+    upcoming = sim.next_pipes(1)
+    target = upcoming[0].bottom_y - GAP_MARGIN if upcoming else settings.HEIGHT / 2
+    return bird.y + bird.radius > target and bird.velocity >= 0
+
+
+def play(seed, policy=gap_policy, dt=DEFAULT_DT, max_ticks=DEFAULT_MAX_TICKS):
+    """
+    Play one headless game to completion (or max_ticks).
+    Return (score, ticks, flaps, death cause code, bounces, peak pipe speed).
+    """
+    sim = Simulation(seed=seed)
+    step = sim.step
+    while step(policy(sim), dt):
+        if sim.ticks >= max_ticks:
+            break
+    # pipes only ever speed up, so the final speed is the peak
+    return (sim.score, sim.ticks, sim.bird.flaps, DEATH_CAUSES.index(sim.death_cause),
+            sim.bounces, sim.pipe_speed)
+
+
+class RolloutResults:
+    """
+    Column-oriented results for a batch of games.
+    Each field is an array.array, so a batch pickles as a few flat buffers
+    rather than one object per game. death_cause holds codes into
+    simulation.DEATH_CAUSES (0 = still alive when max_ticks was reached).
+    """
+    FIELDS = (('seed', 'q'), ('score', 'q'), ('ticks', 'q'), ('flaps', 'q'), ('death_cause', 'b'),
+              ('bounces', 'q'), ('peak_speed', 'd'))
+
+    def __init__(self):
+        for name, typecode in self.FIELDS:
+            setattr(self, name, array(typecode))
+
+    def __len__(self):
+        return len(self.seed)
+
+    def append(self, seed, score, ticks, flaps, cause, bounces=0, peak_speed=0.0):
+        self.seed.append(seed)
+        self.score.append(score)
+        self.ticks.append(ticks)
+        self.flaps.append(flaps)
+        self.death_cause.append(cause)
+        self.bounces.append(bounces)
+        self.peak_speed.append(peak_speed)
+
+    def extend(self, other):
+        """Append all games from another RolloutResults."""
+        for name, _ in self.FIELDS:
+            getattr(self, name).extend(getattr(other, name))
+
+    def summary(self):
+        """Return aggregate statistics as a dict."""
+        n = len(self)
+        if not n:
+            return {'games': 0}
+        causes = {}
+        for code in self.death_cause:
+            name = DEATH_CAUSES[code] or 'timeout'
+            causes[name] = causes.get(name, 0) + 1
+        return {
+            'games': n,
+            'mean_score': sum(self.score) / n,
+            'max_score': max(self.score),
+            'mean_ticks': sum(self.ticks) / n,
+            'total_ticks': sum(self.ticks),
+            'mean_flaps': sum(self.flaps) / n,
+            'death_causes': causes,
+        }
+
+
+# per-process worker configuration, set once by _init_worker
+_worker_config = None
+
+def _init_worker(policy, dt, max_ticks):
+    """Warm a worker: import the game modules and read sprite sizes once."""
+    global _worker_config
+    bird_frame_heights()
+    _worker_config = (policy, dt, max_ticks)
+
+def _run_chunk(seeds):
+    """Play every seed in a chunk and return the chunk's results batch."""
+    policy, dt, max_ticks = _worker_config
+    results = RolloutResults()
+    for seed in seeds:
+        results.append(seed, *play(seed, policy, dt, max_ticks))
+    return results
+
+
+def _chunks(seeds, size):
+    for i in range(0, len(seeds), size):
+        yield seeds[i:i + size]
+
+
+def run_rollouts(seeds, policy=gap_policy, workers=None, chunksize=DEFAULT_CHUNKSIZE,
+                 dt=DEFAULT_DT, max_ticks=DEFAULT_MAX_TICKS, sink=None):
+    """
+    Play one game per seed across a pool of worker processes.
+    Return a RolloutResults with games in seed order; each finished chunk is
+    also passed to `sink` (a runstats.RunStatsSink) if given.
+    """
+    seeds = list(seeds)
+    workers = workers or os.cpu_count() or 1
+    results = RolloutResults()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(policy, dt, max_ticks)) as pool:
+        for batch in pool.map(_run_chunk, _chunks(seeds, chunksize)):
+            results.extend(batch)
+            if sink is not None:
+                sink.add_results(batch, dt)
+    return results
+
+
+def scaling_report(games, worker_counts=None, policy=gap_policy, chunksize=DEFAULT_CHUNKSIZE,
+                   dt=DEFAULT_DT, max_ticks=DEFAULT_MAX_TICKS, out=sys.stdout):
+    """
+    Time the same rollout with increasing worker counts and print
+    throughput, speed-up and parallel efficiency for each.
+    Return a list of (workers, seconds, ticks per second) rows.
+    """
+    if worker_counts is None:
+        cpus = os.cpu_count() or 1
+        worker_counts = []
+        w = 1
+        while w < cpus:
+            worker_counts.append(w)
+            w *= 2
+        worker_counts.append(cpus)
+    seeds = range(games)
+    rows = []
+    base = None
+    print(f"{'workers':>7} {'seconds':>9} {'games/s':>10} {'ticks/s':>12} {'speedup':>8} {'eff':>6}", file=out)
+    for workers in worker_counts:
+        start = time.perf_counter()
+        results = run_rollouts(seeds, policy, workers, chunksize, dt, max_ticks)
+        elapsed = time.perf_counter() - start
+        tps = results.summary()['total_ticks'] / elapsed
+        base = base or tps
+        speedup = tps / base
+        rows.append((workers, elapsed, tps))
+        print(f"{workers:>7} {elapsed:>9.2f} {games / elapsed:>10.0f} {tps:>12.0f} "
+              f"{speedup:>8.2f} {speedup / workers:>6.0%}", file=out)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run seeded headless games on a process pool")
+    parser.add_argument("--games", type=int, default=1000, help="number of games (seeds 0..N-1)")
+    parser.add_argument("--seed-offset", type=int, default=0, help="first seed")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="seeds per task")
+    parser.add_argument("--max-ticks", type=int, default=DEFAULT_MAX_TICKS, help="tick cap per game")
+    parser.add_argument("--report", action="store_true", help="print throughput vs. worker count")
+    parser.add_argument("--stats", metavar="PATH", help="stream per-game records to PATH (.csv or .npz)")
+    args = parser.parse_args(argv)
+    if args.report:
+        scaling_report(args.games, chunksize=args.chunksize, max_ticks=args.max_ticks)
+        return
+    seeds = range(args.seed_offset, args.seed_offset + args.games)
+    sink = RunStatsSink(args.stats) if args.stats else None
+    start = time.perf_counter()
+    results = run_rollouts(seeds, workers=args.workers, chunksize=args.chunksize,
+                           max_ticks=args.max_ticks, sink=sink)
+    elapsed = time.perf_counter() - start
+    summary = results.summary()
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+    print(f"elapsed: {elapsed:.2f}s ({summary['total_ticks'] / elapsed:.0f} ticks/s)")
+    if sink is not None:
+        sink.close()
+        print(sink.aggregator.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,53 @@
 """
 run.py: entry point for the Flappy Bird game.
 """
+import argparse
 import sys
+import settings
 from game import Game
 
 
-def main():
-    game = Game()
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Flappy Bird prototype")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for reproducible pipe courses")
+    parser.add_argument("--fixed-dt", type=float, default=settings.FIXED_TIMESTEP,
+                        help="fixed physics timestep in ms (deterministic mode)")
+    parser.add_argument("--dirty-rects", action="store_true", default=settings.DIRTY_RECTS,
+                        help="redraw only changed screen regions")
+    parser.add_argument("--profile", action="store_true", default=settings.PROFILE,
+                        help="time each frame phase (press D for the overlay)")
+    parser.add_argument("--profile-out", default=None, metavar="PATH",
+                        help="write frame timings to PATH (.json or .csv) on exit; implies --profile")
+    parser.add_argument("--record", default=None, metavar="PATH",
+                        help="append every game to a replay file (see replay.py)")
+    parser.add_argument("--autopilot", nargs="?", const="", default=None, metavar="TABLE",
+                        help="let the lookahead autopilot play (attract mode); "
+                             "TABLE keeps its memo table between runs")
+    parser.add_argument("--low-latency", action="store_true", default=settings.LOW_LATENCY,
+                        help="poll input right before physics with a restricted event queue")
+    parser.add_argument("--latency", action="store_true",
+                        help="measure flap input-to-photon latency and print it on exit")
+    parser.add_argument("--latency-out", default=None, metavar="PATH",
+                        help="write flap latencies to PATH (.json or .csv) on exit; implies --latency")
+    parser.add_argument("--stats", default=None, metavar="PATH",
+                        help="stream per-game statistics to PATH (.csv or .npz, see runstats.py)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    game = Game(seed=args.seed, fixed_dt=args.fixed_dt, dirty_rects=args.dirty_rects,
+                profile=args.profile, profile_out=args.profile_out, record=args.record,
+                autopilot=args.autopilot, low_latency=args.low_latency,
+                latency=args.latency, latency_out=args.latency_out, stats=args.stats)
     game.run()
+    if game.latency is not None:
+        print(game.latency.report())
+    if game.stats is not None and game.stats.written:
+        print(game.stats.aggregator.report())
 
 
 if __name__ == "__main__":
     main()
-    sys.exit()            
\ No newline at end of file
+    sys.exit()
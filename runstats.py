@@ -0,0 +1,333 @@
+"""
+runstats.py: streaming, columnar statistics of finished games.
+RunStatsSink buffers one record per game in preallocated array.array
+columns and writes them out a block at a time, to CSV (appended, rotated to
+a new part file by size) or NPZ (one part file per block, needs numpy).
+RunAggregator keeps running percentiles of each field in QuantileSketch
+histograms, so summaries never hold the history in memory; sketches from
+different sinks or files merge by adding counts.
+
+    sink = RunStatsSink('runs.csv')
+    sink.add(sim)                   # after each game (Simulation)
+    sink.close()
+
+    python runstats.py runs.*.csv   # stream the files into a summary
+"""
+import argparse
+import csv
+import glob
+import math
+import os
+import sys
+from array import array
+
+import settings
+from simulation import DEATH_CAUSES
+
+# One column per field: (name, array typecode). time is the survival time
+# (ms); death_cause a code into simulation.DEATH_CAUSES (0 = still alive);
+# peak_speed the fastest pipe speed reached (pipes only speed up).
+FIELDS = (
+    ('seed', 'q'), ('score', 'q'), ('ticks', 'q'), ('time', 'd'), ('flaps', 'q'),
+    ('bounces', 'q'), ('death_cause', 'b'), ('peak_speed', 'd'),
+)
+FIELD_NAMES = tuple(name for name, _ in FIELDS)
+# fields with percentiles in RunAggregator
+MEASURES = ('score', 'ticks', 'time', 'flaps', 'bounces', 'peak_speed')
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class QuantileSketch:
+    """
+    Log-linear histogram of non-negative values (negatives count as 0).
+    Each power of two is split into 2**precision buckets, so a percentile is
+    exact for integers below 2**(precision + 1) and otherwise within
+    2**-precision of the true value (relative). Memory grows with the range
+    of values, not their number.
+    """
+    def __init__(self, precision=settings.RUNSTATS_PRECISION):
+        self.precision = precision
+        # buckets per power of two (frexp mantissas lie in [0.5, 1))
+        self._sub = 2 << precision
+        # bucket key -> count for positive values; keys sort in value order
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.update((value,))
+
+    def update(self, values):
+        """Add every value of an iterable."""
+        buckets = self.buckets
+        sub = self._sub
+        frexp = math.frexp
+        count = zeros = 0
+        total = 0.0
+        peak = self.max
+        for value in values:
+            count += 1
+            total += value
+            if value <= 0:
+                zeros += 1
+                continue
+            if value > peak:
+                peak = value
+            m, e = frexp(value)
+            key = e * sub + int(m * sub)
+            buckets[key] = buckets.get(key, 0) + 1
+        self.count += count
+        self.zeros += zeros
+        self.total += total
+        self.max = peak
+
+    def merge(self, other):
+        """Add the counts of another sketch with the same precision."""
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches of different precision")
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, pct):
+        """Nearest-rank percentile (the lower edge of its bucket)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, min(self.count, math.ceil(pct / 100.0 * self.count)))
+        seen = self.zeros
+        if seen >= rank:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen >= rank:
+                e, k = divmod(key, self._sub)
+                return math.ldexp(k, e - self.precision - 1)
+        return self.max
+
+
+class RunAggregator:
+    """
+    Running summary of game records: count, death causes and a
+    QuantileSketch per measure.
+    """
+    def __init__(self, precision=settings.RUNSTATS_PRECISION):
+        self.games = 0
+        # games per death cause code (0 = still alive at the tick limit)
+        self.causes = [0] * len(DEATH_CAUSES)
+        self.sketches = {name: QuantileSketch(precision) for name in MEASURES}
+
+    def add_columns(self, columns, n):
+        """Add the first n records of a {field: sequence} block."""
+        self.games += n
+        causes = self.causes
+        for code in columns['death_cause'][:n]:
+            causes[code] += 1
+        for name, sketch in self.sketches.items():
+            sketch.update(columns[name][:n])
+
+    def merge(self, other):
+        self.games += other.games
+        for code, n in enumerate(other.causes):
+            self.causes[code] += n
+        for name, sketch in self.sketches.items():
+            sketch.merge(other.sketches[name])
+
+    def summary(self):
+        """Return {'games', 'death_causes', measure: {'mean', 'max', 'p50', ...}}."""
+        result = {
+            'games': self.games,
+            'death_causes': {DEATH_CAUSES[code] or 'timeout': n for code, n in enumerate(self.causes)},
+        }
+        for name, sketch in self.sketches.items():
+            stats = {'mean': sketch.mean, 'max': sketch.max}
+            for pct in PERCENTILES:
+                stats[f'p{pct:g}'] = sketch.percentile(pct)
+            result[name] = stats
+        return result
+
+    def report(self):
+        """Return the summary as printable lines of text."""
+        summary = self.summary()
+        causes = ", ".join(f"{n} {cause}" for cause, n in summary['death_causes'].items())
+        lines = [f"{self.games} games; deaths: {causes}",
+                 f"{'':<11}{'mean':>10}" + "".join(f"{f'p{p:g}':>10}" for p in PERCENTILES) + f"{'max':>10}"]
+        for name in MEASURES:
+            stats = summary[name]
+            lines.append(f"{name:<11}{stats['mean']:>10.1f}"
+                         + "".join(f"{stats[f'p{p:g}']:>10.1f}" for p in PERCENTILES)
+                         + f"{stats['max']:>10.1f}")
+        return "\n".join(lines)
+
+
+class RunStatsSink:
+    """
+    Append-only columnar sink for finished games.
+    Records go into `block` preallocated rows; a full block is written to
+    the current part file (path with a part number before the extension,
+    e.g. runs.00003.csv) and fed to the aggregator. CSV parts are rotated
+    once they reach max_bytes; NPZ parts hold one block each. Numbering
+    continues after any parts already on disk.
+    """
+    def __init__(self, path, block=settings.RUNSTATS_BLOCK, max_bytes=settings.RUNSTATS_MAX_BYTES,
+                 aggregate=True):
+        self.path = path
+        self.block = block
+        self.max_bytes = max_bytes
+        root, self.ext = os.path.splitext(path)
+        self._root = root
+        self.npz = self.ext == '.npz'
+        self.columns = {name: array(code, bytes(array(code).itemsize * block)) for name, code in FIELDS}
+        self._order = [self.columns[name] for name in FIELD_NAMES]
+        # rows buffered in the current block
+        self.count = 0
+        # games written so far (flushed)
+        self.written = 0
+        self.aggregator = RunAggregator() if aggregate else None
+        self.part = _last_part(root, self.ext) + 1
+        self._file = None
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, seed, score, ticks, time, flaps, bounces, cause, peak_speed):
+        """Buffer one game record (cause: a DEATH_CAUSES code)."""
+        i = self.count
+        columns = self._order
+        for column, value in zip(columns, (seed, score, ticks, time, flaps, bounces, cause, peak_speed)):
+            column[i] = value
+        self.count = i + 1
+        if self.count == self.block:
+            self.flush()
+
+    def add(self, sim):
+        """Buffer the record of a finished (or abandoned) Simulation."""
+        self.append(sim.seed if sim.seed is not None else -1, sim.score, sim.ticks, sim.time,
+                    sim.bird.flaps, sim.bounces, DEATH_CAUSES.index(sim.death_cause), sim.pipe_speed)
+
+    def add_batch(self, batch, rows):
+        """Buffer the games of a BatchSimulation at the given row indices."""
+        seeds = batch.seeds
+        for i in rows:
+            self.append(seeds[i] if seeds[i] is not None else -1, int(batch.score[i]),
+                        int(batch.ticks[i]), float(batch.time[i]), int(batch.flaps[i]),
+                        int(batch.bounces[i]), int(batch.death_cause[i]), float(batch.pipe_speed[i]))
+
+    def add_results(self, results, dt):
+        """Buffer every game of a rollout.RolloutResults played with step dt."""
+        for seed, score, ticks, flaps, cause, bounces, speed in zip(
+                results.seed, results.score, results.ticks, results.flaps,
+                results.death_cause, results.bounces, results.peak_speed):
+            self.append(seed, score, ticks, ticks * dt, flaps, bounces, cause, speed)
+
+    def flush(self):
+        """Write the buffered block out and start an empty one."""
+        n = self.count
+        if not n:
+            return
+        if self.npz:
+            self._write_npz(n)
+        else:
+            self._write_csv(n)
+        if self.aggregator is not None:
+            self.aggregator.add_columns(self.columns, n)
+        self.written += n
+        self.count = 0
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _part_path(self):
+        return f"{self._root}.{self.part:05d}{self.ext}"
+
+    def _write_csv(self, n):
+        if self._file is None:
+            self._file = open(self._part_path(), 'w', newline='')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(FIELD_NAMES)
+        self._writer.writerows(zip(*(column[:n] for column in self._order)))
+        self._file.flush()
+        if self._file.tell() >= self.max_bytes:
+            # rotate: the next block starts a new part
+            self._file.close()
+            self._file = None
+            self.part += 1
+
+    def _write_npz(self, n):
+        import numpy as np
+        arrays = {name: np.frombuffer(column, dtype=code)[:n]
+                  for (name, code), column in zip(FIELDS, self._order)}
+        np.savez(self._part_path(), **arrays)
+        self.part += 1
+
+
+def _last_part(root, ext):
+    """Highest part number already written for a sink path (-1 if none)."""
+    last = -1
+    for path in glob.glob(glob.escape(root) + '.*' + ext):
+        number = path[len(root) + 1:len(path) - len(ext)]
+        if number.isdigit():
+            last = max(last, int(number))
+    return last
+
+
+def read_blocks(path, block=settings.RUNSTATS_BLOCK):
+    """
+    Yield ({field: list/array}, n) blocks of at most `block` records from a
+    CSV or NPZ part file, so a file is never loaded whole (an NPZ part is
+    one block already).
+    """
+    if path.endswith('.npz'):
+        import numpy as np
+        with np.load(path) as data:
+            columns = {name: data[name].tolist() for name in FIELD_NAMES}
+        yield columns, len(columns['seed'])
+        return
+    types = [float if code == 'd' else int for _, code in FIELDS]
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        if tuple(header) != FIELD_NAMES:
+            raise ValueError(f"{path}: not a run statistics file")
+        while True:
+            rows = []
+            for row in reader:
+                rows.append(row)
+                if len(rows) == block:
+                    break
+            if not rows:
+                return
+            columns = {name: [convert(value) for value in values]
+                       for name, convert, values in zip(FIELD_NAMES, types, zip(*rows))}
+            yield columns, len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize run statistics files")
+    parser.add_argument('paths', nargs='+', help="CSV or NPZ part files (e.g. runs.*.csv)")
+    args = parser.parse_args(argv)
+    aggregator = RunAggregator()
+    for path in args.paths:
+        for columns, n in read_blocks(path):
+            aggregator.add_columns(columns, n)
+    print(aggregator.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,441 @@
+"""
+server.py: asyncio match server hosting many headless games at once.
+Every session is a slot of one batch.BatchSimulation (the same rules as
+Simulation and Game), and a single scheduler task steps all playing slots
+together once per tick, then sends each client a compact binary state frame.
+Clients connect over TCP or a Unix socket; no window or pygame display is
+needed. Requires numpy.
+
+Wire format (little-endian):
+  client -> server
+    START  0x01, int64 seed (negative: the server draws one)
+    FLAP   0x02            flap before the session's next tick
+    LEAVE  0x03            end the session and close the connection
+  server -> client
+    HELLO  0x01, int64 seed, 8-byte replay.settings_hash()
+    STATE  0x02, uint32 tick, float32 y, float32 velocity, uint32 score,
+           uint8 death cause (simulation.DEATH_CAUSES index, 0 = alive),
+           then per upcoming pipe (env.OBS_PIPES) int16 dx, gap top, gap bottom
+    ERROR  0x03, uint8 code
+
+A STATE frame follows every tick of a started session, up to and including
+the one it dies on; START again begins a new game on the same connection.
+
+    python server.py serve --port 5555 --capacity 4096
+    python server.py load --clients 1000 --port 5555 --seconds 30
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import struct
+import sys
+import time
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import numpy as np
+
+import settings
+import replay
+from batch import BatchSimulation
+from env import OBS_PIPES
+from runstats import RunStatsSink
+from simulation import BIRD_BASE_FRAME, DEFAULT_DT, bird_frame_heights
+
+# client -> server opcodes and the message size of each
+OP_START = 0x01
+OP_FLAP = 0x02
+OP_LEAVE = 0x03
+_START = struct.Struct('<Bq')
+_MESSAGE_SIZES = {OP_START: _START.size, OP_FLAP: 1, OP_LEAVE: 1}
+
+# server -> client frame types
+FRAME_HELLO = 0x01
+FRAME_STATE = 0x02
+FRAME_ERROR = 0x03
+_HELLO = struct.Struct('<Bq8s')
+_ERROR = struct.Struct('<BB')
+STATE = struct.Struct('<BIffIB' + 'hhh' * OBS_PIPES)
+# the same layout as a numpy record, so a tick's frames are built in one pass
+STATE_DTYPE = np.dtype([
+    ('type', 'u1'), ('tick', '<u4'), ('y', '<f4'), ('velocity', '<f4'),
+    ('score', '<u4'), ('cause', 'u1'), ('pipes', '<i2', (OBS_PIPES, 3)),
+])
+assert STATE_DTYPE.itemsize == STATE.size
+
+# error codes
+ERROR_FULL = 1        # every session slot is taken
+ERROR_BAD_MESSAGE = 2 # unknown opcode
+
+# filler for pipes that have not spawned yet: far away, fully open gap (as env.py)
+_NO_PIPE = (settings.WIDTH, 0, settings.HEIGHT)
+
+
+class MatchServer:
+    """
+    Up to `capacity` concurrent games in one BatchSimulation.
+    Sessions take a slot on START and free it when they disconnect; tick()
+    steps every playing slot at once and sends the state frames. Games that
+    end are recorded in `sink` (a runstats.RunStatsSink) if given.
+    """
+    def __init__(self, capacity=settings.SERVER_CAPACITY, dt=DEFAULT_DT, sink=None):
+        self.capacity = capacity
+        self.dt = dt
+        self.sink = sink
+        # every slot idle until start() gives it a game with its own course
+        self.batch = BatchSimulation(capacity, start=False)
+        # flap requests for the next tick, by slot
+        self.flaps = np.zeros(capacity, dtype=bool)
+        self.sessions = [None] * capacity
+        self._free = list(range(capacity - 1, -1, -1))
+        self._frames = np.zeros(capacity, dtype=STATE_DTYPE)
+        self._frames['type'] = FRAME_STATE
+        self._rows = np.arange(capacity)[:, None]
+        self.hash = replay.settings_hash()
+        # statistics: ticks run, ticks that started late, time spent in tick() (s)
+        self.ticks = 0
+        self.late = 0
+        self.busy = 0.0
+        self.frames_sent = 0
+        self.games_started = 0
+        # counters at the previous stats_line() call
+        self._last_stats = (0, 0.0, 0)
+
+    @property
+    def playing(self):
+        return int(self.batch.alive.sum())
+
+    def join(self, session):
+        """Give a session a slot; return the slot, or None when the server is full."""
+        if not self._free:
+            return None
+        slot = self._free.pop()
+        self.sessions[slot] = session
+        return slot
+
+    def leave(self, slot):
+        """Stop a session's game and free its slot."""
+        self.batch.alive[slot] = False
+        self.flaps[slot] = False
+        self.sessions[slot] = None
+        self._free.append(slot)
+
+    def start(self, slot, seed):
+        """Start a new game in a slot; return its seed."""
+        if seed < 0:
+            seed = random.randrange(2 ** 63)
+        self.batch.reset([slot], [seed])
+        self.flaps[slot] = False
+        self.games_started += 1
+        return seed
+
+    def tick(self):
+        """Step every playing game once and send each its state frame."""
+        batch = self.batch
+        playing = batch.alive.copy()
+        if not playing.any():
+            return
+        start = time.perf_counter()
+        batch.step(self.flaps, self.dt)
+        self.flaps[:] = False
+        if self.sink is not None:
+            ended = playing & ~batch.alive
+            if ended.any():
+                self.sink.add_batch(batch, np.flatnonzero(ended).tolist())
+        self._fill_frames()
+        # one bytes object for all frames; each session gets its own slice
+        data = self._frames.tobytes()
+        size = STATE.size
+        sessions = self.sessions
+        slots = np.flatnonzero(playing)
+        for slot in slots.tolist():
+            offset = slot * size
+            sessions[slot].send(data[offset:offset + size])
+        self.frames_sent += len(slots)
+        self.ticks += 1
+        self.busy += time.perf_counter() - start
+
+    def _fill_frames(self):
+        """Write every slot's STATE frame into the frame array (vectorized)."""
+        batch = self.batch
+        frames = self._frames
+        frames['tick'] = batch.ticks
+        frames['y'] = batch.bird_y
+        frames['velocity'] = batch.velocity
+        frames['score'] = batch.score
+        frames['cause'] = batch.death_cause
+        # upcoming pipes as in Simulation.next_pipes: right edge not yet behind the bird
+        tail = batch.bird_x - batch.height / 2
+        ahead = batch.pipe_active & (batch.pipe_x + settings.PIPE_WIDTH >= tail[:, None])
+        key = np.where(ahead, batch.pipe_x, np.iinfo(np.int64).max)
+        order = np.argsort(key, axis=1, kind='stable')[:, :OBS_PIPES]
+        rows = self._rows
+        found = ahead[rows, order]
+        pipes = frames['pipes']
+        pipes[:, :, 0] = np.where(found, batch.pipe_x[rows, order] - int(batch.bird_x), _NO_PIPE[0])
+        pipes[:, :, 1] = np.where(found, batch.pipe_top[rows, order], _NO_PIPE[1])
+        pipes[:, :, 2] = np.where(found, batch.pipe_bottom[rows, order], _NO_PIPE[2])
+
+    def stats_line(self, interval):
+        """Describe the throughput over the `interval` seconds since the previous call."""
+        last_ticks, last_busy, last_frames = self._last_stats
+        ticks = self.ticks - last_ticks
+        busy = self.busy - last_busy
+        frames = self.frames_sent - last_frames
+        self._last_stats = (self.ticks, self.busy, self.frames_sent)
+        return (f"{self.capacity - len(self._free)} sessions, {self.playing} playing: "
+                f"{ticks / interval:.1f} ticks/s, {busy / max(ticks, 1) * 1000:.2f} ms/tick, "
+                f"{frames / interval:.0f} frames/s, {self.late} late ticks")
+
+    async def run_ticks(self):
+        """Scheduler: call tick() every dt ms; after an overrun, resume from now rather than catch up."""
+        loop = asyncio.get_running_loop()
+        period = self.dt / 1000.0
+        due = loop.time()
+        while True:
+            self.tick()
+            due += period
+            delay = due - loop.time()
+            if delay < 0:
+                self.late += 1
+                due = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+
+class _Session(asyncio.Protocol):
+    """One client connection: parses its messages and receives its frames."""
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.slot = None
+        self._buffer = bytearray()
+        # frames are dropped while the client is not reading (flow control)
+        self._paused = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        if self.slot is not None:
+            self.server.leave(self.slot)
+            self.slot = None
+
+    def pause_writing(self):
+        self._paused = True
+
+    def resume_writing(self):
+        self._paused = False
+
+    def send(self, frame):
+        if not self._paused:
+            self.transport.write(frame)
+
+    def data_received(self, data):
+        buffer = self._buffer
+        buffer += data
+        pos = 0
+        while pos < len(buffer):
+            op = buffer[pos]
+            size = _MESSAGE_SIZES.get(op)
+            if size is None:
+                self._error(ERROR_BAD_MESSAGE)
+                return
+            if pos + size > len(buffer):
+                break
+            if op == OP_FLAP:
+                if self.slot is not None:
+                    self.server.flaps[self.slot] = True
+            elif op == OP_START:
+                _, seed = _START.unpack_from(buffer, pos)
+                if not self._start(seed):
+                    return
+            else:
+                self.transport.close()
+                return
+            pos += size
+        del buffer[:pos]
+
+    def _start(self, seed):
+        server = self.server
+        if self.slot is None:
+            self.slot = server.join(self)
+            if self.slot is None:
+                self._error(ERROR_FULL)
+                return False
+        seed = server.start(self.slot, seed)
+        self.transport.write(_HELLO.pack(FRAME_HELLO, seed, server.hash))
+        return True
+
+    def _error(self, code):
+        self.transport.write(_ERROR.pack(FRAME_ERROR, code))
+        self.transport.close()
+
+
+async def serve(server, host=settings.SERVER_HOST, port=settings.SERVER_PORT, unix=None,
+                stats_interval=None):
+    """
+    Accept sessions on a TCP port (or a Unix socket path) and run the tick
+    scheduler until SIGINT or SIGTERM, then return so the caller can flush
+    what it buffered (e.g. the run statistics sink).
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    handled = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+            handled.append(sig)
+        except (NotImplementedError, RuntimeError):
+            # no loop signal handlers here (Windows): Ctrl+C still raises KeyboardInterrupt
+            pass
+    # a backlog as large as the capacity (the kernel caps it) lets a burst of
+    # clients connect at once; asyncio takes a full Unix socket backlog as connected
+    if unix:
+        listener = await loop.create_unix_server(lambda: _Session(server), unix, backlog=server.capacity)
+    else:
+        listener = await loop.create_server(lambda: _Session(server), host, port, backlog=server.capacity)
+    ticker = asyncio.ensure_future(server.run_ticks())
+    try:
+        async with listener:
+            while not stop.is_set():
+                try:
+                    await asyncio.wait_for(stop.wait(), stats_interval or None)
+                except asyncio.TimeoutError:
+                    print(server.stats_line(stats_interval), flush=True)
+    finally:
+        ticker.cancel()
+        for sig in handled:
+            loop.remove_signal_handler(sig)
+
+
+class _LoadClient(asyncio.Protocol):
+    """
+    Load-generator session: plays game after game with the autopilot's
+    steering rule, flapping when the bird sinks toward the next bottom pipe.
+    """
+    def __init__(self, stats, seed, margin):
+        self.stats = stats
+        self.seed = seed
+        self.margin = margin
+        self.radius = bird_frame_heights()[BIRD_BASE_FRAME] / 2
+        self.transport = None
+        self._buffer = bytearray()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.write(_START.pack(OP_START, self.seed))
+
+    def connection_lost(self, exc):
+        self.stats['closed'] += 1
+
+    def data_received(self, data):
+        buffer = self._buffer
+        buffer += data
+        pos = 0
+        size = STATE.size
+        while pos < len(buffer):
+            kind = buffer[pos]
+            if kind == FRAME_STATE:
+                if pos + size > len(buffer):
+                    break
+                self._state(STATE.unpack_from(buffer, pos))
+                pos += size
+            elif kind == FRAME_HELLO:
+                if pos + _HELLO.size > len(buffer):
+                    break
+                pos += _HELLO.size
+            else:
+                if pos + _ERROR.size <= len(buffer):
+                    self.stats['errors'] += 1
+                self.transport.close()
+                return
+        del buffer[:pos]
+
+    def _state(self, frame):
+        stats = self.stats
+        stats['frames'] += 1
+        _, tick, y, velocity, score, cause = frame[:6]
+        if cause:
+            stats['games'] += 1
+            stats['score'] += score
+            stats['best'] = max(stats['best'], score)
+            self.transport.write(_START.pack(OP_START, self.seed))
+            return
+        bottom = frame[8]
+        if y + self.radius > bottom - self.margin:
+            self.transport.write(b'\x02')
+
+
+async def load(clients, host=settings.SERVER_HOST, port=settings.SERVER_PORT, unix=None,
+               seconds=10.0, seed=None):
+    """Connect `clients` bot sessions, play for `seconds` and return the counters."""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    stats = {'frames': 0, 'games': 0, 'score': 0, 'best': 0, 'errors': 0, 'closed': 0}
+    transports = []
+    for _ in range(clients):
+        game_seed = rng.randrange(2 ** 63) if seed is not None else -1
+        factory = lambda s=game_seed: _LoadClient(stats, s, rng.uniform(*settings.POPULATION_MARGINS))
+        if unix:
+            transport, _ = await loop.create_unix_connection(factory, unix)
+        else:
+            transport, _ = await loop.create_connection(factory, host, port)
+        transports.append(transport)
+    start = loop.time()
+    frames = stats['frames']
+    await asyncio.sleep(seconds)
+    stats['elapsed'] = loop.time() - start
+    stats['frames'] -= frames
+    # connections the server closed (or that never really connected)
+    stats['dropped'] = stats['closed']
+    for transport in transports:
+        transport.write(bytes((OP_LEAVE,)))
+    await asyncio.sleep(0.1)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless match server and load generator")
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('serve', 'load'):
+        p = sub.add_parser(name)
+        p.add_argument('--host', default=settings.SERVER_HOST)
+        p.add_argument('--port', type=int, default=settings.SERVER_PORT)
+        p.add_argument('--unix', default=None, metavar='PATH', help="use a Unix socket instead of TCP")
+    serve_p = sub.choices['serve']
+    serve_p.add_argument('--capacity', type=int, default=settings.SERVER_CAPACITY,
+                         help="maximum concurrent sessions")
+    serve_p.add_argument('--stats', type=float, default=5.0, metavar='SECONDS',
+                         help="print throughput every SECONDS (0: never)")
+    serve_p.add_argument('--run-stats', default=None, metavar='PATH',
+                         help="stream a record of every finished game to PATH (.csv or .npz)")
+    load_p = sub.choices['load']
+    load_p.add_argument('--clients', type=int, default=100)
+    load_p.add_argument('--seconds', type=float, default=10.0)
+    load_p.add_argument('--seed', type=int, default=None, help="seed the clients' game seeds")
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        sink = RunStatsSink(args.run_stats) if args.run_stats else None
+        server = MatchServer(args.capacity, sink=sink)
+        try:
+            asyncio.run(serve(server, args.host, args.port, args.unix, args.stats))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if sink is not None:
+                sink.close()
+        return 0
+    stats = asyncio.run(load(args.clients, args.host, args.port, args.unix, args.seconds, args.seed))
+    rate = stats['frames'] / stats['elapsed']
+    print(f"{args.clients} clients for {stats['elapsed']:.1f}s: {rate:.0f} frames/s "
+          f"({rate / max(args.clients, 1):.1f} per client), {stats['games']} games, "
+          f"mean score {stats['score'] / max(stats['games'], 1):.1f}, best {stats['best']}, "
+          f"{stats['errors']} errors, {stats['dropped']} dropped")
+    return 1 if stats['errors'] or stats['dropped'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,42 @@ WIDTH = 800
 HEIGHT = 600
 FPS = 60
 
+# Deterministic mode: fixed physics step in ms (None = use the variable frame time)
+FIXED_TIMESTEP = None
+# cap on physics steps per rendered frame in fixed-step mode (drops time after hitches)
+MAX_STEPS_PER_FRAME = 5
+# Dirty-rectangle rendering: redraw and update only changed screen regions
+DIRTY_RECTS = False
+# fraction of the screen above which a dirty frame is fully redrawn instead
+DIRTY_FULL_REDRAW_FRACTION = 0.5
+# Frame profiling: time each game-loop phase (off = no instrumentation cost)
+PROFILE = False
+PROFILE_CAPACITY = 1024         # frames kept in the ring buffer
+PROFILE_OVERLAY_INTERVAL = 500  # ms between debug overlay refreshes
+# Input latency: poll input right before physics with a restricted event queue
+# and busy-wait frame pacing (costs a CPU core while waiting)
+LOW_LATENCY = False
+LATENCY_CAPACITY = 512          # flaps kept in the latency probe's ring buffer
+# Autopilot (lookahead planner, see autopilot.py)
+AUTOPILOT_HORIZON = 240         # ticks searched ahead
+AUTOPILOT_STEP_TICKS = 6        # ticks between flap choices in the search
+AUTOPILOT_BUDGET = 0.25         # fraction of a frame one decision may take
+AUTOPILOT_TABLE_SIZE = 200000   # memoized search results kept (LRU)
+AUTOPILOT_QUANT = (4, 10, 4)    # key resolution: y (px), velocity (px/sec), x (px)
+AUTOPILOT_RESTART_DELAY = 1500  # ms on the game-over screen before the autopilot restarts
+# Population mode (many birds on one course, see population.py)
+POPULATION_SIZE = 200           # bots per population
+POPULATION_MARGINS = (5, 40)    # range of the bots' flap margins above the bottom pipe (px)
+POPULATION_RESTART_DELAY = 1500 # ms after the last bird dies before the next population starts
+# Match server (see server.py)
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 5555
+SERVER_CAPACITY = 4096          # concurrent sessions (slots of one batch simulation)
+# Run statistics sink (see runstats.py)
+RUNSTATS_BLOCK = 65536          # games buffered in memory before a write
+RUNSTATS_MAX_BYTES = 64 << 20   # CSV part size that starts a new part file
+RUNSTATS_PRECISION = 7          # percentile buckets: 2**7 per power of two (<1% error)
+
 # Physics constants (per-second units)
 GRAVITY = 200.0      # downward acceleration (px/sec^2)
 JUMP_VELOCITY = -105.0  # flap impulse velocity (px/sec)
@@ -14,9 +50,24 @@ RESTITUTION = 0.8    # bounce damping (1.0 = perfect bounce)
 
 # Bird settings
 # (bird radius is derived from sprite size; this constant is unused)
+BIRD_START_X = 100   # the bird's fixed horizontal position (px)
+# Bird tilt (drawing only): pitch follows vertical velocity, nose up after a
+# flap and diving while falling; sprites are prerotated in TILT_STEP steps
+BIRD_TILT = True
+BIRD_TILT_RATE = 0.35      # degrees of pitch per px/sec of velocity
+BIRD_TILT_UP = 25          # steepest nose-up angle (degrees)
+BIRD_TILT_DOWN = -80       # steepest dive angle (degrees)
+BIRD_TILT_STEP = 5         # angle between prerotated sprites (degrees)
 
 # Asset scaling
 SCALE_FACTOR = 8     # images are scaled down by this factor
+# memory budget (bytes) for the shared cache of scaled sprite frames and
+# the bird's prerotated tilt frames (about 1.3 MB of it)
+FRAME_CACHE_BUDGET = 4 * 1024 * 1024
+# frame sets first needed mid-game, warmed on a background thread at startup
+PRELOAD_FRAME_SETS = ('explosion', 'bird_burnt')
+# longest wait (s) for a set still being preloaded before loading it on the main thread
+PRELOAD_WAIT_TIMEOUT = 1.0
 
 # Animation settings
 FRAME_DURATION = 80  # ms per animation frame
@@ -25,6 +76,7 @@ FRAME_DURATION = 80  # ms per animation frame
 PIPE_WIDTH = 50            # width of each pipe (px)
 PIPE_GAP = 130             # vertical gap between top and bottom pipes (px)
 PIPE_SPEED = 100           # horizontal speed of pipes (px/sec)
+PIPE_SPEEDUP = 5           # pipe speed added for each pipe passed (px/sec)
 PIPE_SPAWN_INTERVAL = 3500 # ms between spawning new pipes
 PIPE_MIN_HEIGHT = 50       # minimum height for top/bottom pipe segment (px)
 # Variance for pipe gap and spawn interval (± fraction)
@@ -39,6 +91,11 @@ INITIAL_PIPE_OFFSET = 300
 # Bounce zone configuration
 PIPE_BOUNCE_CHANCE = 0.2   # probability a pipe has a bounce zone (0–1)
 PIPE_BOUNCE_STRIPE_HEIGHT = 5  # height of the bounce-zone stripe (px)
+# Course feasibility (see feasibility.py): redraw pipes the bird cannot reach
+COURSE_FEASIBLE = False
+COURSE_REDRAWS = 8         # redraws before an unreachable gap is moved into reach
+FEASIBILITY_DISTANCE_STEP = 4  # px per column of the reach lookup table
+FEASIBILITY_MAX_SPEED = 600    # fastest pipe speed in the table (px/sec); faster clamps
 # Color constants
 BACKGROUND_COLOR = (135, 206, 235)  # sky blue
 PIPE_COLOR = (0, 150, 0)
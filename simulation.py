@@ -0,0 +1,522 @@
+"""
+simulation.py: headless simulation core for Flappy Bird.
+Bird physics, pipe motion, scoring and collisions in plain Python with no
+window, image decoding or frame clock. Game and Renderer are a view on top.
+"""
+from collections import deque
+
+import settings
+import assets
+from course import Course
+from utils import swept_circle_box, FACE_TOP
+
+# Bird sprite files in animation order (wings down, level, up)
+BIRD_FRAME_FILES = assets.FRAME_SETS['bird'][0]
+# index of the resting (wings level) frame within BIRD_FRAME_FILES
+BIRD_BASE_FRAME = 1
+
+# Causes of death reported by Simulation.death_cause
+DEATH_GROUND = 'ground'
+DEATH_TOP_PIPE = 'top_pipe'
+DEATH_BOTTOM_PIPE = 'bottom_pipe'
+# compact integer codes for death causes (index into this tuple; 0 = still alive)
+DEATH_CAUSES = (None, DEATH_GROUND, DEATH_TOP_PIPE, DEATH_BOTTOM_PIPE)
+
+# Revision of the game model; bump when a change alters the outcome of a
+# given seed and input sequence (recorded replays of older models then fail)
+MODEL_VERSION = 4
+
+# Default simulation step: one frame at the target frame rate (ms)
+DEFAULT_DT = 1000.0 / settings.FPS
+
+# Bird starting position
+BIRD_START_X = settings.BIRD_START_X
+BIRD_START_Y = settings.HEIGHT // 2
+
+_frame_heights = None
+
+def bird_frame_heights():
+    """
+    Return the scaled heights of the bird animation frames.
+    Read from the PNG headers so the collider matches the drawn sprite.
+    """
+    global _frame_heights
+    if _frame_heights is None:
+        _frame_heights = tuple(
+            assets.image_size(name)[1] // settings.SCALE_FACTOR
+            for name in BIRD_FRAME_FILES
+        )
+    return _frame_heights
+
+
+class BirdBody:
+    """Physics and animation state of the bird, without any images."""
+    def __init__(self, x, y, frame_heights=None):
+        self.x = float(x)
+        self.y = float(y)
+        self.velocity = 0
+        # collider height of each animation frame and of the resting frame
+        self.frame_heights = frame_heights or bird_frame_heights()
+        self.base_height = self.frame_heights[BIRD_BASE_FRAME]
+        # animation state (the current frame decides the collider size)
+        self.anim_index = 0
+        self.anim_timer = 0
+        self.frame_duration = settings.FRAME_DURATION
+        self.animating = False
+        self.height = self.base_height
+        # number of flaps so far (for run statistics)
+        self.flaps = 0
+
+    def update(self, dt):
+        """
+        Update physics, animation and constraints.
+        dt: elapsed milliseconds since last step.
+        """
+        self._update_physics(dt)
+        self._update_animation(dt)
+        self._apply_constraints()
+
+    def _update_physics(self, dt):
+        """Apply gravity to velocity and update vertical position."""
+        dt_sec = dt / 1000.0
+        self.velocity += settings.GRAVITY * dt_sec
+        self.y += self.velocity * dt_sec
+
+    def _update_animation(self, dt):
+        """Advance wing-flap animation frames."""
+        if self.animating:
+            self.anim_timer += dt
+            if self.anim_timer >= self.frame_duration:
+                self.anim_timer -= self.frame_duration
+                self.anim_index += 1
+                if self.anim_index >= len(self.frame_heights):
+                    self.animating = False
+        self.height = self.frame_heights[self.anim_index] if self.animating else self.base_height
+
+    def _apply_constraints(self):
+        """Prevent bird from moving above the top of the screen."""
+        half_h = self.height / 2
+        if self.y < half_h:
+            self.y = half_h
+            self.velocity = 0
+
+    @property
+    def radius(self):
+        """Collision circle radius: half the current frame height."""
+        return self.height / 2
+
+    @property
+    def bottom(self):
+        """Bottom edge of the sprite rect centred on the bird."""
+        return int(self.y) - self.height // 2 + self.height
+
+    def flap(self):
+        """Apply an upward impulse and start wing flap animation."""
+        self.velocity = settings.JUMP_VELOCITY
+        self.flaps += 1
+        if not self.animating:
+            self.animating = True
+            self.anim_index = 0
+            self.anim_timer = 0
+
+
+class PipeBody:
+    """
+    Geometry of a top/bottom pipe pair, without a surface.
+    Pipes do not move themselves: world_x is fixed and the screen position
+    is world_x minus the scroll offset of the PipeTrack that owns the pipe.
+    """
+    def __init__(self, track, world_x, gap, top_height, bounce_zone=False):
+        self.track = track
+        self.width = settings.PIPE_WIDTH
+        # gap size and top-pipe height (from the course)
+        self.gap = gap
+        self.top_height = top_height
+        self.bottom_y = self.top_height + self.gap
+        self.bounce_zone = bounce_zone
+        # left edge in world coordinates
+        self.world_x = world_x
+        # scoring flags
+        self.bounced = False
+        self.passed = False
+
+    @property
+    def pos_x(self):
+        """Sub-pixel screen x."""
+        return self.world_x - self.track.scroll
+
+    @property
+    def x(self):
+        """Integer screen x as used by the collision rects."""
+        return int(self.world_x - self.track.scroll)
+
+    @property
+    def right(self):
+        return self.x + self.width
+
+    def off_screen(self):
+        """Return True if pipe has moved entirely off the left edge."""
+        return self.right < 0
+
+
+class PipeTrack:
+    """
+    The pipes of one game in world coordinates, in an x-ordered deque.
+    The whole track scrolls left by one offset at one speed, so moving the
+    pipes and speeding them up are O(1). New pipes spawn to the right of all
+    others, which keeps the deque ordered: scoring and culling work from the
+    front and window() stops at the first pipe past the query range.
+    """
+    def __init__(self, speed=settings.PIPE_SPEED):
+        self.pipes = deque()
+        # distance scrolled so far (px); screen x = world x - scroll
+        self.scroll = 0.0
+        # scroll speed (px/sec), shared by every pipe
+        self.speed = speed
+        # number of pipes at the front the bird has already passed
+        self.passed = 0
+
+    def __iter__(self):
+        return iter(self.pipes)
+
+    def __len__(self):
+        return len(self.pipes)
+
+    def spawn(self, spec):
+        """Add a pipe from a course.PipeSpec (right of every existing pipe)."""
+        pipe = PipeBody(self, spec.world_x, spec.gap, spec.top_height, spec.bounce)
+        self.pipes.append(pipe)
+        return pipe
+
+    def spawn_course(self, course, next_pipe):
+        """
+        Add the course pipes from index next_pipe on whose left edge has
+        scrolled onto the screen; return the index of the next one to spawn.
+        """
+        horizon = self.scroll + settings.WIDTH
+        while course[next_pipe].world_x <= horizon:
+            self.spawn(course[next_pipe])
+            next_pipe += 1
+        return next_pipe
+
+    def advance(self, dt):
+        """Scroll every pipe left by speed * dt."""
+        self.scroll += self.speed * (dt / 1000.0)
+
+    def pass_before(self, x):
+        """Mark and return the pipes whose right edge is now left of screen x."""
+        pipes = self.pipes
+        newly = []
+        while self.passed < len(pipes):
+            pipe = pipes[self.passed]
+            if pipe.right >= x:
+                break
+            pipe.passed = True
+            newly.append(pipe)
+            self.passed += 1
+        return newly
+
+    def cull(self):
+        """Drop pipes that have moved entirely off the left edge."""
+        pipes = self.pipes
+        while pipes and pipes[0].off_screen():
+            if pipes.popleft().passed:
+                self.passed -= 1
+
+    def window(self, left, right):
+        """Return the pipes whose screen x-range overlaps [left, right], in order."""
+        scroll = self.scroll
+        found = []
+        for pipe in self.pipes:
+            x = int(pipe.world_x - scroll)
+            if x > right:
+                break
+            if x + pipe.width >= left:
+                found.append(pipe)
+        return found
+
+
+def pipe_spans(track, start_scroll, left, right):
+    """
+    The pipes of a track whose screen x-range overlaps [left, right], as
+    (pipe, left, right, shift) with shift the whole pixels the pipe moved
+    since the track was at start_scroll. Every bird flies at the same x, so
+    one query serves any number of birds in a step.
+    """
+    spans = []
+    for pipe in track.window(left, right):
+        x = pipe.x
+        spans.append((pipe, x, x + pipe.width, int(pipe.world_x - start_scroll) - x))
+    return spans
+
+
+def pipe_contacts(bird, y0, spans):
+    """
+    Sweep the bird circle from height y0 to its position now against the
+    pipe segments of pipe_spans(). Return (t, order, segment, pipe, face)
+    per contact (segment 0: top pipe, 1: bottom pipe), earliest first;
+    ties in pipe order, top segment first.
+    """
+    cx, cy = bird.x, bird.y
+    radius = bird.radius
+    # a path that stays over a pixel clear of the gap's edges touches neither segment
+    high = min(y0, cy) - radius - 1
+    low = max(y0, cy) + radius + 1
+    contacts = []
+    for order, (pipe, left, right, shift) in enumerate(spans):
+        if high > pipe.top_height and low < pipe.bottom_y:
+            continue
+        # in the pipe's frame the bird moved right by the pipe's movement
+        x0 = cx - shift
+        # top pipe
+        hit = swept_circle_box(x0, y0, cx, cy, radius, left, 0, right, pipe.top_height)
+        if hit:
+            contacts.append((hit[0], order, 0, pipe, hit[1]))
+        # bottom pipe
+        hit = swept_circle_box(x0, y0, cx, cy, radius, left, pipe.bottom_y, right, settings.HEIGHT)
+        if hit:
+            contacts.append((hit[0], order, 1, pipe, hit[1]))
+    if len(contacts) > 1:
+        contacts.sort(key=lambda c: c[:3])
+    return contacts
+
+
+def resolve_contacts(bird, y0, contacts):
+    """
+    Apply a bird's pipe_contacts() in time order. A bounce is decided by the
+    face hit first: a bounce zone hit from above rebounds the bird off the
+    bottom pipe; any other contact, or a further one in the same step, is
+    fatal and leaves the bird where it touched the pipe.
+    Return (bounced pipe or None, death cause or None, fatal contact t or None).
+    """
+    cy = bird.y
+    t, _, segment, pipe, face = contacts[0]
+    bounced = None
+    if segment == 1 and pipe.bounce_zone and face == FACE_TOP and bird.velocity > 0:
+        # bounce off the top edge of the bottom pipe
+        bounced = pipe
+        bird.velocity = -bird.velocity * settings.RESTITUTION
+        bird.y = pipe.bottom_y - bird.radius
+        if len(contacts) == 1:
+            return bounced, None, None
+        t, _, segment = contacts[1][:3]
+    # leave the bird where it touched the pipe
+    bird.y = y0 + t * (cy - y0)
+    return bounced, DEATH_TOP_PIPE if segment == 0 else DEATH_BOTTOM_PIPE, t
+
+
+class SimState:
+    """
+    A snapshot of a Simulation's mutable state (see Simulation.snapshot).
+    Pipes are not copied: the pipes on screen are always a run of course
+    pipes, so they are stored as the course index of the first one plus a
+    bitmask of which have been bounced on. The course itself (and with it
+    all randomness) is shared by reference.
+    """
+    __slots__ = ('course', 'collision', 'bird', 'scroll', 'speed', 'first_pipe', 'next_pipe',
+                 'passed', 'bounced', 'bounces', 'score', 'alive', 'death_cause', 'time', 'ticks')
+
+
+class Simulation:
+    """
+    One game of Flappy Bird stepped without a display.
+    Call step() once per frame with the flap action and elapsed milliseconds.
+    All randomness is in the pipe course, generated from `seed`, so the same
+    seed and inputs always produce the same run. Pass a course.Course to
+    share one course between simulations.
+    """
+    def __init__(self, collision=True, seed=None, course=None):
+        # collision detection enabled (debug mode can turn it off)
+        self.collision = collision
+        # pipe course (None seeds from system entropy)
+        self.course = course if course is not None else Course(seed)
+        self.seed = self.course.seed
+        self.bird = BirdBody(BIRD_START_X, BIRD_START_Y)
+        # pipes scroll together; the track's speed is the dynamic pipe speed
+        self.track = PipeTrack(settings.PIPE_SPEED)
+        self.pipes = self.track.pipes
+        # index of the next course pipe to spawn
+        self.next_pipe = 0
+        self.score = 0
+        # bounce-zone rebounds so far (for run statistics)
+        self.bounces = 0
+        self.alive = True
+        self.death_cause = None
+        # elapsed simulated time (ms) and number of steps taken
+        self.time = 0
+        self.ticks = 0
+        self._spawn_pipes()
+
+    def step(self, flap=False, dt=DEFAULT_DT):
+        """
+        Advance the game by dt milliseconds, flapping first if requested.
+        Return True while the bird is alive.
+        """
+        if not self.alive:
+            return False
+        self.time += dt
+        self.ticks += 1
+        self._spawn_pipes()
+        # start of the step, for the swept collision test
+        self._start_y = self.bird.y
+        self._start_scroll = self.track.scroll
+        if flap:
+            self.bird.flap()
+        self.bird.update(dt)
+        self._move_and_score_pipes(dt)
+        self._check_collisions()
+        # when collision detection is off, clamp bird to bottom of screen
+        if not self.collision:
+            bottom_limit = settings.HEIGHT - self.bird.height / 2
+            if self.bird.y > bottom_limit:
+                self.bird.y = bottom_limit
+                self.bird.velocity = 0
+        return self.alive
+
+    @property
+    def pipe_speed(self):
+        return self.track.speed
+
+    @pipe_speed.setter
+    def pipe_speed(self, speed):
+        self.track.speed = speed
+
+    def next_pipes(self, count=2):
+        """Return up to `count` pipes the bird has not yet flown past, nearest first."""
+        tail = self.bird.x - self.bird.radius
+        upcoming = []
+        for pipe in self.pipes:
+            if pipe.right >= tail:
+                upcoming.append(pipe)
+                if len(upcoming) == count:
+                    break
+        return upcoming
+
+    def snapshot(self):
+        """Return a SimState of the game as it is now."""
+        bird = self.bird
+        pipes = self.pipes
+        state = SimState()
+        state.course = self.course
+        state.collision = self.collision
+        state.bird = (bird.y, bird.velocity, bird.anim_index, bird.anim_timer,
+                      bird.animating, bird.height, bird.flaps)
+        track = self.track
+        state.scroll = track.scroll
+        state.speed = track.speed
+        state.first_pipe = self.next_pipe - len(pipes)
+        state.next_pipe = self.next_pipe
+        state.passed = track.passed
+        # bit k set: the k-th pipe on screen has been bounced on
+        bounced = 0
+        for k, pipe in enumerate(pipes):
+            if pipe.bounced:
+                bounced |= 1 << k
+        state.bounced = bounced
+        state.bounces = self.bounces
+        state.score = self.score
+        state.alive = self.alive
+        state.death_cause = self.death_cause
+        state.time = self.time
+        state.ticks = self.ticks
+        return state
+
+    def restore(self, state):
+        """
+        Rewind (or fast-forward) to a SimState taken from this or any other
+        simulation. Pipe bodies are reused when the same course pipes are
+        already on screen, so restoring nearby states allocates nothing.
+        """
+        bird = self.bird
+        (bird.y, bird.velocity, bird.anim_index, bird.anim_timer,
+         bird.animating, bird.height, bird.flaps) = state.bird
+        # pipe bodies can be kept if they are the same pipes of the same course
+        pipes = self.pipes
+        first, end = state.first_pipe, state.next_pipe
+        reuse = (self.course is state.course and self.next_pipe == end
+                 and len(pipes) == end - first)
+        self.course = state.course
+        self.seed = state.course.seed
+        self.collision = state.collision
+        track = self.track
+        track.scroll = state.scroll
+        track.speed = state.speed
+        track.passed = state.passed
+        if not reuse:
+            # different pipes on screen: rebuild them from the course
+            pipes.clear()
+            course = state.course
+            for index in range(first, end):
+                track.spawn(course[index])
+            self.next_pipe = end
+        passed, bounced = state.passed, state.bounced
+        for k, pipe in enumerate(pipes):
+            pipe.passed = k < passed
+            pipe.bounced = bool(bounced >> k & 1)
+        self.bounces = state.bounces
+        self.score = state.score
+        self.alive = state.alive
+        self.death_cause = state.death_cause
+        self.time = state.time
+        self.ticks = state.ticks
+
+    def clone(self):
+        """Return an independent Simulation in the same state (sharing the course)."""
+        sim = Simulation(self.collision, course=self.course)
+        sim.restore(self.snapshot())
+        return sim
+
+    def _spawn_pipes(self):
+        """Add the course pipes whose left edge has scrolled onto the screen."""
+        self.next_pipe = self.track.spawn_course(self.course, self.next_pipe)
+
+    def _move_and_score_pipes(self, dt):
+        """Scroll pipes, award score for passed pipes, and remove off-screen pipes."""
+        track = self.track
+        track.advance(dt)
+        # scoring: bird passes pipe
+        for pipe in track.pass_before(self.bird.x):
+            self.score += 100 if pipe.bounced else 10
+            track.speed += settings.PIPE_SPEEDUP
+        track.cull()
+
+    def _check_collisions(self):
+        """Check for bird collisions with ground and pipes."""
+        if not self.collision:
+            return
+        self._handle_ground_collision()
+        if self.alive:
+            self._handle_pipe_collisions()
+
+    def _handle_ground_collision(self):
+        """End the game if the bird hits the ground."""
+        if self.bird.bottom >= settings.HEIGHT:
+            self._die(DEATH_GROUND)
+
+    def _handle_pipe_collisions(self):
+        """
+        Sweep the bird circle against each pipe segment over the step, so
+        large steps cannot pass through a pipe, and resolve the contacts in
+        time order (see resolve_contacts).
+        """
+        bird = self.bird
+        cx = bird.x
+        radius = bird.radius
+        start_scroll = self._start_scroll
+        # the bird's path relative to the pipes spans the distance scrolled this step
+        reach = self.track.scroll - start_scroll + 1
+        spans = pipe_spans(self.track, start_scroll, cx - radius - reach, cx + radius)
+        contacts = pipe_contacts(bird, self._start_y, spans)
+        if not contacts:
+            return
+        bounced, cause, _ = resolve_contacts(bird, self._start_y, contacts)
+        if bounced is not None:
+            bounced.bounced = True
+            self.bounces += 1
+        if cause is not None:
+            self._die(cause)
+
+    def _die(self, cause):
+        """Record the bird's death and its cause."""
+        self.alive = False
+        self.death_cause = cause
@@ -1,6 +1,7 @@
 """
 utils.py: Utility functions for collision detection and randomization.
 """
+import math
 import random
 import settings
 
@@ -8,25 +9,114 @@ def circle_rect_collision(cx: float, cy: float, radius: float, rect) -> bool:
     """
     Return True if a circle at (cx, cy) with given radius intersects the rect.
     """
-    closest_x = max(rect.left, min(cx, rect.right))
-    closest_y = max(rect.top,  min(cy, rect.bottom))
+    return circle_box_collision(cx, cy, radius, rect.left, rect.top, rect.right, rect.bottom)
+
+def circle_box_collision(cx: float, cy: float, radius: float,
+                         left: float, top: float, right: float, bottom: float) -> bool:
+    """
+    Return True if a circle at (cx, cy) intersects the box given by its edges.
+    Same test as circle_rect_collision without needing a pygame.Rect.
+    """
+    closest_x = max(left, min(cx, right))
+    closest_y = max(top,  min(cy, bottom))
     dx = cx - closest_x
     dy = cy - closest_y
     return (dx*dx + dy*dy) <= (radius * radius)
 
-def random_gap(base_gap: int = None) -> int:
+# Box faces reported by swept_circle_box (corners count as top/bottom)
+FACE_TOP = 0
+FACE_BOTTOM = 1
+FACE_LEFT = 2
+FACE_RIGHT = 3
+
+def contact_face(x: float, y: float, left: float, top: float, right: float, bottom: float) -> int:
+    """Return the face of the box that a circle centred at (x, y) touches."""
+    if y <= top:
+        return FACE_TOP
+    if y >= bottom:
+        return FACE_BOTTOM
+    if x <= left:
+        return FACE_LEFT
+    return FACE_RIGHT
+
+def swept_circle_box(x0: float, y0: float, x1: float, y1: float, radius: float,
+                     left: float, top: float, right: float, bottom: float):
+    """
+    Continuous circle_box_collision: move a circle in a straight line from
+    (x0, y0) to (x1, y1) and return (t, face) for its first contact with
+    the box, or None. t is the fraction of the move at contact (0..1) and
+    face one of FACE_TOP/BOTTOM/LEFT/RIGHT. For a moving box, pass the
+    circle's path relative to the box.
+    Anything circle_box_collision reports at the end position is also a
+    contact here; a circle that starts touching the box counts (at t=0)
+    only if it is still touching at the end.
+    """
+    end_hit = circle_box_collision(x1, y1, radius, left, top, right, bottom)
+    if circle_box_collision(x0, y0, radius, left, top, right, bottom):
+        return (0.0, contact_face(x0, y0, left, top, right, bottom)) if end_hit else None
+    dx, dy = x1 - x0, y1 - y0
+    t = _sweep_entry(x0, y0, dx, dy, radius, left, top, right, bottom)
+    if t is None:
+        if not end_hit:
+            return None
+        # touching only at the very end (lost to rounding in the sweep)
+        t = 1.0
+    return t, contact_face(x0 + t * dx, y0 + t * dy, left, top, right, bottom)
+
+def _sweep_entry(x0, y0, dx, dy, radius, left, top, right, bottom):
+    """
+    First t in [0, 1] at which the point (x0, y0) + t*(dx, dy) enters the
+    box grown by radius with rounded corners, or None.
+    """
+    # slab test against the box grown by radius on every side
+    t_enter, t_exit = 0.0, 1.0
+    for p, d, lo, hi in ((x0, dx, left - radius, right + radius),
+                         (y0, dy, top - radius, bottom + radius)):
+        if d == 0:
+            if p < lo or p > hi:
+                return None
+            continue
+        a, b = (lo - p) / d, (hi - p) / d
+        if a > b:
+            a, b = b, a
+        t_enter = max(t_enter, a)
+        t_exit = min(t_exit, b)
+        if t_enter > t_exit:
+            return None
+    px, py = x0 + t_enter * dx, y0 + t_enter * dy
+    if left <= px <= right or top <= py <= bottom:
+        # entered through a flat side
+        return t_enter
+    # entered a corner square: the real boundary is a circle around the corner
+    fx = x0 - (left if px < left else right)
+    fy = y0 - (top if py < top else bottom)
+    a = dx * dx + dy * dy
+    b = fx * dx + fy * dy
+    c = fx * fx + fy * fy - radius * radius
+    disc = b * b - a * c
+    if a == 0 or disc < 0:
+        return None
+    t = (-b - math.sqrt(disc)) / a
+    if t < 0 or t > 1:
+        return None
+    return t
+
+def random_gap(base_gap: int = None, rng=random) -> int:
     """
     Return a randomized gap size around PIPE_GAP within PIPE_VARIANCE.
+    rng: random source (a random.Random instance for seeded games).
     """
     gap = base_gap if base_gap is not None else settings.PIPE_GAP
     variance = settings.PIPE_VARIANCE
-    factor = 1.0 + random.uniform(-variance, variance)
+    factor = 1.0 + rng.uniform(-variance, variance)
     return int(gap * factor)
 
-def random_spawn_interval(pipe_speed: float) -> int:
+def random_pipe_spacing(rng=random) -> int:
     """
-    Return a randomized pipe spawn interval (ms) adjusted for speed and variance.
+    Return a randomized horizontal distance (px) between consecutive pipes:
+    the distance PIPE_SPEED covers in PIPE_SPAWN_INTERVAL, within PIPE_VARIANCE.
+    rng: random source (a random.Random instance for seeded games).
     """
-    base = settings.PIPE_SPAWN_INTERVAL * (settings.PIPE_SPEED / pipe_speed)
-    factor = 1.0 + random.uniform(-settings.PIPE_VARIANCE, settings.PIPE_VARIANCE)
-    return int(base * factor)
\ No newline at end of file
+    base = settings.PIPE_SPEED * settings.PIPE_SPAWN_INTERVAL / 1000.0
+    factor = 1.0 + rng.uniform(-settings.PIPE_VARIANCE, settings.PIPE_VARIANCE)
+    return int(base * factor)